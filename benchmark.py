@@ -0,0 +1,336 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Excel检查器性能基准测试
+在临时目录中构造一个本地git仓库（文件数、sheet数、修订记录行数、远程历史深度可配置），
+分别在冷缓存/热缓存、--all/暂存区 四种场景，以及全部文件都与远程不同的冷缓存场景下运行 ExcelChecker，
+输出每个场景的耗时、每秒文件数、峰值内存和与远程相同的文件比例（JSON），并可与保存的基线比较
+"""
+
+import argparse
+import contextlib
+import json
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+
+from generate_excels import write_fast_workbook
+
+try:
+    import resource
+except ImportError:
+    # Windows没有resource模块，不统计峰值内存
+    resource = None
+
+PACKAGE_DIR = os.path.dirname(os.path.abspath(__file__))
+RESULT_VERSION = 1
+EXCEL_DIR = "excels"
+# 场景按顺序执行，热缓存场景复用前一个冷缓存场景留下的缓存；
+# diverged_cold 在工作区中给全部文件追加本地修订记录，没有文件能因与远程相同而走捷径
+SCENARIOS = ("all_cold", "all_warm", "staged_cold", "staged_warm", "diverged_cold")
+# 基线比较时允许的耗时增长比例
+DEFAULT_THRESHOLD = 0.2
+
+REVISERS = ["张三", "李四", "王五", "赵六", "钱七"]
+BASE_TIME = datetime(2024, 1, 1, 9, 0, 0)
+
+
+def revision_row(file_index, row_index):
+    """第row_index条修订记录，只取决于文件序号和行号，历史版本之间保持前缀一致"""
+    rng = random.Random(file_index * 1000003 + row_index)
+    return [
+        rng.choice(REVISERS),
+        (BASE_TIME + timedelta(minutes=row_index)).strftime("%Y-%m-%d %H:%M:%S"),
+        f"修订内容{file_index}-{row_index}",
+        f"v{row_index + 1}"
+    ]
+
+
+def write_workbook(path, file_index, revision_count, sheet_count, data_rows, local_row=False):
+    """生成工作簿：一个修改记录sheet加 sheet_count - 1 个数据sheet"""
+    rows = [revision_row(file_index, row_index) for row_index in range(revision_count)]
+    if local_row:
+        rows.append(["本地用户", "2030-01-01 00:00:00", f"本地修改{file_index}", "local"])
+    write_fast_workbook(path, rows, sheet_count - 1, data_rows, random.Random(file_index))
+
+
+def _write_job(job):
+    """进程池工作函数"""
+    write_workbook(*job)
+
+
+def write_workbooks(jobs):
+    """在多个进程中并行生成工作簿"""
+    with ProcessPoolExecutor() as executor:
+        for _ in executor.map(_write_job, jobs, chunksize=max(1, len(jobs) // 64)):
+            pass
+
+
+def _git(repo, *args):
+    """在基准仓库中执行git命令"""
+    env = dict(os.environ,
+               GIT_AUTHOR_NAME="benchmark", GIT_AUTHOR_EMAIL="benchmark@example.com",
+               GIT_COMMITTER_NAME="benchmark", GIT_COMMITTER_EMAIL="benchmark@example.com")
+    subprocess.run(['git'] + list(args), cwd=repo, env=env, check=True,
+                   stdout=subprocess.DEVNULL)
+
+
+def fixture_path(repo, index):
+    """基准仓库中第index个工作簿的路径"""
+    return os.path.join(repo, EXCEL_DIR, f"数据文件_{index:05d}.xlsx")
+
+
+def modify_workbooks(repo, params, revision_counts, count):
+    """在工作区中给前count个文件追加一条本地修订记录"""
+    write_workbooks([(fixture_path(repo, index), index, revision_counts[index],
+                      params["sheets"], params["data_rows"], True) for index in range(count)])
+
+    # 将修改时间设为过去，避免刚写入的文件被当作不可信的stat指纹
+    excel_dir = os.path.join(repo, EXCEL_DIR)
+    past = time.time() - 3600
+    for name in os.listdir(excel_dir):
+        os.utime(os.path.join(excel_dir, name), (past, past))
+
+
+def build_fixture(repo, params):
+    """
+    构造基准仓库：main分支上先提交全部文件，再追加history个提交（每个提交修改一部分文件），
+    最后在工作区中给modified_ratio比例的文件追加一条本地修订记录，返回各文件在main上的修订记录数
+    """
+    files = params["files"]
+    history = params["history"]
+    excel_dir = os.path.join(repo, EXCEL_DIR)
+    os.makedirs(excel_dir)
+
+    _git(repo, 'init', '-q')
+    _git(repo, 'symbolic-ref', 'HEAD', 'refs/heads/main')
+    with open(os.path.join(repo, ".gitignore"), 'w', encoding='utf-8') as f:
+        f.write("/.excel_cache.db*\n/config.json\n")
+    with open(os.path.join(repo, "config.json"), 'w', encoding='utf-8') as f:
+        json.dump({"executor": params["executor"]}, f)
+
+    revision_counts = [params["rows"]] * files
+    write_workbooks([(fixture_path(repo, index), index, revision_counts[index],
+                      params["sheets"], params["data_rows"]) for index in range(files)])
+    _git(repo, 'add', '-A')
+    _git(repo, 'commit', '-q', '-m', 'initial')
+
+    for commit in range(history):
+        touched = range(commit, files, history)
+        for index in touched:
+            revision_counts[index] += 1
+        write_workbooks([(fixture_path(repo, index), index, revision_counts[index],
+                          params["sheets"], params["data_rows"]) for index in touched])
+        _git(repo, 'add', '-A')
+        _git(repo, 'commit', '-q', '-m', f'history {commit + 1}')
+
+    modified_count = max(1, round(files * params["modified_ratio"]))
+    modify_workbooks(repo, params, revision_counts, modified_count)
+    return revision_counts
+
+
+def clear_caches(repo):
+    """删除检查结果缓存和远程修订记录缓存"""
+    for name in os.listdir(repo):
+        if name.startswith(".excel_cache.db"):
+            os.remove(os.path.join(repo, name))
+    shutil.rmtree(os.path.join(repo, ".git", "excel_checker"), ignore_errors=True)
+
+
+def _peak_rss_mb():
+    """当前进程及其子进程的峰值内存（MB）"""
+    if resource is None:
+        return None
+    peak = max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+               resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+    # Linux以KB为单位，macOS以字节为单位
+    if sys.platform == "darwin":
+        return round(peak / (1024 * 1024), 1)
+    return round(peak / 1024, 1)
+
+
+def run_scenario(scenario):
+    """在子进程中运行单个场景（当前目录为基准仓库），结果以JSON输出"""
+    sys.path.insert(0, PACKAGE_DIR)
+    from excel_checker import ExcelChecker
+
+    mode = scenario.split("_")[0]
+    start = time.perf_counter()
+    with open(os.devnull, 'w', encoding='utf-8') as devnull, contextlib.redirect_stdout(devnull):
+        checker = ExcelChecker()
+        try:
+            if mode == "staged":
+                staged_oids, error = checker.get_staged_files()
+                if error:
+                    raise RuntimeError(error)
+                file_count = len(staged_oids)
+                success = checker.check_staged_files(staged_oids)
+            else:
+                file_count = len(os.listdir(EXCEL_DIR))
+                success = checker.check_files()
+        finally:
+            checker.close()
+    wall = time.perf_counter() - start
+
+    print(json.dumps({
+        "wall_seconds": round(wall, 4),
+        "files": file_count,
+        "files_per_second": round(file_count / wall, 2) if wall > 0 else None,
+        "peak_rss_mb": _peak_rss_mb(),
+        "success": success
+    }))
+
+
+def _diff_names(repo, *args):
+    """git diff列出的excel文件路径集合"""
+    output = subprocess.run(['git', 'diff', '--name-only', '-z'] + list(args) + ['--', EXCEL_DIR],
+                            cwd=repo, capture_output=True, check=True).stdout
+    return {name for name in output.split(b"\0") if name}
+
+
+def remote_identical_ratio(repo, scenario):
+    """
+    检查的文件中与main分支内容相同的比例（检查时走内容相同的捷径），不计入场景耗时
+    暂存区场景只检查暂存的文件，比较暂存区；其余场景检查全部文件，比较工作区
+    """
+    if scenario.startswith("staged"):
+        checked = len(_diff_names(repo, '--cached', 'HEAD'))
+        differing = len(_diff_names(repo, '--cached', 'main'))
+    else:
+        checked = len(os.listdir(os.path.join(repo, EXCEL_DIR)))
+        differing = len(_diff_names(repo, 'main'))
+    return round(1 - differing / checked, 3) if checked else None
+
+
+def _run_child(repo, scenario):
+    """启动子进程运行场景，每个场景的峰值内存单独统计"""
+    output = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), '--run-scenario', scenario],
+        cwd=repo, capture_output=True, text=True, encoding='utf-8'
+    )
+    if output.returncode != 0:
+        raise RuntimeError(f"场景 {scenario} 运行失败:\n{output.stderr}")
+    return json.loads(output.stdout.strip().splitlines()[-1])
+
+
+def run_benchmark(params, keep_repo=None):
+    """构造基准仓库并依次运行所有场景"""
+    repo = keep_repo or tempfile.mkdtemp(prefix="excel_benchmark_")
+    try:
+        print(f"构造基准仓库: {repo}")
+        start = time.perf_counter()
+        revision_counts = build_fixture(repo, params)
+        print(f"  完成，用时 {time.perf_counter() - start:.1f} 秒")
+
+        scenarios = {}
+        for scenario in SCENARIOS:
+            if scenario == "staged_cold":
+                _git(repo, 'add', '--', EXCEL_DIR)
+            if scenario == "diverged_cold":
+                modify_workbooks(repo, params, revision_counts, params["files"])
+            if scenario.endswith("_cold"):
+                clear_caches(repo)
+            identical = remote_identical_ratio(repo, scenario)
+            scenarios[scenario] = _run_child(repo, scenario)
+            result = scenarios[scenario]
+            result["remote_identical_ratio"] = identical
+            print(f"  {scenario:<13} {result['wall_seconds']:>8.3f} 秒  "
+                  f"{result['files_per_second'] or 0:>9.1f} 文件/秒  "
+                  f"峰值内存 {result['peak_rss_mb']} MB  "
+                  f"与远程相同 {identical:.0%}")
+    finally:
+        if keep_repo is None:
+            shutil.rmtree(repo, ignore_errors=True)
+
+    return {
+        "version": RESULT_VERSION,
+        "params": params,
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count()
+        },
+        "scenarios": scenarios
+    }
+
+
+def compare_with_baseline(results, baseline, threshold):
+    """与基线比较，返回耗时增长超过阈值的场景列表"""
+    if baseline.get("params") != results["params"]:
+        print("警告: 基线的参数与本次运行不同，比较结果仅供参考")
+
+    regressions = []
+    print("与基线比较:")
+    for scenario, result in results["scenarios"].items():
+        base = baseline.get("scenarios", {}).get(scenario)
+        if not base or not base.get("wall_seconds"):
+            print(f"  {scenario:<13} 基线中没有该场景")
+            continue
+        ratio = result["wall_seconds"] / base["wall_seconds"]
+        result["baseline_ratio"] = round(ratio, 3)
+        regressed = ratio > 1 + threshold
+        print(f"  {scenario:<13} {ratio:>6.2f}x{'  [变慢]' if regressed else ''}")
+        if regressed:
+            regressions.append(scenario)
+    return regressions
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description='Excel检查器性能基准测试')
+    parser.add_argument('--files', type=int, default=200, help='工作簿数量')
+    parser.add_argument('--sheets', type=int, default=5, help='每个工作簿的sheet数（含修改记录）')
+    parser.add_argument('--rows', type=int, default=100, help='每个工作簿的修订记录行数')
+    parser.add_argument('--data-rows', type=int, default=20, help='每个数据sheet的行数')
+    parser.add_argument('--history', type=int, default=3, help='远程分支的历史提交数')
+    parser.add_argument('--modified-ratio', type=float, default=0.1, help='本地修改的文件比例')
+    parser.add_argument('--executor', default='auto', help='执行引擎（thread/process/asyncio/auto）')
+    parser.add_argument('--output', help='结果JSON文件路径')
+    parser.add_argument('--baseline', help='用于比较的基线结果JSON文件')
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help='允许的耗时增长比例，超过时返回非零状态码')
+    parser.add_argument('--keep-repo', help='在指定目录构造仓库并保留（目录须不存在）')
+    parser.add_argument('--run-scenario', choices=SCENARIOS, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run_scenario:
+        run_scenario(args.run_scenario)
+        return
+
+    params = {
+        "files": args.files,
+        "sheets": args.sheets,
+        "rows": args.rows,
+        "data_rows": args.data_rows,
+        "history": max(0, args.history),
+        "modified_ratio": args.modified_ratio,
+        "executor": args.executor
+    }
+    if args.keep_repo:
+        os.makedirs(args.keep_repo)
+    results = run_benchmark(params, args.keep_repo)
+
+    regressions = []
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            regressions = compare_with_baseline(results, json.load(f), args.threshold)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+        print(f"结果已保存到 {args.output}")
+    else:
+        print(json.dumps(results, ensure_ascii=False, indent=2))
+
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
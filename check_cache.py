@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+检查结果缓存
+使用SQLite（WAL模式）保存每个文件的检查结果，按条目增量写入，
+多个进程同时运行时由SQLite负责加锁，旧版本的JSON缓存会在首次打开时导入一次
+"""
+
+import json
+import os
+import sqlite3
+import threading
+
+SCHEMA_VERSION = 1
+# 其他进程持有写锁时的最长等待时间（毫秒）
+BUSY_TIMEOUT_MS = 10000
+
+
+class CheckCache:
+    """按文件路径保存检查结果的SQLite缓存，可在多个线程间共享"""
+
+    def __init__(self, db_path, legacy_json=None):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, timeout=BUSY_TIMEOUT_MS / 1000,
+                                     check_same_thread=False, isolation_level=None)
+        self._conn.execute(f"PRAGMA busy_timeout={BUSY_TIMEOUT_MS}")
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._create_tables()
+        if legacy_json:
+            self._import_legacy_json(legacy_json)
+
+    def _create_tables(self):
+        """创建数据表"""
+        with self._lock:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS entries ("
+                "path TEXT PRIMARY KEY, entry TEXT NOT NULL)"
+            )
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS meta ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL)"
+            )
+            self._conn.execute(
+                "INSERT OR IGNORE INTO meta (key, value) VALUES ('schema_version', ?)",
+                (str(SCHEMA_VERSION),)
+            )
+
+    def _import_legacy_json(self, json_path):
+        """导入旧版本的JSON缓存（只导入一次）"""
+        if not os.path.exists(json_path):
+            return
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                imported = self._conn.execute(
+                    "SELECT 1 FROM meta WHERE key = 'legacy_json_imported'"
+                ).fetchone()
+                if imported is None:
+                    try:
+                        with open(json_path, 'r', encoding='utf-8') as f:
+                            legacy = json.load(f)
+                    except (OSError, ValueError):
+                        legacy = {}
+                    # 已有的新条目优先，不被旧数据覆盖
+                    self._conn.executemany(
+                        "INSERT OR IGNORE INTO entries (path, entry) VALUES (?, ?)",
+                        [(path, json.dumps(entry, ensure_ascii=False))
+                         for path, entry in legacy.items() if isinstance(entry, dict)]
+                    )
+                    self._conn.execute(
+                        "INSERT INTO meta (key, value) VALUES ('legacy_json_imported', '1')"
+                    )
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def get(self, path, default=None):
+        """读取文件的缓存条目"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT entry FROM entries WHERE path = ?", (path,)
+            ).fetchone()
+        if row is None:
+            return default
+        return json.loads(row[0])
+
+    def __contains__(self, path):
+        return self.get(path) is not None
+
+    def put(self, path, entry):
+        """写入（或覆盖）文件的缓存条目"""
+        data = json.dumps(entry, ensure_ascii=False)
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO entries (path, entry) VALUES (?, ?) "
+                "ON CONFLICT(path) DO UPDATE SET entry = excluded.entry",
+                (path, data)
+            )
+
+    def delete(self, path):
+        """删除文件的缓存条目"""
+        with self._lock:
+            self._conn.execute("DELETE FROM entries WHERE path = ?", (path,))
+
+    def paths(self):
+        """所有已缓存的文件路径"""
+        with self._lock:
+            return [row[0] for row in self._conn.execute("SELECT path FROM entries")]
+
+    def prune_missing(self, base_dir=None):
+        """删除对应文件已不存在的条目，返回删除的数量"""
+        missing = [
+            path for path in self.paths()
+            if not os.path.exists(os.path.join(base_dir, path) if base_dir else path)
+        ]
+        if missing:
+            with self._lock:
+                self._conn.executemany(
+                    "DELETE FROM entries WHERE path = ?", [(path,) for path in missing]
+                )
+        return len(missing)
+
+    def close(self):
+        """关闭数据库连接"""
+        with self._lock:
+            self._conn.close()
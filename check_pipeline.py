@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+asyncio检查流水线
+枚举 → 指纹 → 获取 → 解析 四个阶段通过有界队列连接，每个阶段有独立的并发数：
+指纹阶段在线程中完成stat、读取和哈希，获取阶段通过asyncio子进程读取git blob，
+解析阶段交给执行器，慢的git调用不会占用解析的并发名额
+"""
+
+import asyncio
+import os
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from git_blobs import AsyncBlobReader, BlobFetchError
+
+# 阶段结束标记
+_DONE = object()
+
+
+def _completed(result=None, exception=None):
+    """将结果或异常包装为已完成的future"""
+    future = Future()
+    if exception is not None:
+        future.set_exception(exception)
+    else:
+        future.set_result(result)
+    return future
+
+
+class CheckPipeline:
+    """
+    ExcelChecker的asyncio执行引擎
+    每个文件的结果（future）产生后立即通过on_result(相对路径, future)回调返回
+    """
+
+    def __init__(self, checker, file_list, staged_oids, on_result,
+                 evaluate, parse_executor_factory):
+        self.checker = checker
+        self.file_list = file_list
+        self.staged_oids = staged_oids
+        self.on_result = on_result
+        self.evaluate = evaluate
+        self.parse_executor_factory = parse_executor_factory
+        config = checker.config
+        self.queue_size = config['pipeline_queue_size']
+        self.fingerprint_concurrency = config['pipeline_fingerprint_concurrency']
+        self.fetch_concurrency = config['pipeline_fetch_concurrency']
+        self.parse_concurrency = config['pipeline_parse_concurrency'] or os.cpu_count() or 1
+        self._io_pool = None
+        self._parse_pool = None
+
+    async def run(self):
+        """运行流水线直到所有文件检查完成"""
+        fingerprint_queue = asyncio.Queue(self.queue_size)
+        fetch_queue = asyncio.Queue(self.queue_size)
+        parse_queue = asyncio.Queue(self.queue_size)
+        self._io_pool = ThreadPoolExecutor(max_workers=self.fingerprint_concurrency)
+        try:
+            await asyncio.gather(
+                self._enumerate(fingerprint_queue),
+                self._run_stage(self._fingerprint, self.fingerprint_concurrency,
+                                fingerprint_queue, fetch_queue),
+                self._run_fetch_stage(fetch_queue, parse_queue),
+                self._run_stage(self._parse, self.parse_concurrency, parse_queue, None)
+            )
+        finally:
+            self._io_pool.shutdown(wait=True)
+            if self._parse_pool is not None:
+                self._parse_pool.shutdown(wait=True)
+
+    async def _enumerate(self, outbox):
+        """枚举阶段：依次放入待检查的文件"""
+        for filepath, relative_path in self.file_list:
+            await outbox.put((relative_path, filepath, self.staged_oids.get(relative_path)))
+        await outbox.put(_DONE)
+
+    async def _run_stage(self, handler, concurrency, inbox, outbox, *args):
+        """
+        以指定并发数运行一个阶段，上游结束后向下游传递结束标记
+        队列中的每一项都以文件的相对路径开头
+        """
+        async def worker():
+            while True:
+                item = await inbox.get()
+                if item is _DONE:
+                    # 让同一阶段的其他worker也能收到结束标记
+                    await inbox.put(_DONE)
+                    return
+                relative_path = item[0]
+                try:
+                    forwarded = await handler(item, *args)
+                except Exception as e:
+                    self.on_result(relative_path, _completed(exception=e))
+                    continue
+                if forwarded is not None:
+                    await outbox.put(forwarded)
+
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        if outbox is not None:
+            await outbox.put(_DONE)
+
+    async def _run_fetch_stage(self, inbox, outbox):
+        """获取阶段：每个worker独占一个 git cat-file 子进程"""
+        readers = [AsyncBlobReader(timeout=self.checker.config['timeout'])
+                   for _ in range(self.fetch_concurrency)]
+        reader_pool = asyncio.Queue()
+        for reader in readers:
+            reader_pool.put_nowait(reader)
+        try:
+            await self._run_stage(self._fetch, self.fetch_concurrency, inbox, outbox, reader_pool)
+        finally:
+            for reader in readers:
+                await reader.close()
+
+    async def _in_io_pool(self, func, *args):
+        """在线程池中执行阻塞的文件读取和哈希计算"""
+        return await asyncio.get_running_loop().run_in_executor(self._io_pool, func, *args)
+
+    async def _fingerprint(self, item):
+        """指纹阶段：查询缓存；工作区文件在这里读取并计算哈希"""
+        relative_path, filepath, staged_oid = item
+        result, state = await self._in_io_pool(
+            self.checker._check_fingerprint, filepath, relative_path, staged_oid
+        )
+        if state is None:
+            self.on_result(relative_path, _completed(result))
+            return None
+        if staged_oid is not None:
+            # 暂存区内容由获取阶段从git读取
+            return relative_path, result, state, None
+
+        def read_and_hash():
+            with self.checker.profiler.span("local_read", relative_path):
+                content = self.checker._read_file(filepath)
+            return self.checker._check_content(result, state, content)
+
+        result, task = await self._in_io_pool(read_and_hash)
+        if task is None:
+            self.on_result(relative_path, _completed(result))
+            return None
+        return relative_path, result, state, task
+
+    async def _fetch(self, item, reader_pool):
+        """获取阶段：读取暂存区内容和远程blob"""
+        relative_path, result, state, task = item
+        profiler = self.checker.profiler
+        reader = await reader_pool.get()
+        try:
+            if task is None:
+                try:
+                    with profiler.span("local_read", relative_path):
+                        local_content = await reader.read(state["staged_oid"])
+                except BlobFetchError as e:
+                    result["status"] = "error"
+                    result["errors"].append(f"读取暂存区文件失败: {str(e)}")
+                    self.on_result(relative_path, _completed(result))
+                    return None
+                result, task = await self._in_io_pool(
+                    self.checker._check_content, result, state, local_content
+                )
+                if task is None:
+                    self.on_result(relative_path, _completed(result))
+                    return None
+
+            with profiler.span("remote_fetch", relative_path):
+                # 多个分支指向同一个blob时只读取一次
+                for ref in self.checker.config['target_refs']:
+                    oid, error = self.checker._get_remote_oid(relative_path, ref)
+                    remote = {"ref": ref, "oid": oid, "error": error}
+                    task["remotes"].append(remote)
+                    if oid is None or oid in task["remote_blobs"]:
+                        continue
+
+                    cached = await self._in_io_pool(self.checker._get_cached_remote_records, oid)
+                    records, fingerprints = cached or (None, None)
+                    content = None
+                    if records is None or fingerprints is None:
+                        # 旧的缓存条目没有sheet指纹，读取blob重新计算
+                        try:
+                            content = await reader.read(oid)
+                        except BlobFetchError as e:
+                            if records is None:
+                                remote["error"] = f"获取远程文件失败: {str(e)}"
+                                continue
+                        if content is not None:
+                            content, error = self.checker._resolve_remote_lfs(content)
+                            if error and records is None:
+                                remote["error"] = error
+                                continue
+                    task["remote_blobs"][oid] = {
+                        "content": content, "records": records, "fingerprints": fingerprints
+                    }
+        finally:
+            reader_pool.put_nowait(reader)
+        return relative_path, task
+
+    async def _parse(self, item):
+        """解析阶段：在执行器中解析并比较修订记录"""
+        relative_path, task = item
+        if self._parse_pool is None:
+            # 只有真正需要解析时才创建执行器（可能是进程池）
+            self._parse_pool = self.parse_executor_factory()
+        result = await asyncio.get_running_loop().run_in_executor(
+            self._parse_pool, self.evaluate, task
+        )
+        self.on_result(relative_path, _completed(result))
+        return None
@@ -0,0 +1,419 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+常驻检查服务
+服务进程保持检查结果缓存、解析过的远程修订记录和 git cat-file 进程常驻，
+pre-commit钩子作为轻量客户端通过本地socket（Windows上为命名管道）发送检查请求。
+服务未运行时钩子在自身进程中检查；服务空闲超过指定时间或检查器代码更新后自动退出。
+客户端部分只依赖标准库，不导入openpyxl
+
+用法: python checker_daemon.py start|stop|status|serve
+"""
+
+import contextlib
+import hashlib
+import io
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from multiprocessing.connection import AuthenticationError, Client, Listener
+
+PACKAGE_DIR = os.path.dirname(os.path.abspath(__file__))
+CONFIG_FILE = "config.json"
+# 服务状态文件（地址、进程ID、认证密钥），位于git目录下
+STATE_FILE = "excel_checker_daemon.json"
+DEFAULT_IDLE_TIMEOUT = 1800
+# 等待服务返回检查结果的最长时间（秒），超时后改为在钩子进程中检查
+RESPONSE_TIMEOUT = 600
+# 启动服务后等待其就绪的最长时间（秒）
+START_TIMEOUT = 10
+# 需要转发给服务的git环境变量（git commit -a 等情况下钩子使用临时索引文件）
+FORWARDED_ENV = ("GIT_INDEX_FILE",)
+# 常驻服务在内存中保留的远程修订记录条目数
+MEMORY_RECORD_ENTRIES = 1024
+# 启动时用于创建缓存对象的配置项，修改后重新创建远程修订记录缓存和共享缓存层
+CACHE_CONFIG_KEYS = (
+    "remote_cache_dir", "remote_cache_max_mb", "shared_cache_dir",
+    "shared_cache_notes_ref", "shared_cache_readonly", "timeout"
+)
+
+
+def _git_dir(root):
+    """仓库的git目录（工作区各自独立）"""
+    try:
+        result = subprocess.run(
+            ['git', 'rev-parse', '--git-dir'],
+            capture_output=True,
+            text=True,
+            cwd=root
+        )
+    except OSError:
+        return None
+    if result.returncode != 0:
+        return None
+    return os.path.abspath(os.path.join(root, result.stdout.strip()))
+
+
+def _state_path(root):
+    """服务状态文件路径"""
+    git_dir = _git_dir(root)
+    if git_dir is None:
+        return None
+    return os.path.join(git_dir, STATE_FILE)
+
+
+def _address(root):
+    """服务监听地址，每个工作区一个"""
+    key = hashlib.sha1(os.path.abspath(root).encode('utf-8')).hexdigest()[:16]
+    if sys.platform == "win32":
+        return rf"\\.\pipe\excel_checker_{key}"
+    # Unix socket路径长度有限（约108字节），放在临时目录下
+    return os.path.join(tempfile.gettempdir(), f"excel_checker_{key}.sock")
+
+
+def load_daemon_config(root):
+    """读取服务相关的配置（不导入检查器）"""
+    config = {"daemon": False, "daemon_idle_timeout": DEFAULT_IDLE_TIMEOUT}
+    path = os.path.join(root, CONFIG_FILE)
+    if os.path.exists(path):
+        with open(path, 'r', encoding='utf-8') as f:
+            loaded = json.load(f)
+        config.update({key: loaded[key] for key in config if key in loaded})
+    return config
+
+
+def _source_stamp():
+    """检查器代码的修改时间，用于发现代码更新后的过期服务"""
+    stamps = []
+    for name in os.listdir(PACKAGE_DIR):
+        if name.endswith(".py"):
+            try:
+                stamps.append(os.stat(os.path.join(PACKAGE_DIR, name)).st_mtime_ns)
+            except OSError:
+                pass
+    return max(stamps, default=0)
+
+
+def _read_state(root):
+    """读取服务状态文件，服务未运行时返回None"""
+    path = _state_path(root)
+    if path is None:
+        return None
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def send_request(root, message, timeout=RESPONSE_TIMEOUT):
+    """向服务发送请求，服务不可用时返回None"""
+    state = _read_state(root)
+    if state is None:
+        return None
+    try:
+        with Client(state["address"], authkey=bytes.fromhex(state["authkey"])) as conn:
+            conn.send(message)
+            if not conn.poll(timeout):
+                return None
+            return conn.recv()
+    except (OSError, EOFError, AuthenticationError, KeyError, ValueError):
+        return None
+
+
+def start_daemon(root):
+    """在后台启动服务进程（已有服务在运行时新进程会自行退出）"""
+    command = [sys.executable, os.path.abspath(__file__), 'serve']
+    options = {
+        "cwd": root,
+        "stdin": subprocess.DEVNULL,
+        "stdout": subprocess.DEVNULL,
+        "stderr": subprocess.DEVNULL
+    }
+    if sys.platform == "win32":
+        options["creationflags"] = subprocess.DETACHED_PROCESS | subprocess.CREATE_NEW_PROCESS_GROUP
+    else:
+        options["start_new_session"] = True
+    try:
+        subprocess.Popen(command, **options)
+    except OSError:
+        return False
+    return True
+
+
+def _check_staged_in_process(checker=None):
+    """
+    检查暂存区中的Excel文件，返回 (文件数, 是否通过)
+    无法获取暂存区文件时文件数为None
+    """
+    from excel_checker import ExcelChecker
+
+    owned = checker is None
+    if owned:
+        checker = ExcelChecker()
+    try:
+        staged_oids, error = checker.get_staged_files()
+        if error is not None:
+            return None, True
+        if not staged_oids:
+            return 0, True
+        print(f"Found {len(staged_oids)} Excel files to check")
+        return len(staged_oids), checker.check_staged_files(staged_oids)
+    finally:
+        if owned:
+            checker.close()
+
+
+def check_staged(root):
+    """
+    钩子入口：启用了常驻服务时交给服务检查，否则（或服务不可用时）在当前进程中检查
+    返回 (文件数, 是否通过)
+    """
+    config = load_daemon_config(root)
+    if config["daemon"]:
+        env = {key: os.environ[key] for key in FORWARDED_ENV if key in os.environ}
+        response = send_request(root, {"command": "check_staged", "env": env})
+        if response is not None and response.get("status") == "ok":
+            sys.stdout.write(response["output"])
+            return response["staged_count"], response["success"]
+        if response is None or response.get("status") == "stale":
+            # 服务未运行或代码已更新，在后台启动新服务供下次提交使用
+            start_daemon(root)
+    return _check_staged_in_process()
+
+
+class CheckerDaemon:
+    """常驻检查服务，依次处理请求"""
+
+    def __init__(self, root, idle_timeout=DEFAULT_IDLE_TIMEOUT):
+        self.root = os.path.abspath(root)
+        self.idle_timeout = idle_timeout
+        self.address = _address(self.root)
+        self.authkey = os.urandom(32)
+        self.stamp = _source_stamp()
+        self.started = time.time()
+        self.requests = 0
+        self.checker = None
+        self._last_activity = time.monotonic()
+        self._busy = False
+        self._stopping = False
+
+    def serve(self):
+        """监听并处理请求，直到空闲超时或收到停止请求"""
+        os.chdir(self.root)
+        if not self._claim_address():
+            print("检查服务已在运行")
+            return
+
+        sys.path.insert(0, PACKAGE_DIR)
+        from excel_checker import ExcelChecker
+
+        self.checker = ExcelChecker()
+        self.checker.keep_git_process = True
+        self._keep_records_in_memory()
+
+        listener = Listener(self.address, authkey=self.authkey)
+        state_path = _state_path(self.root)
+        try:
+            self._write_state(state_path)
+            threading.Thread(target=self._watch_idle, daemon=True).start()
+            while not self._stopping:
+                try:
+                    conn = listener.accept()
+                except (OSError, EOFError, AuthenticationError):
+                    continue
+                with conn:
+                    try:
+                        message = conn.recv()
+                    except (OSError, EOFError):
+                        continue
+                    self._busy = True
+                    try:
+                        response = self._handle(message)
+                        try:
+                            conn.send(response)
+                        except OSError:
+                            pass
+                    finally:
+                        self._busy = False
+                        self._last_activity = time.monotonic()
+        finally:
+            listener.close()
+            self._remove_state(state_path)
+            self.checker.close()
+
+    def _keep_records_in_memory(self):
+        """在内存中额外保留最近使用的远程修订记录"""
+        if self.checker.record_cache is not None:
+            self.checker.record_cache.memory_entries = MEMORY_RECORD_ENTRIES
+
+    def _reload_config(self):
+        """重新读取配置；缓存相关的配置有变化时重新创建缓存对象"""
+        config = self.checker._load_config(CONFIG_FILE)
+        changed = any(config[key] != self.checker.config[key] for key in CACHE_CONFIG_KEYS)
+        self.checker.config = config
+        self.checker.blob_fetcher.timeout = config['timeout']
+        if changed:
+            self.checker.record_cache = self.checker._create_record_cache()
+            self._keep_records_in_memory()
+
+    def _claim_address(self):
+        """已有服务在监听时返回False；清理崩溃后残留的socket文件"""
+        if send_request(self.root, {"command": "status"}, timeout=5):
+            return False
+        if sys.platform != "win32" and os.path.exists(self.address):
+            try:
+                os.unlink(self.address)
+            except OSError:
+                pass
+        return True
+
+    def _write_state(self, path):
+        """写入状态文件，只有当前用户可读"""
+        data = {
+            "pid": os.getpid(),
+            "address": self.address,
+            "authkey": self.authkey.hex(),
+            "root": self.root
+        }
+        fd = os.open(path + ".tmp", os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(data, f)
+        os.replace(path + ".tmp", path)
+
+    def _remove_state(self, path):
+        """删除状态文件（只删除自己写入的）"""
+        state = _read_state(self.root)
+        if state is not None and state.get("pid") == os.getpid():
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def _watch_idle(self):
+        """空闲超时后唤醒监听循环并退出"""
+        while not self._stopping:
+            time.sleep(min(60, max(1, self.idle_timeout / 10)))
+            if not self._busy and time.monotonic() - self._last_activity >= self.idle_timeout:
+                send_request(self.root, {"command": "shutdown"}, timeout=5)
+                return
+
+    def _handle(self, message):
+        """处理一个请求"""
+        command = message.get("command") if isinstance(message, dict) else None
+        if command == "shutdown":
+            self._stopping = True
+            return {"status": "ok"}
+        if command == "status":
+            return {
+                "status": "ok",
+                "pid": os.getpid(),
+                "root": self.root,
+                "uptime": round(time.time() - self.started),
+                "requests": self.requests
+            }
+        if command == "check_staged":
+            if _source_stamp() != self.stamp:
+                # 检查器代码已更新，由客户端自行检查并启动新服务
+                self._stopping = True
+                return {"status": "stale"}
+            self.requests += 1
+            return self._check_staged(message.get("env") or {})
+        return {"status": "error", "message": f"未知的请求: {command}"}
+
+    def _check_staged(self, env):
+        """在服务进程中检查暂存区，输出随结果返回给客户端"""
+        saved_env = {key: os.environ.get(key) for key in FORWARDED_ENV}
+        output = io.StringIO()
+        try:
+            for key in FORWARDED_ENV:
+                if key in env:
+                    os.environ[key] = env[key]
+                else:
+                    os.environ.pop(key, None)
+            # 每次请求重新读取配置，清空上次的结果
+            self._reload_config()
+            self.checker.errors = []
+            self.checker.warnings = []
+            with contextlib.redirect_stdout(output):
+                staged_count, success = _check_staged_in_process(self.checker)
+        except Exception as e:
+            return {"status": "error", "message": str(e)}
+        finally:
+            for key, value in saved_env.items():
+                if value is None:
+                    os.environ.pop(key, None)
+                else:
+                    os.environ[key] = value
+        return {
+            "status": "ok",
+            "staged_count": staged_count,
+            "success": success,
+            "output": output.getvalue()
+        }
+
+
+def _repo_root():
+    """当前目录所在的仓库根目录"""
+    result = subprocess.run(
+        ['git', 'rev-parse', '--show-toplevel'],
+        capture_output=True,
+        text=True
+    )
+    if result.returncode != 0:
+        return None
+    return result.stdout.strip()
+
+
+def main():
+    """主函数"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Excel检查常驻服务')
+    parser.add_argument('command', choices=['start', 'stop', 'status', 'serve'])
+    parser.add_argument('--idle-timeout', type=int,
+                        help='空闲多少秒后自动退出（默认读取配置 daemon_idle_timeout）')
+    args = parser.parse_args()
+
+    root = _repo_root()
+    if root is None:
+        print("当前目录不是Git仓库")
+        sys.exit(1)
+
+    if args.command == "serve":
+        idle_timeout = args.idle_timeout or load_daemon_config(root)["daemon_idle_timeout"]
+        CheckerDaemon(root, idle_timeout).serve()
+    elif args.command == "start":
+        if send_request(root, {"command": "status"}, timeout=5):
+            print("检查服务已在运行")
+            return
+        start_daemon(root)
+        deadline = time.monotonic() + START_TIMEOUT
+        while time.monotonic() < deadline:
+            status = send_request(root, {"command": "status"}, timeout=5)
+            if status:
+                print(f"检查服务已启动（进程 {status['pid']}）")
+                return
+            time.sleep(0.1)
+        print("检查服务启动失败")
+        sys.exit(1)
+    elif args.command == "stop":
+        if send_request(root, {"command": "shutdown"}, timeout=5) is None:
+            print("检查服务未运行")
+        else:
+            print("检查服务已停止")
+    else:
+        status = send_request(root, {"command": "status"}, timeout=5)
+        if status is None:
+            print("检查服务未运行")
+        else:
+            print(f"检查服务运行中: 进程 {status['pid']}，已运行 {status['uptime']} 秒，"
+                  f"处理请求 {status['requests']} 次")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,268 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+CI分片检查
+按文件大小把待检查的文件确定性地分配到多个CI节点（各节点检出同一提交时分配结果完全相同），
+每个分片的检查结果写入NDJSON文件，merge子命令合并所有分片的结果并给出总的退出状态
+
+用法: python excel_checker.py --all --shard 2/4 [--shard-output FILE]
+      python excel_checker.py merge FILE ... [--output FILE]
+"""
+
+import argparse
+import heapq
+import json
+import os
+import sys
+import time
+from datetime import datetime
+
+# 结果文件格式版本，格式不兼容时递增
+SHARD_FORMAT_VERSION = 1
+# 合并结果中列出的最慢文件数
+SLOWEST_FILES = 5
+
+
+def parse_shard(text):
+    """解析 "序号/总数"（序号从1开始），返回 ((序号, 总数), 错误信息)"""
+    index, sep, count = text.partition('/')
+    try:
+        index, count = int(index), int(count)
+    except ValueError:
+        sep = None
+    if not sep:
+        return None, f"分片格式应为 序号/总数（例如 2/4）: {text}"
+    if count < 1 or not 1 <= index <= count:
+        return None, f"分片序号应在 1 到 {max(count, 1)} 之间: {text}"
+    return (index, count), None
+
+
+def default_shard_output(index, count):
+    """分片结果文件的默认路径"""
+    return f"excel_check_shard_{index}_of_{count}.ndjson"
+
+
+def _file_size(filepath):
+    """文件大小，文件不存在时按0计算"""
+    try:
+        return os.path.getsize(filepath)
+    except OSError:
+        return 0
+
+
+def partition(file_list, count):
+    """
+    按文件大小把 [(文件路径, 相对路径)] 分成count份，各份的总大小尽量接近
+    从大到小依次分给当前总大小最小的分片（大小相同时按相对路径排序），结果与枚举顺序无关
+    """
+    files = sorted(file_list, key=lambda item: (-_file_size(item[0]), item[1]))
+    shards = [[] for _ in range(count)]
+    # (已分配的总大小, 分片序号)
+    loads = [(0, index) for index in range(count)]
+    for item in files:
+        load, index = heapq.heappop(loads)
+        shards[index].append(item)
+        heapq.heappush(loads, (load + _file_size(item[0]), index))
+    for shard in shards:
+        shard.sort(key=lambda item: item[1])
+    return shards
+
+
+def select_shard(file_list, index, count):
+    """返回第index个分片（从1开始）的文件列表"""
+    return partition(file_list, count)[index - 1]
+
+
+class ShardResultWriter:
+    """
+    逐行写入分片检查结果（NDJSON）
+    第一行为分片信息，随后每个文件一行，最后一行为汇总；没有汇总行说明该分片未正常结束
+    """
+
+    def __init__(self, path, index, count, total, refs):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self.counts = {"pass": 0, "skipped": 0, "error": 0}
+        self._started = time.monotonic()
+        self._file = open(path, 'w', encoding='utf-8')
+        self._write({
+            "type": "shard",
+            "version": SHARD_FORMAT_VERSION,
+            "index": index,
+            "count": count,
+            "total": total,
+            "refs": refs,
+            "started": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        })
+
+    def _write(self, record):
+        self._file.write(json.dumps(record, ensure_ascii=False) + "\n")
+        # 逐行刷新，节点中途失败时已完成的结果仍然可见
+        self._file.flush()
+
+    def write_result(self, path, status, errors=(), warnings=(), duration=None):
+        """写入单个文件的检查结果，duration为从开始处理到得到结果的秒数"""
+        self.counts[status] += 1
+        self._write({
+            "type": "file",
+            "path": path,
+            "status": status,
+            "errors": list(errors),
+            "warnings": list(warnings),
+            "duration": None if duration is None else round(duration, 3)
+        })
+
+    def close(self):
+        """写入汇总行并关闭文件"""
+        self._write({
+            "type": "summary",
+            "passed": self.counts["pass"],
+            "skipped": self.counts["skipped"],
+            "failed": self.counts["error"],
+            "elapsed": round(time.monotonic() - self._started, 3)
+        })
+        self._file.close()
+
+
+def read_shard_result(path):
+    """读取分片结果文件，返回 ({"header", "files", "summary"}, 错误信息)"""
+    shard = {"path": path, "header": None, "files": [], "summary": None}
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            for line_number, line in enumerate(f, 1):
+                if not line.strip():
+                    continue
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    return None, f"{path} 第 {line_number} 行不是有效的JSON"
+                kind = record.get("type")
+                if kind == "shard":
+                    shard["header"] = record
+                elif kind == "file":
+                    shard["files"].append(record)
+                elif kind == "summary":
+                    shard["summary"] = record
+    except OSError as e:
+        return None, f"无法读取 {path}: {str(e)}"
+
+    header = shard["header"]
+    if header is None:
+        return None, f"{path} 不是分片结果文件（缺少分片信息）"
+    if header.get("version") != SHARD_FORMAT_VERSION:
+        return None, f"{path} 的格式版本 {header.get('version')} 不受支持"
+    return shard, None
+
+
+def merge_shards(shards):
+    """
+    合并分片结果，返回合并报告
+    所有分片的总数必须一致，且每个序号恰好出现一次并正常结束，否则记为问题
+    """
+    problems = []
+    counts = {header["count"] for header in (shard["header"] for shard in shards)}
+    if len(counts) > 1:
+        problems.append(f"各分片的分片总数不一致: {', '.join(str(c) for c in sorted(counts))}")
+    count = max(counts)
+
+    by_index = {}
+    for shard in shards:
+        by_index.setdefault(shard["header"]["index"], []).append(shard)
+    for index in range(1, count + 1):
+        found = by_index.get(index, [])
+        if not found:
+            problems.append(f"缺少分片 {index}/{count} 的结果")
+        elif len(found) > 1:
+            problems.append(f"分片 {index}/{count} 有多个结果文件: {', '.join(s['path'] for s in found)}")
+    for shard in shards:
+        if shard["summary"] is None:
+            header = shard["header"]
+            problems.append(f"分片 {header['index']}/{header['count']} 未正常结束（{shard['path']} 缺少汇总行）")
+
+    totals = {shard["header"]["total"] for shard in shards}
+    if len(totals) > 1:
+        # 各节点检出的提交不同时分配结果不同，可能有文件被漏检
+        problems.append(f"各分片的文件总数不一致（{', '.join(str(t) for t in sorted(totals))}），请确认所有节点检出了同一提交")
+
+    files = sorted((item for shard in shards for item in shard["files"]), key=lambda item: item["path"])
+    checked = len({item["path"] for item in files})
+    if len(totals) == 1 and not problems and checked != totals.pop():
+        problems.append(f"合并后的文件数 {checked} 与分片记录的文件总数不一致")
+
+    return {
+        "shards": [
+            {"path": shard["path"], "index": shard["header"]["index"],
+             "count": shard["header"]["count"], "summary": shard["summary"]}
+            for shard in sorted(shards, key=lambda shard: shard["header"]["index"])
+        ],
+        "problems": problems,
+        "passed": sum(1 for item in files if item["status"] == "pass"),
+        "skipped": sum(1 for item in files if item["status"] == "skipped"),
+        "failed": [item for item in files if item["status"] == "error"],
+        "slowest": sorted(
+            (item for item in files if item.get("duration") is not None),
+            key=lambda item: -item["duration"]
+        )[:SLOWEST_FILES],
+        "files": files
+    }
+
+
+def print_report(report):
+    """输出合并结果"""
+    print("-" * 60)
+    for shard in report["shards"]:
+        summary = shard["summary"]
+        if summary is None:
+            continue
+        file_count = summary["passed"] + summary["skipped"] + summary["failed"]
+        print(f"分片 {shard['index']}/{shard['count']}: {file_count} 个文件, 耗时 {summary['elapsed']:.1f} 秒")
+    if report["slowest"]:
+        print("耗时最长的文件: " + ", ".join(
+            f"{item['path']} ({item['duration']:.2f} 秒)" for item in report["slowest"]
+        ))
+    print("-" * 60)
+    for item in report["failed"]:
+        print(f"[ERROR] {item['path']} - 检查失败")
+        for error in item["errors"]:
+            print(f"  错误: {error}")
+    for problem in report["problems"]:
+        print(f"[ERROR] {problem}")
+    print("-" * 60)
+    print(
+        f"合并 {len(report['shards'])} 个分片: 通过 {report['passed']} 个, "
+        f"跳过 {report['skipped']} 个, 失败 {len(report['failed'])} 个"
+    )
+
+
+def main(argv=None):
+    """合并子命令"""
+    parser = argparse.ArgumentParser(
+        prog='excel_checker.py merge',
+        description='合并各CI节点的分片检查结果，任一文件检查失败或分片结果缺失时返回非零状态码'
+    )
+    parser.add_argument('files', nargs='+', metavar='FILE', help='分片结果文件（--shard-output 的输出）')
+    parser.add_argument('--output', help='将合并结果保存为JSON文件')
+    args = parser.parse_args(argv)
+
+    shards = []
+    for path in args.files:
+        shard, error = read_shard_result(path)
+        if error:
+            print(error)
+            sys.exit(1)
+        shards.append(shard)
+
+    report = merge_shards(shards)
+    print_report(report)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"合并结果已保存到 {args.output}")
+
+    sys.exit(1 if report["failed"] or report["problems"] else 0)
+
+
+if __name__ == "__main__":
+    main()
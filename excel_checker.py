@@ -7,25 +7,91 @@ Excel文件检查器
 
 import os
 import sys
+import asyncio
+import contextlib
 import hashlib
+import io
 import json
-import subprocess
-import tempfile
+import multiprocessing
+import queue
+import threading
+import time
 from datetime import datetime
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    Future,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+    wait,
+)
 from openpyxl import load_workbook
+from git_blobs import (
+    BlobFetchError,
+    BlobMissingError,
+    GitBlobFetcher,
+    list_staged_blobs,
+    to_git_path,
+)
+from check_cache import CheckCache
+from ci_shards import ShardResultWriter, default_shard_output, parse_shard, select_shard
+from check_pipeline import CheckPipeline
+from file_scheduler import FileScheduler
+from file_watcher import WorkbookWatcher, is_workbook_name
+from git_lfs import LfsObject, LfsObjectStore, lfs_objects_dir, parse_pointer
+from profiling import NULL_PROFILER, Profiler
+from record_cache import RemoteRecordCache, default_cache_dir
+from shared_cache import DirectoryStore, GitNotesStore
+from revision_lineage import LineageMatcher
+from revision_log import RECORD_FIELDS, RevisionLog, normalize_row
+from xlsx_reader import XlsxSheetReader, read_sheet_rows, workbook_fingerprints
 
 # 常量定义
 EXCEL_DIR = "excels"
 RECORD_SHEET_NAME = "修改记录"
-CACHE_FILE = ".excel_cache.json"
+CACHE_FILE = ".excel_cache.db"
+# 旧版本的JSON缓存，首次打开新缓存时导入
+LEGACY_CACHE_FILE = ".excel_cache.json"
 CONFIG_FILE = "config.json"
+# 文件内容哈希算法：与git blob OID相同，暂存区文件可直接使用OID而无需重新计算
+# （旧版本缓存使用md5或blake2b，读取时自动迁移）
+HASH_ALGORITHM = "git-blob"
+LEGACY_HASH_ALGORITHM = "md5"
+# 修改时间距今不足该值（纳秒）的文件不记录指纹，避免同一时间粒度内的再次修改被漏检
+RACY_FINGERPRINT_NS = 2 * 10**9
+# auto模式下文件数达到该值才使用进程池（进程启动有固定开销）
+AUTO_PROCESS_MIN_FILES = 16
+# 错误信息中最多列出的数据sheet数
+MAX_REPORTED_SHEETS = 5
+# 各分支结论的显示文字
+REF_VERDICT_LABELS = {"pass": "通过", "error": "失败", "warning": "未比较"}
 
 # 默认配置
 DEFAULT_CONFIG = {
     "sheet_name": "修改记录",
     "check_columns": ["修订人", "修订时间", "修订内容"],
     "max_threads": 10,
+    "memory_budget_mb": 2048,
+    "adaptive_concurrency": True,
+    "executor": "auto",
+    "max_processes": None,
+    "remote_cache_dir": None,
+    "remote_cache_max_mb": 256,
+    "shared_cache_dir": None,
+    "shared_cache_notes_ref": None,
+    "shared_cache_readonly": False,
+    "paranoid_hash": False,
+    "lineage_mode": "subsequence",
+    "target_refs": ["main"],
+    "daemon": False,
+    "daemon_idle_timeout": 1800,
+    "profile": False,
+    "profile_output": "excel_checker_trace.json",
+    "pipeline_queue_size": 64,
+    "pipeline_fingerprint_concurrency": 8,
+    "pipeline_fetch_concurrency": 4,
+    "pipeline_parse_concurrency": None,
+    "watch_debounce": 2.0,
+    "watch_poll_interval": 1.0,
     "timeout": 30
 }
 
@@ -37,59 +103,208 @@ class ExcelChecker:
         """初始化检查器"""
         self.config = self._load_config(config_file)
         self.cache = self._load_cache()
+        self.blob_fetcher = GitBlobFetcher(timeout=self.config['timeout'])
+        self.record_cache = self._create_record_cache()
+        self.profiler = NULL_PROFILER
+        # Git LFS本地对象库，遇到第一个LFS指针时才定位
+        self._lfs_store = None
+        # 常驻服务中保持 git cat-file 进程，供后续检查复用
+        self.keep_git_process = False
+        # CI分片：(序号, 总数)，只检查分配给该分片的文件，结果写入shard_output
+        self.shard = None
+        self.shard_output = None
         self.errors = []
         self.warnings = []
     
     def _load_config(self, config_file):
         """加载配置文件"""
+        config = dict(DEFAULT_CONFIG)
         if os.path.exists(config_file):
             with open(config_file, 'r', encoding='utf-8') as f:
-                return json.load(f)
-        return DEFAULT_CONFIG
+                config.update(json.load(f))
+        if isinstance(config['target_refs'], str):
+            config['target_refs'] = [config['target_refs']]
+        return config
     
     def _load_cache(self):
-        """加载缓存"""
-        if os.path.exists(CACHE_FILE):
-            with open(CACHE_FILE, 'r', encoding='utf-8') as f:
-                return json.load(f)
-        return {}
-    
-    def _save_cache(self):
-        """保存缓存"""
-        with open(CACHE_FILE, 'w', encoding='utf-8') as f:
-            json.dump(self.cache, f, ensure_ascii=False, indent=2)
-    
-    def _calculate_file_hash(self, filepath):
-        """计算文件哈希值"""
-        hash_md5 = hashlib.md5()
+        """打开缓存（条目按需读取，不会一次性加载）"""
+        return CheckCache(CACHE_FILE, legacy_json=LEGACY_CACHE_FILE)
+    
+    def close(self):
+        """释放git进程和缓存连接"""
+        self.blob_fetcher.close()
+        self.cache.close()
+    
+    def _create_record_cache(self):
+        """创建远程修订记录缓存，无法确定缓存目录时返回None"""
+        directory = self.config['remote_cache_dir'] or default_cache_dir()
+        if not directory:
+            return None
+        return RemoteRecordCache(
+            directory, self.config['remote_cache_max_mb'] * 1024 * 1024,
+            shared=self._create_shared_store()
+        )
+    
+    def _create_shared_store(self):
+        """创建共享缓存层（共享目录或git notes），未配置时返回None"""
+        readonly = self.config['shared_cache_readonly']
+        if self.config['shared_cache_dir']:
+            return DirectoryStore(self.config['shared_cache_dir'], readonly)
+        if self.config['shared_cache_notes_ref']:
+            return GitNotesStore(self.config['shared_cache_notes_ref'], readonly, timeout=self.config['timeout'])
+        return None
+    
+    def _read_file(self, filepath):
+        """一次性读取本地文件的全部内容"""
         with open(filepath, "rb") as f:
-            for chunk in iter(lambda: f.read(4096), b""):
-                hash_md5.update(chunk)
-        return hash_md5.hexdigest()
+            return f.read()
+    
+    def _calculate_hash(self, content, algorithm=HASH_ALGORITHM):
+        """计算内容哈希值"""
+        if algorithm == LEGACY_HASH_ALGORITHM:
+            return hashlib.md5(content).hexdigest()
+        if algorithm == "blake2b":
+            return hashlib.blake2b(content, digest_size=16).hexdigest()
+        # 与 git hash-object 的计算方式一致
+        digest = hashlib.sha1(b"blob %d\0" % len(content))
+        digest.update(content)
+        return digest.hexdigest()
+    
+    def _stat_fingerprint(self, filepath):
+        """
+        获取文件的stat指纹 [大小, 修改时间, inode, ctime]
+        文件刚被修改过时返回None，此时指纹不可信
+        """
+        stat = os.stat(filepath)
+        if time.time_ns() - stat.st_mtime_ns < RACY_FINGERPRINT_NS:
+            return None
+        return [stat.st_size, stat.st_mtime_ns, stat.st_ino, stat.st_ctime_ns]
+    
+    def _get_remote_oid(self, filepath, branch="main"):
+        """获取远程仓库中文件的blob OID"""
+        try:
+            return self.blob_fetcher.get_oid(filepath, branch), None
+        except BlobMissingError as e:
+            return None, str(e)
+        except BlobFetchError as e:
+            return None, f"获取远程文件失败: {str(e)}"
+    
+    def _get_remote_blob(self, oid):
+        """按blob OID读取远程文件内容"""
+        try:
+            return self.blob_fetcher.read(oid), None
+        except BlobFetchError as e:
+            return None, f"获取远程文件失败: {str(e)}"
+    
+    def _resolve_lfs(self, content):
+        """
+        Git LFS指针替换为本地对象库中的对象（不访问网络），返回 (内容, 错误信息)
+        不是指针时原样返回
+        """
+        if parse_pointer(content) is None:
+            return content, None
+        if self._lfs_store is None:
+            self._lfs_store = LfsObjectStore(lfs_objects_dir())
+        return self._lfs_store.resolve(content)
+    
+    def _resolve_remote_lfs(self, content):
+        """解析远程文件的LFS指针，本地没有对应对象时说明远程版本不可用"""
+        content, error = self._resolve_lfs(content)
+        if error:
+            return None, f"远程版本不可用，未进行版本检查（{error}，请执行 git lfs fetch 获取后重新检查）"
+        return content, None
     
     def _get_remote_file_content(self, filepath, branch="main"):
         """获取远程仓库中的文件内容"""
+        oid, error = self._get_remote_oid(filepath, branch)
+        if error:
+            return None, error
+        return self._get_remote_blob(oid)
+    
+    @staticmethod
+    @contextlib.contextmanager
+    def _open_source(source):
+        """
+        打开待读取的内容：字节内容包装为内存文件对象，LFS对象映射到内存（退出时关闭映射），
+        路径和文件对象原样返回
+        """
+        if isinstance(source, LfsObject):
+            with source.open() as mapped:
+                yield mapped
+        elif isinstance(source, (bytes, bytearray, memoryview)):
+            yield io.BytesIO(source)
+        else:
+            yield source
+    
+    @staticmethod
+    def _open_revision_records(source):
+        """
+        打开修订记录流，返回 (逐行产生单元格值的迭代器, 错误信息)
+        source可以是文件路径、字节内容、LFS对象或二进制文件对象；迭代器读完或关闭时释放打开的内容
+        """
+        opened = contextlib.ExitStack()
         try:
-            result = subprocess.run(
-                ['git', 'show', f'{branch}:{filepath}'],
-                capture_output=True,
-                timeout=self.config['timeout']
-            )
-            
-            if result.returncode == 0:
-                return result.stdout, None
-            else:
-                return None, f"无法获取远程文件: {filepath}"
-                
-        except subprocess.TimeoutExpired:
-            return None, f"获取远程文件超时: {filepath}"
+            source = opened.enter_context(ExcelChecker._open_source(source))
+            try:
+                # 快速路径：只流式解析修改记录sheet，不加载整个工作簿
+                reader = XlsxSheetReader(source)
+                try:
+                    if RECORD_SHEET_NAME not in reader.sheetnames:
+                        reader.close()
+                        opened.close()
+                        return None, "文件中不存在'修改记录'sheet页"
+                    rows = reader.iter_rows(RECORD_SHEET_NAME, min_row=2, columns=len(RECORD_FIELDS))
+                except BaseException:
+                    reader.close()
+                    raise
+            except Exception:
+                # 结构特殊的文件回退到openpyxl
+                with opened:
+                    rows, error = ExcelChecker._get_revision_rows_openpyxl(source)
+                return (None if error else iter(rows)), error
+        except BaseException:
+            opened.close()
+            raise
+        
+        return ExcelChecker._stream_records(reader, rows, source, opened), None
+    
+    @staticmethod
+    def _stream_records(reader, rows, source, opened):
+        """逐行产生修订记录的单元格值；快速读取中途失败时改用openpyxl读取剩余的记录"""
+        count = 0
+        try:
+            for row in rows:
+                yield row
+                count += 1
+        except Exception:
+            fallback_rows, error = ExcelChecker._get_revision_rows_openpyxl(source)
+            if error:
+                raise ValueError(error)
+            yield from fallback_rows[count:]
+        finally:
+            rows.close()
+            reader.close()
+            opened.close()
+    
+    @staticmethod
+    def _get_revision_records(source):
+        """
+        获取修订记录（按列保存的RevisionLog），source可以是文件路径、字节内容或二进制文件对象
+        逐行读入紧凑存储，不保留单元格值的行
+        """
+        rows, error = ExcelChecker._open_revision_records(source)
+        if error:
+            return None, error
+        try:
+            return RevisionLog.from_rows(rows), None
         except Exception as e:
-            return None, f"获取远程文件失败: {str(e)}"
+            return None, f"读取修订记录失败: {str(e)}"
     
-    def _get_revision_records(self, filepath):
-        """获取修订记录"""
+    @staticmethod
+    def _get_revision_rows_openpyxl(source):
+        """使用openpyxl获取修订记录的单元格值"""
         try:
-            wb = load_workbook(filepath, read_only=True, data_only=True)
+            wb = load_workbook(source, read_only=True, data_only=True)
             
             # 检查是否存在修改记录sheet
             if RECORD_SHEET_NAME not in wb.sheetnames:
@@ -97,192 +312,801 @@ class ExcelChecker:
                 return None, "文件中不存在'修改记录'sheet页"
             
             ws = wb[RECORD_SHEET_NAME]
-            records = []
+            rows = []
             
             # 读取修订记录（从第2行开始，第1行是表头）
             for row in ws.iter_rows(min_row=2, values_only=True):
                 if row and any(cell is not None for cell in row):
-                    records.append({
-                        "修订人": row[0] if len(row) > 0 else "",
-                        "修订时间": row[1] if len(row) > 1 else "",
-                        "修订内容": row[2] if len(row) > 2 else "",
-                        "修订版本": row[3] if len(row) > 3 else ""
-                    })
+                    rows.append(row[:len(RECORD_FIELDS)])
             
             wb.close()
-            return records, None
+            return rows, None
             
         except Exception as e:
             return None, f"读取修订记录失败: {str(e)}"
     
-    def _get_revision_records_from_bytes(self, content):
-        """从字节内容获取修订记录"""
-        try:
-            # 创建临时文件
-            with tempfile.NamedTemporaryFile(suffix='.xlsx', delete=False) as tmp_file:
-                tmp_file.write(content)
-                tmp_file_path = tmp_file.name
-            
-            # 读取修订记录
-            records, error = self._get_revision_records(tmp_file_path)
-            
-            # 删除临时文件
-            os.unlink(tmp_file_path)
-            
-            return records, error
-            
-        except Exception as e:
-            return None, f"从字节内容读取修订记录失败: {str(e)}"
-    
-    def _compare_revision_records(self, local_records, remote_records):
-        """比较本地和远程的修订记录"""
-        if not remote_records:
-            return None, "远程文件没有修订记录，无法比较"
-        
-        if not local_records:
-            return False, "本地文件没有修订记录"
-        
-        # 获取远程最新的修订记录
-        remote_latest = remote_records[-1]
-        
-        # 检查本地是否包含远程最新的修订记录
-        for record in local_records:
-            if (record["修订人"] == remote_latest["修订人"] and
-                record["修订时间"] == remote_latest["修订时间"] and
-                record["修订内容"] == remote_latest["修订内容"]):
-                return True, None
-        
-        # 本地不包含远程最新的修订记录
-        return False, f"本地文件未包含远程最新的修订记录: {remote_latest['修订人']} - {remote_latest['修订时间']}"
+    @staticmethod
+    def _get_revision_records_from_bytes(content):
+        """从字节内容获取修订记录（直接在内存中解析）"""
+        return ExcelChecker._get_revision_records(content)
     
-    def _check_single_file(self, filepath, relative_path):
-        """检查单个文件"""
+    def _check_fingerprint(self, filepath, relative_path, staged_oid=None):
+        """
+        根据暂存区OID或stat指纹查询缓存，无需读取文件内容
+        返回 (结果, 状态)，状态为None表示文件未修改，可以跳过
+        """
         result = {
             "filepath": relative_path,
             "status": "pass",
             "errors": [],
-            "warnings": []
+            "warnings": [],
+            # 开始处理的时间，用于统计每个文件的耗时（子进程中同样有效）
+            "started": time.time()
         }
         
-        # 计算当前文件哈希
-        current_hash = self._calculate_file_hash(filepath)
+        with self.profiler.span("cache_lookup", relative_path):
+            cached = self.cache.get(relative_path)
+        # 目标分支变化后，之前的检查结果不再适用（旧条目只比较过main）
+        if cached is not None and cached.get("target_refs", ["main"]) != self.config['target_refs']:
+            cached = None
+        state = {
+            "filepath": relative_path,
+            "staged_oid": staged_oid,
+            "cached": cached,
+            "fingerprint": None
+        }
+        
+        if staged_oid is not None:
+            # 暂存区模式：git已经给出内容的OID，无需读取或计算哈希
+            if (cached is not None
+                    and cached.get("hash_algorithm", LEGACY_HASH_ALGORITHM) == HASH_ALGORITHM
+                    and cached.get("hash") == staged_oid
+                    and self._remote_unchanged(relative_path, cached)):
+                result["status"] = "skipped"
+                return result, None
+            return result, state
+        
+        with self.profiler.span("cache_lookup", relative_path):
+            fingerprint = self._stat_fingerprint(filepath)
+        
+        # 指纹与缓存一致时直接信任缓存的哈希，无需读取文件
+        if (cached is not None and fingerprint is not None
+                and not self.config['paranoid_hash']
+                and cached.get("fingerprint") == fingerprint
+                and self._remote_unchanged(relative_path, cached)):
+            result["status"] = "skipped"
+            return result, None
+        
+        state["fingerprint"] = fingerprint
+        return result, state
+    
+    def _remote_unchanged(self, relative_path, cached):
+        """
+        各目标分支中的远程文件是否仍是缓存的结论所比较的版本
+        远程文件更新后本地文件即使未修改也需要重新检查；旧的缓存条目没有记录远程OID，视为已更新
+        """
+        remote_oids = cached.get("remote_oids")
+        if remote_oids is None:
+            return False
+        return all(
+            remote_oids.get(ref) == self._get_remote_oid(relative_path, ref)[0]
+            for ref in self.config['target_refs']
+        )
+    
+    def _check_content(self, result, state, local_content):
+        """
+        根据内容哈希查询缓存，返回 (结果, 任务)，任务为None表示文件未修改
+        暂存区模式直接以blob OID作为哈希
+        """
+        with self.profiler.span("hash", state["filepath"]):
+            current_hash = state["staged_oid"] or self._calculate_hash(local_content)
+        cached = state["cached"]
         
         # 检查缓存中是否有记录
-        if relative_path in self.cache:
-            cached_hash = self.cache[relative_path].get("hash", "")
+        if cached is not None:
+            cached_algorithm = cached.get("hash_algorithm", LEGACY_HASH_ALGORITHM)
+            if cached_algorithm == HASH_ALGORITHM:
+                cached_hash_matches = cached.get("hash") == current_hash
+            else:
+                cached_hash_matches = cached.get("hash") == self._calculate_hash(local_content, cached_algorithm)
             
-            # 如果哈希值相同，说明文件未修改，跳过检查
-            if cached_hash == current_hash:
+            # 如果哈希值相同且远程文件未更新，跳过检查；同时刷新指纹并迁移旧格式
+            if cached_hash_matches and self._remote_unchanged(state["filepath"], cached):
                 result["status"] = "skipped"
-                return result
-        
-        # 获取本地修订记录
-        local_records, error = self._get_revision_records(filepath)
+                result["cache_entry"] = dict(
+                    cached, hash=current_hash, hash_algorithm=HASH_ALGORITHM,
+                    fingerprint=state["fingerprint"]
+                )
+                return result, None
         
+        # 未检出实际内容（暂存区或未安装LFS时的工作区）的LFS文件，从本地对象库读取
+        local_content, error = self._resolve_lfs(local_content)
         if error:
             result["status"] = "error"
-            result["errors"].append(error)
-            return result
-        
-        # 检查修订记录是否为空
-        if not local_records:
-            result["status"] = "error"
-            result["errors"].append("修改记录sheet页为空，请添加修订记录后再提交")
-            return result
+            result["errors"].append(f"无法读取文件的实际内容: {error}，请执行 git lfs pull")
+            return result, None
         
-        # 获取远程文件内容
-        remote_content, error = self._get_remote_file_content(relative_path)
+        task = {
+            "filepath": state["filepath"],
+            "hash": current_hash,
+            "fingerprint": state["fingerprint"],
+            "local_content": local_content,
+            "remotes": [],
+            "remote_blobs": {},
+            "check_columns": self.config['check_columns'],
+            "lineage_mode": self.config['lineage_mode'],
+            "previous": cached,
+            "profile": self.profiler.enabled,
+            "started": result["started"]
+        }
+        return result, task
+    
+    def _get_cached_remote_records(self, oid):
+        """按blob OID读取缓存的 (远程修订记录, sheet指纹)，未命中返回None"""
+        if self.record_cache is None:
+            return None
+        return self.record_cache.get_entry(oid)
+    
+    def _fetch_remote(self, task):
+        """
+        获取各目标分支的远程修订记录
+        多个分支指向同一个blob时只读取一次；解析过的blob直接使用缓存，无需读取和解析
+        """
+        with self.profiler.span("remote_fetch", task["filepath"]):
+            for ref in self.config['target_refs']:
+                oid, error = self._get_remote_oid(task["filepath"], ref)
+                remote = {"ref": ref, "oid": oid, "error": error}
+                task["remotes"].append(remote)
+                if oid is None or oid in task["remote_blobs"]:
+                    continue
+                
+                records, fingerprints = self._get_cached_remote_records(oid) or (None, None)
+                content = None
+                if records is None or fingerprints is None:
+                    # 旧的缓存条目没有sheet指纹，读取blob重新计算
+                    content, error = self._get_remote_blob(oid)
+                    if content is not None:
+                        content, error = self._resolve_remote_lfs(content)
+                    if error and records is None:
+                        remote["error"] = error
+                        continue
+                task["remote_blobs"][oid] = {
+                    "content": content, "records": records, "fingerprints": fingerprints
+                }
+    
+    def _prepare_file(self, filepath, relative_path, staged_oid=None):
+        """
+        准备单个文件的检查：计算哈希、查询缓存并获取远程内容
+        staged_oid不为空时检查暂存区中的内容，直接以blob OID作为哈希
+        返回 (结果, 任务)，任务为None表示无需继续解析
+        """
+        result, state = self._check_fingerprint(filepath, relative_path, staged_oid)
+        if state is None:
+            return result, None
         
-        if error:
-            # 无法获取远程文件，可能是新文件或网络问题，跳过版本检查
-            result["warnings"].append(f"无法获取远程文件: {error}")
+        if staged_oid is not None:
+            try:
+                with self.profiler.span("local_read", relative_path):
+                    local_content = self.blob_fetcher.read(staged_oid)
+            except BlobFetchError as e:
+                result["status"] = "error"
+                result["errors"].append(f"读取暂存区文件失败: {str(e)}")
+                return result, None
         else:
-            # 获取远程修订记录
-            remote_records, error = self._get_revision_records_from_bytes(remote_content)
+            # 读取本地文件，哈希计算和解析共用同一份内存数据
+            with self.profiler.span("local_read", relative_path):
+                local_content = self._read_file(filepath)
+        
+        result, task = self._check_content(result, state, local_content)
+        if task is None:
+            return result, None
+        
+        self._fetch_remote(task)
+        return result, task
+    
+    @staticmethod
+    def _evaluate_task(task):
+        """
+        解析并比较修订记录，只依赖任务数据，可在子进程中执行
+        开启计时时，子进程中记录的时间段随结果一起返回
+        """
+        profiler = Profiler() if task.get("profile") else NULL_PROFILER
+        result = ExcelChecker._evaluate_stages(task, profiler)
+        result["started"] = task["started"]
+        if profiler.enabled:
+            result["spans"] = profiler.spans
+        return result
+    
+    @staticmethod
+    def _sheet_changes(local_fingerprints, remote_fingerprints):
+        """
+        根据sheet部件指纹比较本地与远程文件
+        返回 (修改过的数据sheet, 修改记录sheet是否变化, 共享字符串是否变化)，任一方指纹未知时返回None
+        """
+        if local_fingerprints is None or remote_fingerprints is None:
+            return None
+        local_sheets = local_fingerprints["sheets"]
+        remote_sheets = remote_fingerprints["sheets"]
+        names = list(local_sheets) + [name for name in remote_sheets if name not in local_sheets]
+        changed = [
+            name for name in names
+            if name != RECORD_SHEET_NAME and local_sheets.get(name) != remote_sheets.get(name)
+        ]
+        revision_changed = local_sheets.get(RECORD_SHEET_NAME) != remote_sheets.get(RECORD_SHEET_NAME)
+        strings_changed = local_fingerprints["shared_strings"] != remote_fingerprints["shared_strings"]
+        return changed, revision_changed, strings_changed
+    
+    @staticmethod
+    def _unrecorded_change_message(sheets):
+        """数据sheet修改后没有新增修订记录时的错误信息"""
+        shown = "、".join(sheets[:MAX_REPORTED_SHEETS])
+        if len(sheets) > MAX_REPORTED_SHEETS:
+            shown += " 等"
+        return f"数据sheet已修改（{shown}），但修改记录中没有新增修订记录，请在'修改记录'sheet页中记录本次修改"
+    
+    @staticmethod
+    def _make_cache_entry(task, record_count, sheet_fingerprints):
+        """检查通过时写入缓存的条目"""
+        return {
+            "hash": task["hash"],
+            "hash_algorithm": HASH_ALGORITHM,
+            "fingerprint": task["fingerprint"],
+            "last_check": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            "record_count": record_count,
+            "target_refs": [remote["ref"] for remote in task["remotes"]],
+            "sheet_fingerprints": sheet_fingerprints,
+            "remote_oids": {remote["ref"]: remote["oid"] for remote in task["remotes"]}
+        }
+    
+    @staticmethod
+    def _evaluate_stages(task, profiler):
+        """
+        依次比较sheet指纹、解析远程记录、流式解析本地记录并比较
+        各sheet的指纹取自zip中央目录（无需解压），sheet都未变化时不解析；
+        指纹不同的数据sheet在报错前逐个单元格确认（重新保存也会改变指纹）
+        """
+        path = task["filepath"]
+        result = {
+            "filepath": task["filepath"],
+            "status": "pass",
+            "errors": [],
+            "warnings": []
+        }
+        result["remote_cache_entries"] = []
+        
+        with profiler.span("sheet_fingerprint", path):
+            with ExcelChecker._open_source(task["local_content"]) as source:
+                local_fingerprints = workbook_fingerprints(source)
+        
+        # 与上次检查通过的版本相比各sheet都未变化（例如只是重新保存），且各分支的远程文件也未更新：沿用上次的结论
+        previous = task["previous"]
+        remote_oids = {remote["ref"]: remote["oid"] for remote in task["remotes"]}
+        if (previous is not None and local_fingerprints is not None
+                and None not in remote_oids.values()
+                and previous.get("sheet_fingerprints") == local_fingerprints
+                and previous.get("remote_oids") == remote_oids):
+            result["ref_verdicts"] = {ref: "pass" for ref in remote_oids}
+            result["cache_entry"] = ExcelChecker._make_cache_entry(
+                task, previous.get("record_count"), local_fingerprints
+            )
+            return result
+        
+        # 先获取各目标分支的远程修订记录，以便读取本地记录时同步校验
+        # （同一个blob只分析一次；缓存未命中时解析blob，并交由主进程写入缓存）
+        analyzed = {}
+        remotes = []
+        for remote in task["remotes"]:
+            if remote["error"]:
+                # 无法获取远程文件，可能是新文件或网络问题，跳过该分支的版本检查
+                remotes.append((remote["ref"], None, None, f"无法获取远程文件: {remote['error']}", None, []))
+                continue
             
-            if error:
-                result["warnings"].append(f"无法读取远程修订记录: {error}")
-            else:
-                # 比较本地和远程的修订记录
-                is_up_to_date, error = self._compare_revision_records(local_records, remote_records)
+            oid = remote["oid"]
+            if oid not in analyzed:
+                analyzed[oid] = ExcelChecker._analyze_remote(task, oid, local_fingerprints, profiler, result)
+            records, error, shortcut, changed_sheets, _content = analyzed[oid]
+            warning = f"无法读取远程修订记录: {error}" if error else None
+            remotes.append((remote["ref"], oid, records, warning, shortcut, changed_sheets))
+        
+        # 需要解析的每个不同的远程blob一个匹配器，多个分支指向同一个blob时共用；
+        # 数据sheet有修改时，本地还必须有远程之外的新修订记录
+        matchers = {}
+        required = {}
+        for _ref, oid, records, warning, shortcut, changed_sheets in remotes:
+            if warning or shortcut or oid in matchers:
+                continue
+            matchers[oid] = LineageMatcher(records, task["check_columns"], task["lineage_mode"])
+            if changed_sheets:
+                required[oid] = len(records)
+        
+        stopped_early = False
+        if matchers or all(warning for _, _, _, warning, _, _ in remotes):
+            # 流式读取本地修订记录（谱系匹配与解析交替进行，计入本地解析阶段）
+            with profiler.span("local_parse", path):
+                local_records, error = ExcelChecker._open_revision_records(task["local_content"])
                 
                 if error:
                     result["status"] = "error"
                     result["errors"].append(error)
                     return result
                 
-                if not is_up_to_date:
+                try:
+                    if matchers:
+                        # 本地记录只读取一次，同时交给所有匹配器；全部匹配（且已读到新记录）后不再读取剩余的本地记录
+                        for row in local_records:
+                            row = normalize_row(row)
+                            if (all([matcher.feed(row) for matcher in matchers.values()])
+                                    and all(matchers[oid].local_count > count for oid, count in required.items())):
+                                stopped_early = True
+                                break
+                        record_count = next(iter(matchers.values())).local_count
+                    else:
+                        record_count = sum(1 for _ in local_records)
+                except Exception as e:
                     result["status"] = "error"
-                    result["errors"].append(
-                        "本地文件未基于远程最新版本，请先执行 'git pull' 获取最新版本，"
-                        "在此基础上进行修改后再提交"
-                    )
+                    result["errors"].append(f"读取修订记录失败: {str(e)}")
                     return result
+                finally:
+                    local_records.close()
+        else:
+            # 修改记录sheet与远程相同，无需解析本地文件，记录数取自远程修订记录
+            # （远程记录无法解析时记录数未知，缓存中不记录）
+            record_count = next((len(records) for _, _, records, _, _, _ in remotes if records is not None), None)
         
-        # 更新缓存
-        self.cache[relative_path] = {
-            "hash": current_hash,
-            "last_check": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-            "record_count": len(local_records)
-        }
+        # 检查修订记录是否为空
+        if record_count == 0:
+            result["status"] = "error"
+            result["errors"].append("修改记录sheet页为空，请添加修订记录后再提交")
+            return result
+        if stopped_early:
+            # 提前停止读取时只知道记录数的下限，缓存中不记录
+            record_count = None
+        
+        # 逐个分支给出结论，多个分支时错误和警告前标注分支名
+        verdicts = {}
+        outdated = False
+        for ref, oid, records, warning, shortcut, changed_sheets in remotes:
+            prefix = f"[{ref}] " if len(remotes) > 1 else ""
+            if warning:
+                result["warnings"].append(prefix + warning)
+                verdicts[ref] = "warning"
+                continue
+            
+            if shortcut == "unchanged":
+                verdicts[ref] = "pass"
+                continue
+            if shortcut == "unrecorded":
+                edited = ExcelChecker._confirm_sheet_changes(task, oid, analyzed[oid][4], changed_sheets, profiler)
+                if edited:
+                    result["errors"].append(prefix + ExcelChecker._unrecorded_change_message(edited))
+                    verdicts[ref] = "error"
+                else:
+                    verdicts[ref] = "pass"
+                continue
+            
+            if not records:
+                result["errors"].append(prefix + "远程文件没有修订记录，无法比较")
+                verdicts[ref] = "error"
+                continue
+            
+            with profiler.span("compare", path):
+                is_up_to_date, error = matchers[oid].verdict()
+            if not is_up_to_date:
+                result["errors"].append(prefix + error)
+                verdicts[ref] = "error"
+                outdated = True
+            elif oid in required and matchers[oid].local_count <= required[oid]:
+                edited = ExcelChecker._confirm_sheet_changes(task, oid, analyzed[oid][4], changed_sheets, profiler)
+                if edited:
+                    result["errors"].append(prefix + ExcelChecker._unrecorded_change_message(edited))
+                    verdicts[ref] = "error"
+                else:
+                    verdicts[ref] = "pass"
+            else:
+                verdicts[ref] = "pass"
+        result["ref_verdicts"] = verdicts
+        
+        if result["errors"]:
+            result["status"] = "error"
+            if outdated:
+                result["errors"].append(
+                    "本地文件未基于远程最新版本，请先执行 'git pull' 获取最新版本，"
+                    "在此基础上进行修改后再提交"
+                )
+            return result
+        
+        # 远程文件存在但未能比较（例如LFS对象尚未获取）时不写入缓存，获取后下次检查会重新比较
+        if any(remote["oid"] is not None and verdicts[remote["ref"]] == "warning" for remote in task["remotes"]):
+            return result
         
+        # 检查通过，返回需要写入缓存的信息
+        result["cache_entry"] = ExcelChecker._make_cache_entry(task, record_count, local_fingerprints)
         return result
     
-    def check_files(self, file_list=None):
-        """检查文件列表"""
-        if file_list is None:
+    @staticmethod
+    def _analyze_remote(task, oid, local_fingerprints, profiler, result):
+        """
+        分析一个远程blob，返回 (修订记录, 错误信息, 捷径, 指纹不同的数据sheet, 远程内容)
+        捷径为 "unchanged"（sheet都未变化，无需解析本地文件）、"unrecorded"（数据sheet变化而修改记录sheet未变化）或None；
+        远程内容只在有指纹不同的数据sheet时保留，供报错前逐个单元格确认
+        """
+        # 取出后不再由任务引用：远程内容解析完即可释放，修订记录只由匹配器和缓存条目持有
+        blob = task["remote_blobs"].pop(oid)
+        records, fingerprints = blob["records"], blob["fingerprints"]
+        computed = False
+        if fingerprints is None and blob["content"] is not None:
+            with profiler.span("sheet_fingerprint", task["filepath"]):
+                with ExcelChecker._open_source(blob["content"]) as source:
+                    fingerprints = workbook_fingerprints(source)
+            computed = fingerprints is not None
+        
+        if oid == task["hash"]:
+            # 本地文件与远程文件完全相同
+            changes = ([], False, False)
+        else:
+            changes = ExcelChecker._sheet_changes(local_fingerprints, fingerprints)
+        
+        # 修订记录未缓存时解析远程blob：走捷径也需要记录数（检查修改记录sheet是否为空、写入检查缓存），
+        # 解析结果写入记录缓存，同一个blob之后的检查不再解析
+        error = None
+        if records is None:
+            with profiler.span("remote_parse", task["filepath"]):
+                records, error = ExcelChecker._get_revision_records_from_bytes(blob["content"])
+            computed = not error
+        
+        shortcut = None
+        changed_sheets = []
+        if changes is not None:
+            changed_sheets, revision_changed, strings_changed = changes
+            # 远程没有修订记录时仍按原流程报告；远程记录无法解析时按指纹的结论处理
+            if not revision_changed and (records is None or len(records) > 0):
+                if changed_sheets:
+                    shortcut = "unrecorded"
+                elif not strings_changed:
+                    shortcut = "unchanged"
+        if shortcut is not None:
+            error = None
+        
+        if computed and records is not None:
+            result["remote_cache_entries"].append((oid, records, fingerprints))
+        return records, error, shortcut, changed_sheets, blob["content"] if changed_sheets else None
+    
+    @staticmethod
+    def _confirm_sheet_changes(task, oid, remote_content, sheets, profiler):
+        """
+        逐个单元格比较指纹不同的数据sheet，返回内容确实不同的sheet
+        远程内容来自缓存而未读取时，在这里读取；无法读取或解析时按指纹的结果处理
+        """
+        with profiler.span("confirm_changes", task["filepath"]):
+            if remote_content is None:
+                remote_content, error = ExcelChecker._read_blob(oid)
+                if error:
+                    return sheets
+            edited = []
+            for name in sheets:
+                try:
+                    local_rows = ExcelChecker._sheet_values(task["local_content"], name)
+                    remote_rows = ExcelChecker._sheet_values(remote_content, name)
+                except Exception:
+                    edited.append(name)
+                    continue
+                if local_rows != remote_rows:
+                    edited.append(name)
+            return edited
+    
+    @staticmethod
+    def _sheet_values(source, sheet_name):
+        """sheet的单元格值，去掉行尾的空单元格和末尾的空行；sheet不存在时返回None"""
+        with ExcelChecker._open_source(source) as opened:
+            rows = read_sheet_rows(opened, sheet_name)
+        if rows is None:
+            return None
+        values = []
+        for row in rows:
+            row = list(row)
+            while row and row[-1] is None:
+                row.pop()
+            values.append(row)
+        while values and not values[-1]:
+            values.pop()
+        return values
+    
+    @staticmethod
+    def _read_blob(oid):
+        """
+        在任务之外读取blob（LFS指针替换为本地对象），返回 (内容, 错误信息)
+        使用当前进程共用的读取器，不为每个文件启动git进程
+        """
+        try:
+            content = _worker_blob_fetcher().read(oid)
+        except BlobFetchError as e:
+            return None, str(e)
+        if parse_pointer(content) is None:
+            return content, None
+        return _worker_lfs_store().resolve(content)
+    
+    def _check_single_file(self, filepath, relative_path, staged_oid=None):
+        """检查单个文件"""
+        result, task = self._prepare_file(filepath, relative_path, staged_oid)
+        if task is None:
+            return result
+        return self._evaluate_task(task)
+    
+    def _select_executor(self, file_count):
+        """根据配置选择执行引擎"""
+        executor = self.config['executor']
+        if executor == "auto":
+            cpu_count = os.cpu_count() or 1
+            if cpu_count > 1 and file_count >= AUTO_PROCESS_MIN_FILES:
+                return "process"
+            return "thread"
+        if executor not in ("thread", "process", "asyncio"):
+            print(f"未知的执行引擎 '{executor}'，使用线程池")
+            return "thread"
+        return executor
+    
+    def _create_scheduler(self, file_list, initial_workers, max_workers):
+        """创建按文件大小调度的调度器"""
+        budget_mb = self.config['memory_budget_mb']
+        return FileScheduler(
+            file_list,
+            copies=1 + len(self.config['target_refs']),
+            memory_budget=budget_mb * 1024 * 1024 if budget_mb else None,
+            initial_workers=initial_workers,
+            max_workers=max_workers,
+            adaptive=self.config['adaptive_concurrency']
+        )
+    
+    @staticmethod
+    def _was_parsed(future):
+        """文件是否经过了实际的检查（缓存命中跳过的文件不计入吞吐量）"""
+        return future.exception() is None and future.result()["status"] != "skipped"
+    
+    def _iter_thread_results(self, file_list, staged_oids):
+        """
+        线程池引擎：大文件优先，在途文件数和预估内存由调度器控制
+        按完成顺序返回 (相对路径, future)
+        """
+        max_threads = self.config['max_threads']
+        scheduler = self._create_scheduler(file_list, os.cpu_count(), max_threads)
+        with ThreadPoolExecutor(max_workers=max_threads) as executor:
+            running = {}
+            while scheduler.pending:
+                for filepath, relative_path in scheduler.take():
+                    future = executor.submit(self._check_single_file, filepath, relative_path,
+                                             staged_oids.get(relative_path))
+                    running[future] = relative_path
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    relative_path = running.pop(future)
+                    scheduler.finish(relative_path, self._was_parsed(future))
+                    yield relative_path, future
+    
+    def _iter_process_results(self, file_list, staged_oids):
+        """
+        进程池引擎：哈希和git读取在线程中完成，解析和比较交给子进程
+        按完成顺序返回 (相对路径, future)
+        """
+        process_pool = None
+        process_count = self.config['max_processes'] or os.cpu_count()
+        prepare_pool = ThreadPoolExecutor(max_workers=self.config['max_threads'])
+        # 在途文件包括正在准备的和等待或正在子进程中解析的，每个进程预留一个已准备好的文件
+        scheduler = self._create_scheduler(
+            file_list, process_count * 2, process_count + self.config['max_threads']
+        )
+        try:
+            pending = {}
+            while scheduler.pending:
+                for filepath, relative_path in scheduler.take():
+                    future = prepare_pool.submit(self._prepare_file, filepath, relative_path,
+                                                 staged_oids.get(relative_path))
+                    pending[future] = (relative_path, True)
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    relative_path, is_prepare = pending.pop(future)
+                    if not is_prepare or future.exception() is not None:
+                        scheduler.finish(relative_path, future.exception() is None)
+                        yield relative_path, future
+                        continue
+                    
+                    result, task = future.result()
+                    if task is None:
+                        scheduler.finish(relative_path, result["status"] != "skipped")
+                        yield relative_path, _completed_future(result)
+                        continue
+                    
+                    # 只有真正需要解析时才启动子进程
+                    if process_pool is None:
+                        process_pool = create_process_pool(process_count)
+                    pending[process_pool.submit(_evaluate_in_process, task)] = (relative_path, False)
+        finally:
+            prepare_pool.shutdown(wait=True)
+            if process_pool is not None:
+                process_pool.shutdown(wait=True)
+    
+    def _iter_async_results(self, file_list, staged_oids):
+        """
+        asyncio流水线引擎：事件循环在后台线程中运行
+        按完成顺序返回 (相对路径, future)
+        """
+        use_processes = (os.cpu_count() or 1) > 1 and len(file_list) >= AUTO_PROCESS_MIN_FILES
+        parse_workers = self.config['pipeline_parse_concurrency'] or os.cpu_count()
+        
+        def make_parse_executor():
+            if use_processes:
+                return create_process_pool(parse_workers)
+            return ThreadPoolExecutor(max_workers=parse_workers)
+        
+        completed = queue.Queue()
+        pipeline = CheckPipeline(
+            self, file_list, staged_oids,
+            on_result=lambda relative_path, future: completed.put((relative_path, future)),
+            evaluate=_evaluate_in_process,
+            parse_executor_factory=make_parse_executor
+        )
+        failure = []
+        
+        def run():
+            try:
+                asyncio.run(pipeline.run())
+            except BaseException as e:
+                failure.append(e)
+            finally:
+                completed.put(None)
+        
+        thread = threading.Thread(target=run, daemon=True)
+        thread.start()
+        while True:
+            item = completed.get()
+            if item is None:
+                break
+            yield item
+        thread.join()
+        if failure:
+            raise failure[0]
+    
+    def get_staged_files(self):
+        """获取暂存区中的Excel文件，返回 ({路径: blob OID}, 错误信息)"""
+        try:
+            staged = list_staged_blobs(timeout=self.config['timeout'])
+        except BlobFetchError as e:
+            return None, str(e)
+        return {path: oid for path, oid in staged.items() if path.endswith('.xlsx')}, None
+    
+    def check_staged_files(self, staged_oids):
+        """按blob OID检查暂存区中的文件内容（而不是工作区中的文件）"""
+        file_list = [(path, path) for path in sorted(staged_oids)]
+        return self.check_files(file_list, staged_oids=staged_oids)
+    
+    def check_files(self, file_list=None, staged_oids=None):
+        """检查文件列表，staged_oids为 {相对路径: 暂存区blob OID}"""
+        check_all = file_list is None
+        if check_all:
             # 检查所有Excel文件
             file_list = []
             if os.path.exists(EXCEL_DIR):
                 for filename in os.listdir(EXCEL_DIR):
-                    if filename.endswith('.xlsx'):
+                    if is_workbook_name(filename):
                         filepath = os.path.join(EXCEL_DIR, filename)
-                        file_list.append((filepath, filename))
+                        file_list.append((filepath, to_git_path(filepath)))
+        
+        # 同一文件指定多次（例如 X 与 ./X）时只检查一次
+        unique = {}
+        for filepath, relative_path in file_list:
+            unique.setdefault(relative_path, filepath)
+        file_list = [(filepath, relative_path) for relative_path, filepath in unique.items()]
+        
+        shard_writer = None
+        if self.shard is not None:
+            # CI分片：按文件大小确定性地分配，只检查本分片的文件
+            index, count = self.shard
+            total = len(file_list)
+            file_list = select_shard(file_list, index, count)
+            print(f"分片 {index}/{count}: 分配到 {len(file_list)}/{total} 个文件")
+            shard_writer = ShardResultWriter(
+                self.shard_output or default_shard_output(index, count),
+                index, count, total, self.config['target_refs']
+            )
         
         if not file_list:
             print("没有找到需要检查的Excel文件")
+            if shard_writer is not None:
+                shard_writer.close()
             return True
         
+        self.profiler = Profiler() if self.config['profile'] else NULL_PROFILER
+        executor = self._select_executor(len(file_list))
         print(f"开始检查 {len(file_list)} 个Excel文件...")
-        print(f"使用 {self.config['max_threads']} 个线程并行处理")
+        if executor == "process":
+            process_count = self.config['max_processes'] or os.cpu_count()
+            print(f"使用 {process_count} 个进程并行处理")
+        elif executor == "asyncio":
+            print(
+                f"使用asyncio流水线处理（并发数: 指纹 {self.config['pipeline_fingerprint_concurrency']}, "
+                f"获取 {self.config['pipeline_fetch_concurrency']}, "
+                f"解析 {self.config['pipeline_parse_concurrency'] or os.cpu_count()}）"
+            )
+        else:
+            print(f"使用 {self.config['max_threads']} 个线程并行处理")
         print("-" * 60)
         
-        # 使用线程池并行检查
+        # 一次性解析所有文件在各目标分支中的blob OID
+        relative_paths = [relative_path for _, relative_path in file_list]
+        for ref in self.config['target_refs']:
+            self.blob_fetcher.resolve(relative_paths, ref)
+        
+        staged_oids = staged_oids or {}
+        if executor == "process":
+            completed = self._iter_process_results(file_list, staged_oids)
+        elif executor == "asyncio":
+            completed = self._iter_async_results(file_list, staged_oids)
+        else:
+            completed = self._iter_thread_results(file_list, staged_oids)
+        
+        # 按完成顺序输出结果
         results = []
-        with ThreadPoolExecutor(max_workers=self.config['max_threads']) as executor:
-            future_to_file = {
-                executor.submit(self._check_single_file, filepath, relative_path): (filepath, relative_path)
-                for filepath, relative_path in file_list
-            }
-            
-            for future in as_completed(future_to_file):
-                filepath, relative_path = future_to_file[future]
-                try:
-                    result = future.result()
-                    results.append(result)
+        for relative_path, future in completed:
+            try:
+                result = future.result()
+                results.append(result)
+                self.profiler.add(result.pop("spans", ()))
+                duration = time.time() - result.pop("started")
+                
+                with self.profiler.span("cache_save", relative_path):
+                    # 检查通过的文件写入缓存
+                    cache_entry = result.pop("cache_entry", None)
+                    if cache_entry is not None:
+                        self.cache.put(relative_path, cache_entry)
                     
-                    if result["status"] == "pass":
-                        print(f"[OK] {relative_path} - 检查通过")
-                    elif result["status"] == "skipped":
-                        print(f"[SKIP] {relative_path} - 未修改，跳过检查")
-                    elif result["status"] == "error":
-                        print(f"[ERROR] {relative_path} - 检查失败")
-                        for error in result["errors"]:
-                            print(f"  错误: {error}")
-                            self.errors.append(f"{relative_path}: {error}")
+                    # 新解析的远程修订记录按blob OID写入缓存
+                    for oid, records, fingerprints in result.pop("remote_cache_entries", ()):
+                        if self.record_cache is not None:
+                            self.record_cache.put(oid, records, fingerprints)
+                
+                if result["status"] == "pass":
+                    print(f"[OK] {relative_path} - 检查通过")
+                elif result["status"] == "skipped":
+                    print(f"[SKIP] {relative_path} - 未修改，跳过检查")
+                elif result["status"] == "error":
+                    print(f"[ERROR] {relative_path} - 检查失败")
+                    for error in result["errors"]:
+                        print(f"  错误: {error}")
+                        self.errors.append(f"{relative_path}: {error}")
+                
+                # 检查多个分支时显示每个分支的结论
+                ref_verdicts = result.get("ref_verdicts", {})
+                if len(ref_verdicts) > 1:
+                    print("  分支: " + ", ".join(
+                        f"{ref} {REF_VERDICT_LABELS[verdict]}" for ref, verdict in ref_verdicts.items()
+                    ))
+                
+                # 显示警告
+                for warning in result.get("warnings", []):
+                    print(f"  警告: {warning}")
+                    self.warnings.append(f"{relative_path}: {warning}")
+                
+                if shard_writer is not None:
+                    shard_writer.write_result(
+                        relative_path, result["status"], result["errors"],
+                        result.get("warnings", []), duration
+                    )
                     
-                    # 显示警告
-                    for warning in result.get("warnings", []):
-                        print(f"  警告: {warning}")
-                        self.warnings.append(f"{relative_path}: {warning}")
-                        
-                except Exception as e:
-                    error_msg = f"{relative_path}: 检查时发生异常 - {str(e)}"
-                    print(f"[ERROR] {error_msg}")
-                    self.errors.append(error_msg)
+            except Exception as e:
+                error_msg = f"{relative_path}: 检查时发生异常 - {str(e)}"
+                print(f"[ERROR] {error_msg}")
+                self.errors.append(error_msg)
+                if shard_writer is not None:
+                    shard_writer.write_result(relative_path, "error", [f"检查时发生异常 - {str(e)}"])
         
-        # 保存缓存
-        self._save_cache()
+        # 关闭blob读取进程；检查全部文件时顺便清理已删除文件的缓存条目
+        if not self.keep_git_process:
+            self.blob_fetcher.close()
+            _close_worker_blob_fetcher()
+        if check_all:
+            self.cache.prune_missing()
+        if self.record_cache is not None:
+            self.record_cache.flush()
+            self.record_cache.prune()
         
         # 输出统计信息
         print("-" * 60)
@@ -292,52 +1116,173 @@ class ExcelChecker:
         
         print(f"检查完成: 通过 {passed} 个, 跳过 {skipped} 个, 失败 {failed} 个")
         
+        if shard_writer is not None:
+            shard_writer.close()
+            print(f"分片检查结果已保存到 {shard_writer.path}")
+        
+        if self.profiler.enabled:
+            self._report_profile()
+        
         return len(self.errors) == 0
+    
+    def _report_profile(self):
+        """输出各阶段耗时汇总表和Chrome trace文件"""
+        print("-" * 60)
+        self.profiler.print_summary()
+        trace_path = self.config['profile_output']
+        try:
+            self.profiler.write_trace(trace_path)
+            print(f"计时数据已保存到 {trace_path}（可在 chrome://tracing 或 Perfetto 中打开）")
+        except OSError as e:
+            print(f"无法保存计时数据: {str(e)}")
+
+
+def _completed_future(result):
+    """将已有结果包装为已完成的future"""
+    future = Future()
+    future.set_result(result)
+    return future
+
+
+def create_process_pool(max_workers):
+    """
+    创建进程池；支持时通过forkserver启动子进程
+    进程池在检查过程中才创建，此时其他线程可能正在启动git进程，
+    直接fork会让子进程继承这些管道，导致git进程收不到EOF、启动git的线程一直等待
+    """
+    if "forkserver" not in multiprocessing.get_all_start_methods():
+        return ProcessPoolExecutor(max_workers=max_workers)
+    context = multiprocessing.get_context("forkserver")
+    # 服务进程预先导入检查器，之后fork出的子进程无需重复导入
+    context.set_forkserver_preload([__name__])
+    return ProcessPoolExecutor(max_workers=max_workers, mp_context=context)
+
+
+def _evaluate_in_process(task):
+    """进程池工作函数"""
+    return ExcelChecker._evaluate_task(task)
+
+
+# 评估阶段补读远程blob（远程修订记录来自缓存、逐个单元格确认时才需要内容）使用的读取器和LFS对象库，
+# 每个进程（包括进程池的子进程）首次使用时创建，之后检查的文件共用
+_worker_fetcher = None
+_worker_lfs = None
+_worker_lock = threading.Lock()
+
+
+def _worker_blob_fetcher():
+    """当前进程共用的blob读取器"""
+    global _worker_fetcher
+    with _worker_lock:
+        if _worker_fetcher is None:
+            _worker_fetcher = GitBlobFetcher()
+        return _worker_fetcher
+
+
+def _worker_lfs_store():
+    """当前进程共用的LFS对象库，遇到第一个LFS指针时才定位"""
+    global _worker_lfs
+    with _worker_lock:
+        if _worker_lfs is None:
+            _worker_lfs = LfsObjectStore(lfs_objects_dir())
+        return _worker_lfs
+
+
+def _close_worker_blob_fetcher():
+    """关闭当前进程共用的 git cat-file 进程（下次读取时重新启动）"""
+    with _worker_lock:
+        if _worker_fetcher is not None:
+            _worker_fetcher.close()
 
 
 def main():
     """主函数"""
     import argparse
     
+    if len(sys.argv) > 1 and sys.argv[1] == "audit":
+        # 历史审计子命令
+        from history_audit import main as audit_main
+        audit_main(sys.argv[2:])
+        return
+    if len(sys.argv) > 1 and sys.argv[1] == "diff":
+        # 单元格差异比较子命令
+        from workbook_diff import main as diff_main
+        diff_main(sys.argv[2:])
+        return
+    if len(sys.argv) > 1 and sys.argv[1] == "merge":
+        # 合并CI分片结果子命令
+        from ci_shards import main as merge_main
+        merge_main(sys.argv[2:])
+        return
+    
     parser = argparse.ArgumentParser(description='Excel文件检查器')
     parser.add_argument('--all', action='store_true', help='检查所有Excel文件')
     parser.add_argument('--files', nargs='+', help='指定要检查的文件列表')
+    parser.add_argument('--watch', action='store_true',
+                        help='监视Excel目录，文件保存后在后台预先检查并写入缓存')
+    parser.add_argument('--ref', action='append', dest='refs', metavar='REF',
+                        help='比较的目标分支，可以指定多次（默认读取配置 target_refs）')
+    parser.add_argument('--shard', metavar='INDEX/COUNT',
+                        help='CI分片：只检查第INDEX个分片（从1开始，共COUNT个）的文件，结果写入NDJSON文件')
+    parser.add_argument('--shard-output', metavar='FILE',
+                        help='分片检查结果文件（默认 excel_check_shard_INDEX_of_COUNT.ndjson）')
+    parser.add_argument('--paranoid', action='store_true', help='不信任stat指纹，始终重新计算文件哈希')
+    parser.add_argument('--profile', nargs='?', const=True, metavar='TRACE_FILE',
+                        help='记录各阶段耗时，输出汇总表和Chrome trace文件')
     
     args = parser.parse_args()
+    shard = None
+    if args.shard:
+        shard, error = parse_shard(args.shard)
+        if error:
+            parser.error(error)
     
     checker = ExcelChecker()
+    checker.shard = shard
+    checker.shard_output = args.shard_output
+    if args.paranoid:
+        checker.config['paranoid_hash'] = True
+    if args.refs:
+        checker.config['target_refs'] = args.refs
+    if args.profile:
+        checker.config['profile'] = True
+        if args.profile is not True:
+            checker.config['profile_output'] = args.profile
+    
+    if args.watch:
+        # 持续监视，提交时钩子直接使用缓存的检查结果
+        if not os.path.isdir(EXCEL_DIR):
+            print(f"目录不存在: {EXCEL_DIR}")
+            sys.exit(1)
+        try:
+            WorkbookWatcher(
+                checker, EXCEL_DIR,
+                debounce=checker.config['watch_debounce'],
+                poll_interval=checker.config['watch_poll_interval']
+            ).run()
+        finally:
+            checker.close()
+        sys.exit(0)
     
     if args.files:
         # 检查指定的文件
         file_list = []
         for filepath in args.files:
             if os.path.exists(filepath):
-                relative_path = os.path.basename(filepath)
+                relative_path = to_git_path(os.path.relpath(filepath))
                 file_list.append((filepath, relative_path))
         success = checker.check_files(file_list)
     elif args.all:
         # 检查所有文件
         success = checker.check_files()
     else:
-        # 检查暂存区的文件
+        # 检查暂存区的文件（按暂存区中的blob检查，而不是工作区文件）
         try:
-            # 获取暂存区的Excel文件
-            result = subprocess.run(
-                ['git', 'diff', '--cached', '--name-only', '--diff-filter=ACM'],
-                capture_output=True,
-                text=True,
-                encoding='utf-8'
-            )
+            staged_oids, error = checker.get_staged_files()
             
-            if result.returncode == 0:
-                staged_files = result.stdout.strip().split('\n')
-                file_list = []
-                for filepath in staged_files:
-                    if filepath.endswith('.xlsx') and os.path.exists(filepath):
-                        file_list.append((filepath, filepath))
-                
-                if file_list:
-                    success = checker.check_files(file_list)
+            if error is None:
+                if staged_oids:
+                    success = checker.check_staged_files(staged_oids)
                 else:
                     print("暂存区中没有Excel文件需要检查")
                     success = True
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+按文件大小调度检查任务
+工作量大的文件优先开始，避免最后只剩一个大文件在运行；在途文件的预估内存不超过预算，
+并发数从CPU核数开始，根据实测的吞吐量（每秒处理的字节数）逐步调整。
+工作量按zip中央目录中各部件的未压缩大小估算（解析的是解压后的XML），内存按文件大小估算
+（文件内容以压缩形式保存在内存中，sheet为流式解析）
+"""
+
+import os
+import time
+from collections import deque
+
+from xlsx_reader import uncompressed_size
+
+# 每个文件的固定开销（缓存查询、启动git读取、进程间传输等）折算的字节数，计算吞吐量时使用
+FILE_OVERHEAD_BYTES = 256 * 1024
+# 吞吐量变化超过该比例才调整并发数，避免随测量误差来回波动
+THROUGHPUT_TOLERANCE = 0.05
+# 每个评估窗口至少完成的文件数
+MIN_WINDOW_FILES = 4
+
+
+def _file_size(filepath):
+    """文件大小，文件不存在时按0计算"""
+    try:
+        return os.path.getsize(filepath)
+    except OSError:
+        return 0
+
+
+def _work_size(filepath, file_size):
+    """文件的工作量：各部件的未压缩大小之和，无法识别为zip时按文件大小计算"""
+    if not file_size:
+        return 0
+    size = uncompressed_size(filepath)
+    return file_size if size is None else size
+
+
+class FileScheduler:
+    """
+    决定哪些文件可以开始检查
+    文件按工作量从大到小开始；队首文件放不进内存预算时等待在途文件完成
+    （单个文件超过预算时单独运行），不会让小文件插队导致大文件一直无法开始
+    每个文件的预估内存为 文件大小 × copies（本地内容和各分支的远程内容同时在内存中，解析为流式读取）
+    同一相对路径出现多次时只检查一次
+    """
+
+    def __init__(self, file_list, copies=2, memory_budget=None,
+                 initial_workers=None, max_workers=10, adaptive=True):
+        files = {}
+        for filepath, relative_path in file_list:
+            files.setdefault(relative_path, filepath)
+        self._sizes = {relative_path: _file_size(filepath) for relative_path, filepath in files.items()}
+        self._work = {
+            relative_path: _work_size(filepath, self._sizes[relative_path])
+            for relative_path, filepath in files.items()
+        }
+        self._queue = deque(sorted(
+            ((filepath, relative_path) for relative_path, filepath in files.items()),
+            key=lambda item: (-self._work[item[1]], item[1])
+        ))
+        self.copies = copies
+        self.memory_budget = memory_budget
+        self.max_workers = max(1, max_workers)
+        self.adaptive = adaptive
+        if adaptive:
+            self.limit = min(self.max_workers, initial_workers or os.cpu_count() or 1)
+        else:
+            self.limit = self.max_workers
+        # 在途文件: 相对路径 -> 预估内存
+        self._running = {}
+        self._memory = 0
+        # 吞吐量评估窗口
+        self._window_start = None
+        self._window_bytes = 0
+        self._window_files = 0
+        self._last_throughput = None
+        self._direction = 1
+
+    @property
+    def pending(self):
+        """是否还有未开始或未完成的文件"""
+        return bool(self._queue or self._running)
+
+    def take(self):
+        """返回现在可以开始的文件 [(文件路径, 相对路径)]"""
+        started = []
+        while self._queue and len(self._running) < self.limit:
+            filepath, relative_path = self._queue[0]
+            cost = self._sizes[relative_path] * self.copies
+            if (self._running and self.memory_budget is not None
+                    and self._memory + cost > self.memory_budget):
+                break
+            self._queue.popleft()
+            self._running[relative_path] = cost
+            self._memory += cost
+            started.append((filepath, relative_path))
+        if started and self._window_start is None:
+            self._window_start = time.monotonic()
+        return started
+
+    def finish(self, relative_path, measured=True):
+        """
+        文件检查完成，释放内存预算
+        measured为False（例如缓存命中跳过）时不计入吞吐量
+        """
+        self._memory -= self._running.pop(relative_path)
+        if measured and self.adaptive:
+            self._record(self._work[relative_path])
+
+    def _record(self, size):
+        """每完成一个窗口比较一次吞吐量：提升时沿同一方向继续调整，下降时反向调整"""
+        self._window_bytes += size + FILE_OVERHEAD_BYTES
+        self._window_files += 1
+        if self._window_files < max(MIN_WINDOW_FILES, self.limit):
+            return
+
+        now = time.monotonic()
+        throughput = self._window_bytes / max(now - self._window_start, 1e-6)
+        last = self._last_throughput
+        self._window_start = now
+        self._window_bytes = 0
+        self._window_files = 0
+        self._last_throughput = throughput
+
+        if last is None or throughput > last * (1 + THROUGHPUT_TOLERANCE):
+            step = self._direction
+        elif throughput < last * (1 - THROUGHPUT_TOLERANCE):
+            self._direction = -self._direction
+            step = self._direction
+        else:
+            return
+        self.limit = min(self.max_workers, max(1, self.limit + step))
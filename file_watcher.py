@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+工作区Excel文件监视
+Linux上使用inotify（通过ctypes调用libc，无需第三方库），其他平台或inotify不可用时按固定间隔轮询stat。
+Excel保存时会先写临时文件再改名，或分多次写入同一个文件，
+文件在防抖时间内没有新的变化且大小、修改时间保持不变后才视为保存完成，随后在后台线程中检查。
+检查结果写入缓存（哈希即git blob OID），提交时pre-commit钩子对暂存的相同内容直接命中缓存
+"""
+
+import ctypes
+import ctypes.util
+import os
+import queue
+import select
+import struct
+import sys
+import threading
+import time
+
+from git_blobs import to_git_path
+
+# inotify事件掩码
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_Q_OVERFLOW = 0x00004000
+WATCH_MASK = (IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM
+              | IN_MOVED_TO | IN_CREATE | IN_DELETE)
+_EVENT_HEADER = struct.Struct("iIII")
+
+
+def is_workbook_name(name):
+    """是否为需要检查的工作簿（排除Excel打开文件时生成的 ~$ 锁文件）"""
+    return name.endswith(".xlsx") and not name.startswith("~$")
+
+
+def _signature(path):
+    """文件的大小和修改时间，文件不存在时返回None"""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_size, st.st_mtime_ns
+
+
+class PollingWatcher:
+    """按固定间隔比较目录中文件的stat，适用于所有平台"""
+
+    def __init__(self, directory, interval=1.0):
+        self.directory = directory
+        self.interval = interval
+        self._snapshot = self._scan()
+
+    def _scan(self):
+        snapshot = {}
+        try:
+            with os.scandir(self.directory) as entries:
+                for entry in entries:
+                    try:
+                        st = entry.stat()
+                    except OSError:
+                        continue
+                    snapshot[entry.name] = (st.st_size, st.st_mtime_ns)
+        except OSError:
+            pass
+        return snapshot
+
+    def wait(self, timeout=None):
+        """等待最多timeout秒（None表示一个轮询间隔），返回有变化的文件名集合"""
+        time.sleep(self.interval if timeout is None else min(self.interval, timeout))
+        snapshot = self._scan()
+        changed = {
+            name for name in snapshot.keys() | self._snapshot.keys()
+            if snapshot.get(name) != self._snapshot.get(name)
+        }
+        self._snapshot = snapshot
+        return changed
+
+    def close(self):
+        pass
+
+
+class InotifyWatcher:
+    """基于Linux inotify的目录监视，目录中的文件没有变化时不占用CPU"""
+
+    def __init__(self, directory):
+        self.directory = directory
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        if not hasattr(libc, "inotify_init1"):
+            raise OSError("当前系统不支持inotify")
+        # IN_NONBLOCK 和 IN_CLOEXEC 的取值与 O_NONBLOCK、O_CLOEXEC 相同
+        self._fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self._fd < 0:
+            errno = ctypes.get_errno()
+            raise OSError(errno, os.strerror(errno))
+        if libc.inotify_add_watch(self._fd, os.fsencode(directory), WATCH_MASK) < 0:
+            errno = ctypes.get_errno()
+            os.close(self._fd)
+            raise OSError(errno, os.strerror(errno))
+
+    def wait(self, timeout=None):
+        """等待最多timeout秒（None表示一直等待），返回有变化的文件名集合"""
+        ready, _, _ = select.select([self._fd], [], [], timeout)
+        if not ready:
+            return set()
+
+        changed = set()
+        while True:
+            try:
+                data = os.read(self._fd, 65536)
+            except BlockingIOError:
+                break
+            offset = 0
+            while offset < len(data):
+                _wd, mask, _cookie, length = _EVENT_HEADER.unpack_from(data, offset)
+                offset += _EVENT_HEADER.size
+                name = data[offset:offset + length].rstrip(b"\0")
+                offset += length
+                if mask & IN_Q_OVERFLOW:
+                    # 事件队列溢出，当作目录中所有文件都有变化
+                    changed.update(os.listdir(self.directory))
+                elif name:
+                    changed.add(os.fsdecode(name))
+        return changed
+
+    def close(self):
+        os.close(self._fd)
+
+
+def create_watcher(directory, poll_interval=1.0):
+    """优先使用inotify，不可用时退回轮询"""
+    if sys.platform.startswith("linux"):
+        try:
+            return InotifyWatcher(directory)
+        except (OSError, AttributeError):
+            pass
+    return PollingWatcher(directory, poll_interval)
+
+
+class WorkbookWatcher:
+    """
+    监视目录中的工作簿，保存完成后在后台线程中用checker检查
+    检查期间发生的变化会在检查结束后再次检查
+    """
+
+    def __init__(self, checker, directory, debounce=2.0, poll_interval=1.0):
+        self.checker = checker
+        self.directory = directory
+        self.debounce = debounce
+        self.poll_interval = poll_interval
+        # 文件名 -> (最后一次变化的时间, 当时的stat签名)
+        self._pending = {}
+        self._batches = queue.Queue()
+
+    def run(self):
+        """监视直到收到Ctrl+C，启动时先检查一遍目录中的所有文件"""
+        watcher = create_watcher(self.directory, self.poll_interval)
+        mode = "inotify" if isinstance(watcher, InotifyWatcher) else f"轮询（间隔 {self.poll_interval} 秒）"
+        print(f"监视目录 {self.directory}，使用{mode}，按 Ctrl+C 停止")
+
+        # 检查器只在后台线程中使用；保持git进程供后续检查复用
+        self.checker.keep_git_process = True
+        worker = threading.Thread(target=self._check_worker, daemon=True)
+        worker.start()
+        self._batches.put(None)
+        try:
+            while True:
+                changed = watcher.wait(self._next_timeout())
+                now = time.monotonic()
+                for name in changed:
+                    if is_workbook_name(name):
+                        self._pending[name] = (now, _signature(os.path.join(self.directory, name)))
+                settled = self._take_settled(now)
+                if settled:
+                    self._batches.put(settled)
+        except KeyboardInterrupt:
+            print("\n停止监视")
+        finally:
+            self._batches.put(False)
+            try:
+                worker.join()
+            except KeyboardInterrupt:
+                # 再次按下Ctrl+C时不再等待正在进行的检查
+                pass
+            watcher.close()
+
+    def _next_timeout(self):
+        """距离最早一个待检查文件防抖结束的时间，没有待检查文件时返回None"""
+        if not self._pending:
+            return None
+        earliest = min(changed_at for changed_at, _ in self._pending.values())
+        return max(0.0, earliest + self.debounce - time.monotonic())
+
+    def _take_settled(self, now):
+        """取出防抖时间内没有变化、且stat签名稳定的文件"""
+        settled = []
+        for name, (changed_at, signature) in list(self._pending.items()):
+            if now - changed_at < self.debounce:
+                continue
+            current = _signature(os.path.join(self.directory, name))
+            if current is None:
+                # 文件已删除或被改名（Excel保存时的临时文件）
+                del self._pending[name]
+            elif current != signature:
+                # 事件丢失或仍在写入，重新开始计时
+                self._pending[name] = (now, current)
+            else:
+                del self._pending[name]
+                settled.append(name)
+        return sorted(settled)
+
+    def _check_worker(self):
+        """后台检查线程：None表示检查全部文件，False表示退出"""
+        while True:
+            batch = self._batches.get()
+            if batch is False:
+                break
+            self.checker.errors = []
+            self.checker.warnings = []
+            try:
+                if batch is None:
+                    print("检查现有文件")
+                    self.checker.check_files()
+                else:
+                    print(f"\n[{time.strftime('%H:%M:%S')}] 检测到 {len(batch)} 个文件保存完成")
+                    file_list = []
+                    for name in batch:
+                        filepath = os.path.join(self.directory, name)
+                        file_list.append((filepath, to_git_path(filepath)))
+                    self.checker.check_files(file_list)
+            except Exception as e:
+                print(f"检查时发生异常: {str(e)}")
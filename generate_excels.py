@@ -3,13 +3,20 @@
 """
 Excel文件生成器
 生成100个Excel文件，每个文件包含多个sheet和修改记录
+--fast 模式使用只写工作簿和共享的命名样式，在多个进程中并行生成大规模测试数据；
+--pairs 模式生成远程/本地两份有分歧的文件，用于测试版本检查
 """
 
+import argparse
+import json
 import os
 import random
+from concurrent.futures import ProcessPoolExecutor
+from copy import copy
 from datetime import datetime, timedelta
 from openpyxl import Workbook
-from openpyxl.styles import Font, Alignment, PatternFill
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Font, Alignment, NamedStyle, PatternFill
 
 # 常量定义
 EXCEL_COUNT = 100
@@ -17,6 +24,17 @@ SHEET_COUNT = 3
 RECORD_SHEET_NAME = "修改记录"
 OUTPUT_DIR = "excels"
 
+# 快速模式的默认参数
+FAST_ROWS_PER_SHEET = 20
+FAST_REVISION_ROWS = 5
+HEADER_STYLE_NAME = "表头"
+DATA_STYLE_NAME = "数据"
+# 快速模式下修订时间的起点，保证相同种子生成的文件完全一致
+REVISION_BASE_TIME = datetime(2025, 1, 1, 9, 0, 0)
+REVISION_HEADERS = ["修订人", "修订时间", "修订内容", "修订版本"]
+DATA_HEADERS = ["序号", "项目名称", "数值", "状态", "备注"]
+PAIRS_MANIFEST = "pairs.json"
+
 # 修订人列表
 REVISERS = ["张三", "李四", "王五", "赵六", "钱七"]
 
@@ -141,15 +159,15 @@ def create_data_sheet(ws, sheet_name):
     ws.freeze_panes = 'A2'
 
 
-def generate_excel_files():
+def generate_excel_files(count=EXCEL_COUNT, sheets=SHEET_COUNT, output_dir=OUTPUT_DIR):
     """生成Excel文件"""
     # 创建输出目录
-    if not os.path.exists(OUTPUT_DIR):
-        os.makedirs(OUTPUT_DIR)
+    if not os.path.exists(output_dir):
+        os.makedirs(output_dir)
     
-    print(f"开始生成 {EXCEL_COUNT} 个Excel文件...")
+    print(f"开始生成 {count} 个Excel文件...")
     
-    for i in range(1, EXCEL_COUNT + 1):
+    for i in range(1, count + 1):
         wb = Workbook()
         
         # 删除默认sheet
@@ -161,21 +179,204 @@ def generate_excel_files():
         create_revision_sheet(ws_revision)
         
         # 创建数据sheet
-        for j in range(1, SHEET_COUNT + 1):
+        for j in range(1, sheets + 1):
             sheet_name = f"数据表{j}"
             ws_data = wb.create_sheet(sheet_name, j)
             create_data_sheet(ws_data, sheet_name)
         
         # 保存文件
         filename = f"数据文件_{i:03d}.xlsx"
-        filepath = os.path.join(OUTPUT_DIR, filename)
+        filepath = os.path.join(output_dir, filename)
         wb.save(filepath)
         
         if i % 10 == 0:
             print(f"已生成 {i} 个文件...")
     
-    print(f"✓ 成功生成 {EXCEL_COUNT} 个Excel文件到 {OUTPUT_DIR} 目录")
+    print(f"✓ 成功生成 {count} 个Excel文件到 {output_dir} 目录")
+
+
+def create_named_styles():
+    """创建快速模式共享的命名样式（每个工作簿注册一次，单元格只引用样式名）"""
+    header_style = NamedStyle(name=HEADER_STYLE_NAME)
+    for key, value in create_header_style().items():
+        setattr(header_style, key, value)
+    data_style = NamedStyle(name=DATA_STYLE_NAME)
+    for key, value in create_data_style().items():
+        setattr(data_style, key, value)
+    return header_style, data_style
+
+
+def _style_template(ws, style_name):
+    """
+    引用命名样式的模板单元格
+    按名称设置样式需要查找并解析命名样式，每个sheet只解析一次，之后直接复制样式数组
+    """
+    template = WriteOnlyCell(ws)
+    template.style = style_name
+    return template
+
+
+def _styled_row(ws, values, template):
+    """构造与模板单元格样式相同的只写单元格行"""
+    cells = []
+    for value in values:
+        cell = WriteOnlyCell(ws, value=value)
+        cell._style = copy(template._style)
+        cells.append(cell)
+    return cells
+
+
+def make_revision_rows(rng, count, start=0, revisers=REVISERS, contents=REVISION_CONTENTS):
+    """生成修订记录行，修订时间按行号递增"""
+    rows = []
+    for row_index in range(start, start + count):
+        revision_time = REVISION_BASE_TIME + timedelta(hours=row_index, minutes=rng.randint(0, 59))
+        rows.append([
+            rng.choice(revisers),
+            revision_time.strftime("%Y-%m-%d %H:%M:%S"),
+            rng.choice(contents),
+            f"v{row_index + 1}.0"
+        ])
+    return rows
+
+
+def write_fast_workbook(filepath, revision_rows, sheet_count, rows_per_sheet, rng):
+    """以只写模式生成工作簿：修改记录sheet加sheet_count个数据sheet"""
+    wb = Workbook(write_only=True)
+    for style in create_named_styles():
+        wb.add_named_style(style)
+    
+    ws = wb.create_sheet(RECORD_SHEET_NAME)
+    for column, width in zip("ABCD", (12, 20, 40, 12)):
+        ws.column_dimensions[column].width = width
+    ws.freeze_panes = 'A2'
+    header = _style_template(ws, HEADER_STYLE_NAME)
+    data = _style_template(ws, DATA_STYLE_NAME)
+    ws.append(_styled_row(ws, REVISION_HEADERS, header))
+    for row in revision_rows:
+        ws.append(_styled_row(ws, row, data))
+    
+    for j in range(1, sheet_count + 1):
+        sheet_name = f"数据表{j}"
+        ws = wb.create_sheet(sheet_name)
+        for column, width in zip("ABCDE", (8, 20, 12, 10, 30)):
+            ws.column_dimensions[column].width = width
+        ws.freeze_panes = 'A2'
+        ws.append(_styled_row(ws, DATA_HEADERS, header))
+        for row_idx in range(1, rows_per_sheet + 1):
+            ws.append(_styled_row(ws, [
+                row_idx,
+                f"{sheet_name}-项目{row_idx}",
+                rng.randint(100, 10000),
+                rng.choice(["进行中", "已完成", "待处理"]),
+                f"这是{sheet_name}的备注信息{row_idx}"
+            ], data))
+    
+    wb.save(filepath)
+
+
+def _file_rng(seed, index):
+    """每个文件独立的随机数生成器，生成结果与进程数和执行顺序无关"""
+    return random.Random(f"{seed}-{index}")
+
+
+def _generate_fast_file(job):
+    """进程池工作函数：生成单个文件（或一对远程/本地文件）"""
+    index, options = job
+    rng = _file_rng(options["seed"], index)
+    filename = f"数据文件_{index:03d}.xlsx"
+    sheet_count = options["sheets"]
+    rows_per_sheet = options["rows"]
+    revision_rows = make_revision_rows(rng, options["revisions"])
+    
+    if not options["pairs"]:
+        write_fast_workbook(os.path.join(options["output_dir"], filename),
+                            revision_rows, sheet_count, rows_per_sheet, rng)
+        return filename, None
+    
+    # 远程在共同历史之后追加了新的修订；本地要么基于远程最新版本修改，要么基于旧版本修改
+    remote_rows = revision_rows + make_revision_rows(rng, rng.randint(1, 3), start=len(revision_rows))
+    stale = rng.random() < options["stale_ratio"]
+    local_rows = (revision_rows if stale else remote_rows) + [
+        ["本地用户", "2030-01-01 00:00:00", "本地修改", "local"]
+    ]
+    data_seed = rng.random()
+    write_fast_workbook(os.path.join(options["output_dir"], "remote", filename),
+                        remote_rows, sheet_count, rows_per_sheet, random.Random(data_seed))
+    write_fast_workbook(os.path.join(options["output_dir"], "local", filename),
+                        local_rows, sheet_count, rows_per_sheet, random.Random(data_seed))
+    return filename, "stale" if stale else "up_to_date"
+
+
+def generate_fast(count=EXCEL_COUNT, sheets=SHEET_COUNT, rows=FAST_ROWS_PER_SHEET,
+                  revisions=FAST_REVISION_ROWS, seed=0, output_dir=OUTPUT_DIR,
+                  processes=None, pairs=False, stale_ratio=0.5):
+    """
+    快速模式：多进程并行生成只写工作簿，相同参数和种子生成的内容相同
+    pairs为True时在 output_dir/remote 和 output_dir/local 下生成成对的文件，
+    并在 pairs.json 中记录每对文件的预期结果（stale表示本地未基于远程最新版本）
+    """
+    if pairs:
+        os.makedirs(os.path.join(output_dir, "remote"), exist_ok=True)
+        os.makedirs(os.path.join(output_dir, "local"), exist_ok=True)
+    else:
+        os.makedirs(output_dir, exist_ok=True)
+    
+    options = {
+        "seed": seed,
+        "sheets": sheets,
+        "rows": rows,
+        "revisions": revisions,
+        "output_dir": output_dir,
+        "pairs": pairs,
+        "stale_ratio": stale_ratio
+    }
+    jobs = [(i, options) for i in range(1, count + 1)]
+    
+    print(f"开始生成 {count} 个Excel文件{'对' if pairs else ''}（快速模式）...")
+    manifest = {}
+    with ProcessPoolExecutor(max_workers=processes) as executor:
+        for done, (filename, verdict) in enumerate(
+                executor.map(_generate_fast_file, jobs, chunksize=max(1, count // 64)), 1):
+            if verdict is not None:
+                manifest[filename] = verdict
+            if done % 100 == 0:
+                print(f"已生成 {done} 个文件...")
+    
+    if pairs:
+        with open(os.path.join(output_dir, PAIRS_MANIFEST), 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, ensure_ascii=False, indent=2, sort_keys=True)
+    print(f"✓ 成功生成 {count} 个Excel文件{'对' if pairs else ''}到 {output_dir} 目录")
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description='Excel文件生成器')
+    parser.add_argument('--count', type=int, default=EXCEL_COUNT, help='生成的文件数量')
+    parser.add_argument('--sheets', type=int, default=SHEET_COUNT, help='每个文件的数据sheet数')
+    parser.add_argument('--output-dir', default=OUTPUT_DIR, help='输出目录')
+    parser.add_argument('--seed', type=int, help='随机种子，指定后生成结果可复现')
+    parser.add_argument('--fast', action='store_true', help='使用只写工作簿在多个进程中并行生成')
+    parser.add_argument('--rows', type=int, default=FAST_ROWS_PER_SHEET, help='快速模式：每个数据sheet的行数')
+    parser.add_argument('--revisions', type=int, default=FAST_REVISION_ROWS, help='快速模式：修订记录的行数')
+    parser.add_argument('--processes', type=int, help='快速模式：进程数，默认为CPU核数')
+    parser.add_argument('--pairs', action='store_true',
+                        help='生成远程/本地有分歧的成对文件（隐含 --fast）')
+    parser.add_argument('--stale-ratio', type=float, default=0.5,
+                        help='成对模式：本地未基于远程最新版本的文件比例')
+    args = parser.parse_args()
+    
+    if args.fast or args.pairs:
+        generate_fast(count=args.count, sheets=args.sheets, rows=args.rows,
+                      revisions=args.revisions, seed=args.seed or 0,
+                      output_dir=args.output_dir, processes=args.processes,
+                      pairs=args.pairs, stale_ratio=args.stale_ratio)
+        return
+    
+    if args.seed is not None:
+        random.seed(args.seed)
+    generate_excel_files(count=args.count, sheets=args.sheets, output_dir=args.output_dir)
 
 
 if __name__ == "__main__":
-    generate_excel_files()
+    main()
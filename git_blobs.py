@@ -0,0 +1,329 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Git blob读取服务
+通过一次 git ls-tree 解析所有文件的blob OID，
+再通过常驻的 git cat-file --batch 进程流式读取blob内容
+（AsyncBlobReader 为供asyncio流水线使用的协程版本）
+"""
+
+import asyncio
+import os
+import queue
+import subprocess
+import threading
+
+# 每次 git ls-tree 传入的路径数量，避免命令行超长（Windows限制约32K字符）
+LS_TREE_CHUNK_SIZE = 200
+# git的空树对象，首次提交前没有HEAD时用它与暂存区比较
+EMPTY_TREE_OID = "4b825dc642cb6eb9a060e54bf8d69288fbee4904"
+
+
+class BlobFetchError(Exception):
+    """读取blob失败"""
+
+
+class BlobMissingError(BlobFetchError):
+    """目标分支中不存在该文件"""
+
+
+def to_git_path(path):
+    """将本地路径转换为git使用的路径格式"""
+    return path.replace(os.sep, "/")
+
+
+def list_staged_blobs(diff_filter="ACM", timeout=30, cwd=None):
+    """
+    一次性获取暂存区中有变更的文件及其blob OID
+    返回 {路径: OID}，git命令失败时抛出BlobFetchError
+    """
+    head = "HEAD"
+    try:
+        probe = subprocess.run(
+            ['git', 'rev-parse', '--verify', '--quiet', 'HEAD'],
+            capture_output=True,
+            timeout=timeout,
+            cwd=cwd
+        )
+        if probe.returncode != 0:
+            head = EMPTY_TREE_OID
+        result = subprocess.run(
+            ['git', 'diff-index', '--cached', '-z', '--no-renames',
+             f'--diff-filter={diff_filter}', head],
+            capture_output=True,
+            timeout=timeout,
+            cwd=cwd
+        )
+    except subprocess.TimeoutExpired:
+        raise BlobFetchError("获取暂存区文件超时")
+    except OSError as e:
+        raise BlobFetchError(f"无法执行git命令: {str(e)}")
+
+    if result.returncode != 0:
+        message = result.stderr.decode('utf-8', errors='replace').strip()
+        raise BlobFetchError(f"无法获取暂存区文件: {message}")
+
+    # 输出格式: ":旧模式 新模式 旧OID 新OID 状态\0路径\0"
+    staged = {}
+    fields = result.stdout.split(b'\0')
+    for info, name in zip(fields[0::2], fields[1::2]):
+        if not info:
+            continue
+        staged[name.decode('utf-8')] = info.split()[3].decode('ascii')
+    return staged
+
+
+class GitBlobFetcher:
+    """基于 git cat-file --batch 的blob读取器，可在多个线程间共享"""
+
+    def __init__(self, timeout=30, cwd=None):
+        """timeout为单个blob的读取超时时间（秒）"""
+        self.timeout = timeout
+        self.cwd = cwd
+        self._lock = threading.Lock()
+        self._process = None
+        self._responses = None
+        self._oids = {}
+        self._ref_errors = {}
+
+    def resolve(self, paths, ref="main"):
+        """
+        一次性解析路径在指定分支中的blob OID
+        返回 {路径: OID}，分支中不存在的路径不会出现在结果中
+        """
+        # 分支可能已更新，重新解析时清除上次的错误
+        self._ref_errors.pop(ref, None)
+        resolved = {}
+        git_paths = {to_git_path(path): path for path in paths}
+        names = list(git_paths)
+        for start in range(0, len(names), LS_TREE_CHUNK_SIZE):
+            chunk = names[start:start + LS_TREE_CHUNK_SIZE]
+            try:
+                result = subprocess.run(
+                    ['git', 'ls-tree', '-z', ref, '--'] + chunk,
+                    capture_output=True,
+                    timeout=self.timeout,
+                    cwd=self.cwd
+                )
+            except subprocess.TimeoutExpired:
+                self._ref_errors[ref] = f"解析远程文件列表超时: {ref}"
+                return resolved
+            except OSError as e:
+                self._ref_errors[ref] = f"无法执行git命令: {str(e)}"
+                return resolved
+
+            if result.returncode != 0:
+                message = result.stderr.decode('utf-8', errors='replace').strip()
+                self._ref_errors[ref] = f"无法解析远程分支 {ref}: {message}"
+                return resolved
+
+            for entry in result.stdout.split(b'\0'):
+                if not entry:
+                    continue
+                info, _, name = entry.partition(b'\t')
+                _mode, obj_type, oid = info.split()
+                name = name.decode('utf-8')
+                if obj_type == b'blob' and name in git_paths:
+                    resolved[git_paths[name]] = oid.decode('ascii')
+
+        for path in paths:
+            self._oids[(ref, path)] = resolved.get(path)
+        return resolved
+
+    def get_oid(self, path, ref="main"):
+        """获取路径在指定分支中的blob OID，不存在时抛出BlobMissingError"""
+        key = (ref, path)
+        if key not in self._oids and ref not in self._ref_errors:
+            self.resolve([path], ref)
+        if ref in self._ref_errors:
+            raise BlobFetchError(self._ref_errors[ref])
+        oid = self._oids.get(key)
+        if oid is None:
+            raise BlobMissingError(f"分支 {ref} 中不存在该文件（可能是新文件）: {path}")
+        return oid
+
+    def read_path(self, path, ref="main"):
+        """读取路径在指定分支中的内容"""
+        return self.read(self.get_oid(path, ref))
+
+    def read(self, oid):
+        """读取blob内容，超时或进程异常时抛出BlobFetchError"""
+        with self._lock:
+            if self._process is None:
+                self._start()
+            try:
+                self._process.stdin.write(oid.encode('ascii') + b'\n')
+                self._process.stdin.flush()
+            except OSError as e:
+                self._stop()
+                raise BlobFetchError(f"git cat-file 进程写入失败: {str(e)}")
+
+            try:
+                response = self._responses.get(timeout=self.timeout)
+            except queue.Empty:
+                # 进程可能卡住，终止后下次读取时重新启动
+                self._stop()
+                raise BlobFetchError(f"读取blob超时: {oid}")
+
+            if response is None:
+                self._stop()
+                raise BlobFetchError("git cat-file 进程意外退出")
+
+            obj_type, content = response
+            if content is None:
+                raise BlobMissingError(f"对象不存在: {oid}")
+            if obj_type != b'blob':
+                raise BlobFetchError(f"对象不是blob: {oid}")
+            return content
+
+    def _start(self):
+        """启动 git cat-file --batch 进程和读取线程"""
+        try:
+            self._process = subprocess.Popen(
+                ['git', 'cat-file', '--batch'],
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.DEVNULL,
+                cwd=self.cwd
+            )
+        except OSError as e:
+            self._process = None
+            raise BlobFetchError(f"无法启动 git cat-file: {str(e)}")
+
+        self._responses = queue.Queue()
+        reader = threading.Thread(
+            target=self._read_responses,
+            args=(self._process.stdout, self._responses),
+            daemon=True
+        )
+        reader.start()
+
+    @staticmethod
+    def _read_responses(stdout, responses):
+        """读取线程：按请求顺序解析 cat-file 的输出"""
+        try:
+            while True:
+                header = stdout.readline()
+                if not header:
+                    break
+                parts = header.split()
+                if len(parts) == 2 and parts[1] == b'missing':
+                    responses.put((None, None))
+                    continue
+                size = int(parts[2])
+                content = stdout.read(size)
+                stdout.read(1)
+                responses.put((parts[1], content))
+        except (OSError, ValueError, IndexError):
+            pass
+        responses.put(None)
+
+    def _stop(self):
+        """终止 cat-file 进程"""
+        process = self._process
+        self._process = None
+        if process is None:
+            return
+        try:
+            process.stdin.close()
+        except OSError:
+            pass
+        try:
+            process.wait(timeout=1)
+        except subprocess.TimeoutExpired:
+            process.kill()
+            process.wait()
+
+    def close(self):
+        """关闭读取器"""
+        with self._lock:
+            self._stop()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class AsyncBlobReader:
+    """
+    基于asyncio子进程的 git cat-file --batch 读取器
+    同一实例的请求依次处理，需要并发读取时创建多个实例
+    """
+
+    def __init__(self, timeout=30, cwd=None):
+        """timeout为单个blob的读取超时时间（秒）"""
+        self.timeout = timeout
+        self.cwd = cwd
+        self._lock = asyncio.Lock()
+        self._process = None
+
+    async def read(self, oid):
+        """读取blob内容，超时或进程异常时抛出BlobFetchError"""
+        async with self._lock:
+            if self._process is None:
+                await self._start()
+            try:
+                self._process.stdin.write(oid.encode('ascii') + b'\n')
+                await self._process.stdin.drain()
+                header = await asyncio.wait_for(self._process.stdout.readline(), self.timeout)
+                if not header:
+                    raise BlobFetchError("git cat-file 进程意外退出")
+                parts = header.split()
+                if len(parts) == 2 and parts[1] == b'missing':
+                    raise BlobMissingError(f"对象不存在: {oid}")
+                content = await asyncio.wait_for(
+                    self._process.stdout.readexactly(int(parts[2]) + 1), self.timeout
+                )
+            except asyncio.TimeoutError:
+                # 进程可能卡住，终止后下次读取时重新启动
+                await self._stop()
+                raise BlobFetchError(f"读取blob超时: {oid}")
+            except BlobMissingError:
+                raise
+            except BlobFetchError:
+                await self._stop()
+                raise
+            except (OSError, ValueError, IndexError, asyncio.IncompleteReadError) as e:
+                await self._stop()
+                raise BlobFetchError(f"git cat-file 进程读取失败: {str(e)}")
+
+            if parts[1] != b'blob':
+                raise BlobFetchError(f"对象不是blob: {oid}")
+            return content[:-1]
+
+    async def _start(self):
+        """启动 git cat-file --batch 子进程"""
+        try:
+            self._process = await asyncio.create_subprocess_exec(
+                'git', 'cat-file', '--batch',
+                stdin=asyncio.subprocess.PIPE,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.DEVNULL,
+                cwd=self.cwd
+            )
+        except OSError as e:
+            self._process = None
+            raise BlobFetchError(f"无法启动 git cat-file: {str(e)}")
+
+    async def _stop(self):
+        """终止 cat-file 子进程"""
+        process = self._process
+        self._process = None
+        if process is None:
+            return
+        try:
+            process.stdin.close()
+        except OSError:
+            pass
+        try:
+            await asyncio.wait_for(process.wait(), 1)
+        except asyncio.TimeoutError:
+            process.kill()
+            await process.wait()
+
+    async def close(self):
+        """关闭读取器"""
+        async with self._lock:
+            await self._stop()
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Git LFS指针解析
+LFS管理的文件在git中只保存一个很小的指针文件（version/oid/size），
+实际内容位于本地对象库 .git/lfs/objects/<oid前2位>/<oid第3-4位>/<oid>。
+指针只在本地对象库中查找，不访问网络；对象内容通过内存映射读取，不复制到进程内存，
+在进程间传递时只传递路径
+"""
+
+import mmap
+import os
+import subprocess
+import threading
+
+# 指针文件的第一行（hawser为LFS早期的名称）
+LFS_SPEC_PREFIXES = (
+    b"version https://git-lfs.github.com/spec/v1",
+    b"version https://hawser.github.com/spec/v1",
+)
+# LFS规定指针文件不超过1024字节
+POINTER_MAX_SIZE = 1024
+_HEX_DIGITS = frozenset("0123456789abcdef")
+
+
+def parse_pointer(content):
+    """解析LFS指针文件，返回 (sha256 OID, 对象大小)，不是指针时返回None"""
+    if (not isinstance(content, (bytes, bytearray)) or len(content) > POINTER_MAX_SIZE
+            or not content.startswith(LFS_SPEC_PREFIXES)):
+        return None
+    fields = {}
+    for line in bytes(content).decode('utf-8', errors='replace').splitlines():
+        key, _, value = line.partition(' ')
+        fields[key] = value.strip()
+    oid = fields.get("oid", "")
+    if not oid.startswith("sha256:"):
+        return None
+    oid = oid[len("sha256:"):]
+    if len(oid) != 64 or not _HEX_DIGITS.issuperset(oid):
+        return None
+    try:
+        return oid, int(fields.get("size", ""))
+    except ValueError:
+        return None
+
+
+def lfs_objects_dir(cwd=None):
+    """本地LFS对象库目录（遵循 lfs.storage 配置），不在git仓库中时返回None"""
+    def git(*args):
+        try:
+            result = subprocess.run(['git'] + list(args), capture_output=True, text=True, cwd=cwd)
+        except OSError:
+            return None
+        return result.stdout.strip() if result.returncode == 0 else None
+
+    common_dir = git('rev-parse', '--git-common-dir')
+    if not common_dir:
+        return None
+    common_dir = os.path.abspath(os.path.join(cwd or os.getcwd(), common_dir))
+    # 相对路径的 lfs.storage 相对于git目录
+    storage = git('config', '--get', 'lfs.storage') or "lfs"
+    return os.path.join(common_dir, storage, "objects")
+
+
+class MappedFile(mmap.mmap):
+    """只读的内存映射文件，可以直接交给zipfile和openpyxl读取"""
+
+    def seekable(self):
+        # zipfile按文件对象的接口访问，需要seekable方法
+        return True
+
+
+class LfsObject:
+    """本地对象库中的LFS对象，打开时才映射到内存"""
+
+    def __init__(self, path, oid, size):
+        self.path = path
+        self.oid = oid
+        self.size = size
+
+    def open(self):
+        """映射为只读的文件对象，用完后须关闭（可用作上下文管理器：with obj.open() as f）"""
+        with open(self.path, 'rb') as f:
+            return MappedFile(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+class LfsObjectStore:
+    """在本地对象库中查找LFS对象，找到的对象只查找一次"""
+
+    def __init__(self, objects_dir):
+        self.objects_dir = objects_dir
+        self._lock = threading.Lock()
+        # sha256 OID -> (LfsObject或空内容, 错误信息)
+        self._resolved = {}
+
+    def lookup(self, oid, size):
+        """返回 (LfsObject, 错误信息)；空对象直接返回空内容"""
+        with self._lock:
+            found = self._resolved.get(oid)
+        if found is not None:
+            return found
+
+        if size == 0:
+            found = b"", None
+        elif self.objects_dir is None:
+            found = None, f"Git LFS对象 {oid[:12]} 无法读取（当前目录不在git仓库中）"
+        else:
+            path = os.path.join(self.objects_dir, oid[0:2], oid[2:4], oid)
+            try:
+                actual = os.path.getsize(path)
+            except OSError:
+                actual = None
+            if actual is None:
+                found = None, f"Git LFS对象 {oid[:12]} 不在本地对象库中"
+            elif actual != size:
+                found = None, f"本地的Git LFS对象 {oid[:12]} 不完整（{actual}/{size} 字节）"
+            else:
+                found = LfsObject(path, oid, size), None
+
+        if found[1] is None:
+            # 找不到的对象不记录，执行 git lfs fetch 后常驻服务可以直接读到
+            with self._lock:
+                self._resolved[oid] = found
+        return found
+
+    def resolve(self, content):
+        """指针替换为本地对象，返回 (内容, 错误信息)；不是指针时原样返回"""
+        pointer = parse_pointer(content)
+        if pointer is None:
+            return content, None
+        return self.lookup(*pointer)
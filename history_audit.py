@@ -0,0 +1,309 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+修订记录历史审计
+遍历修改过Excel文件的所有提交，校验每个提交中的文件是否延续了各父提交中同一文件的修订记录，
+找出覆盖了他人修改的提交。所有blob通过同一个 git cat-file --batch 进程读取，
+每个不同的blob（按OID）只解析一次，解析在多个进程中并行进行；
+解析结果在不再被后续提交引用后立即释放
+
+用法: python excel_checker.py audit [REV ...] [--since DATE] [--until DATE] [--output FILE]
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+from collections import Counter
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from excel_checker import EXCEL_DIR, ExcelChecker, create_process_pool
+from git_blobs import BlobFetchError
+from revision_lineage import MAX_REPORTED_RECORDS, LineageMatcher
+from revision_log import describe_row
+
+# git log 中每个提交的头部：提交、父提交、作者、日期、标题
+_LOG_FORMAT = "%x1e%H%x1f%P%x1f%an%x1f%ad%x1f%s"
+_NULL_OID = "0" * 40
+# 每个解析进程同时排队的blob数，限制内存中待解析内容的大小
+BLOBS_IN_FLIGHT_PER_WORKER = 2
+
+
+def _run_git(args):
+    """执行git命令，返回 (标准输出, 错误信息)"""
+    try:
+        result = subprocess.run(['git'] + args, capture_output=True)
+    except OSError as e:
+        return None, f"无法执行git命令: {str(e)}"
+    if result.returncode != 0:
+        return None, result.stderr.decode('utf-8', errors='replace').strip()
+    return result.stdout, None
+
+
+def _parse_raw_diff(output):
+    """
+    解析 -z 格式的raw diff（":旧模式 新模式 旧OID 新OID 状态\0路径\0"）
+    返回修改过的文件 [(路径, 旧OID, 新OID)]，新增、删除的文件不需要校验
+    """
+    changes = []
+    fields = output.split(b'\0')
+    for info, name in zip(fields[0::2], fields[1::2]):
+        info = info.strip()
+        if not info.startswith(b':'):
+            continue
+        _old_mode, _new_mode, old_oid, new_oid, status = info[1:].split()
+        old_oid, new_oid = old_oid.decode('ascii'), new_oid.decode('ascii')
+        path = name.decode('utf-8')
+        if (status[:1] in (b'M', b'T') and path.endswith('.xlsx')
+                and _NULL_OID not in (old_oid, new_oid)):
+            changes.append((path, old_oid, new_oid))
+    return changes
+
+
+def list_file_versions(revisions, since=None, until=None, directory=EXCEL_DIR):
+    """
+    列出需要校验的文件版本，返回 (提交列表, 版本列表, 错误信息)
+    版本为 {"commit", "parent", "path", "old", "new"}，按提交从旧到新排列
+    """
+    # --full-history：合并时保留了某一方版本的提交（可能覆盖了另一方的修改）不能被历史简化掉
+    args = ['log', '--full-history', '--reverse', '--raw', '--no-abbrev', '--no-renames', '-z',
+            '--date=format:%Y-%m-%d %H:%M', f'--format={_LOG_FORMAT}']
+    if since:
+        args.append(f'--since={since}')
+    if until:
+        args.append(f'--until={until}')
+    output, error = _run_git(args + list(revisions) + ['--', directory])
+    if error:
+        return None, None, f"无法读取提交历史: {error}"
+
+    commits = []
+    versions = []
+    for chunk in output.split(b'\x1e')[1:]:
+        header, _, diff = chunk.partition(b'\0')
+        commit, parents, author, date, subject = header.decode('utf-8', errors='replace').split('\x1f', 4)
+        parents = parents.split()
+        commits.append({"commit": commit, "author": author, "date": date, "subject": subject})
+
+        if len(parents) == 1:
+            diffs = [(parents[0], diff)]
+        else:
+            # 合并提交需要分别与每个父提交比较（git log 不输出合并提交的diff）
+            diffs = []
+            for parent in parents:
+                diff, error = _run_git(['diff-tree', '-r', '--no-abbrev', '--no-renames', '-z',
+                                        parent, commit, '--', directory])
+                if error:
+                    return None, None, f"无法比较提交 {commit[:10]} 与父提交 {parent[:10]}: {error}"
+                diffs.append((parent, diff))
+
+        for parent, diff in diffs:
+            for path, old_oid, new_oid in _parse_raw_diff(diff):
+                versions.append({
+                    "commit": commit, "parent": parent, "path": path,
+                    "old": old_oid, "new": new_oid
+                })
+    return commits, versions, None
+
+
+def _parse_blob(content):
+    """解析进程的工作函数，返回 (修订记录, 错误信息)"""
+    return ExcelChecker._get_revision_records_from_bytes(content)
+
+
+def verify_lineage(old_records, new_records, columns, mode):
+    """校验新版本是否延续了旧版本的修订记录，返回错误信息，通过时返回None"""
+    matcher = LineageMatcher(old_records, columns, mode)
+    for row in new_records:
+        if matcher.feed(row):
+            return None
+    if matcher.complete:
+        return None
+
+    missing = matcher.missing_records()
+    if missing:
+        shown = "; ".join(describe_row(row) for row in missing[:MAX_REPORTED_RECORDS])
+        if len(missing) > MAX_REPORTED_RECORDS:
+            shown += " 等"
+        return f"丢失了父提交中的 {len(missing)} 条修订记录: {shown}"
+    return matcher.verdict()[1]
+
+
+class HistoryAuditor:
+    """按提交历史校验修订记录谱系"""
+
+    def __init__(self, checker, processes=None):
+        self.checker = checker
+        self.processes = processes or checker.config['max_processes'] or os.cpu_count() or 1
+        self.columns = checker.config['check_columns']
+        self.mode = checker.config['lineage_mode']
+
+    def audit(self, versions):
+        """
+        校验所有文件版本，返回 (问题列表, 无法校验的列表, 解析的blob数)
+        问题为 {"commit", "parent", "path", "error"}
+        """
+        offences = []
+        unverified = []
+        # 每个blob被引用的次数，降为0时释放解析结果
+        references = Counter()
+        # blob OID -> 等待该blob的版本序号
+        waiting = {}
+        for index, version in enumerate(versions):
+            for oid in (version["old"], version["new"]):
+                references[oid] += 1
+                waiting.setdefault(oid, []).append(index)
+        pending_oids = iter(list(waiting))
+        parsed = {}
+
+        def release(oid):
+            references[oid] -= 1
+            if references[oid] == 0:
+                del parsed[oid]
+
+        def on_parsed(oid, outcome):
+            parsed[oid] = outcome
+            for index in waiting.pop(oid):
+                version = versions[index]
+                other = version["new"] if oid == version["old"] else version["old"]
+                if other not in parsed:
+                    continue
+                self._verify(version, parsed, offences, unverified)
+                release(version["old"])
+                release(version["new"])
+
+        if self.processes > 1:
+            pool = create_process_pool(self.processes)
+        else:
+            pool = ThreadPoolExecutor(max_workers=1)
+        in_flight = {}
+        try:
+            def submit_next():
+                for oid in pending_oids:
+                    try:
+                        content = self.checker.blob_fetcher.read(oid)
+                    except BlobFetchError as e:
+                        on_parsed(oid, (None, f"读取blob失败: {str(e)}"))
+                        continue
+                    # LFS指针替换为本地对象（只传递路径给解析进程）
+                    content, error = self.checker._resolve_lfs(content)
+                    if error:
+                        on_parsed(oid, (None, error))
+                        continue
+                    in_flight[pool.submit(_parse_blob, content)] = oid
+                    return
+
+            for _ in range(self.processes * BLOBS_IN_FLIGHT_PER_WORKER):
+                submit_next()
+            while in_flight:
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    oid = in_flight.pop(future)
+                    try:
+                        outcome = future.result()
+                    except Exception as e:
+                        outcome = (None, f"解析时发生异常: {str(e)}")
+                    on_parsed(oid, outcome)
+                    submit_next()
+        finally:
+            pool.shutdown(wait=True)
+
+        return offences, unverified, len(references)
+
+    def _verify(self, version, parsed, offences, unverified):
+        """校验单个文件版本"""
+        old_records, old_error = parsed[version["old"]]
+        new_records, new_error = parsed[version["new"]]
+        entry = {key: version[key] for key in ("commit", "parent", "path")}
+        if old_error:
+            # 父提交中的文件无法解析（例如还没有修改记录sheet），没有可丢失的记录
+            unverified.append(dict(entry, error=f"父提交中的文件无法读取: {old_error}"))
+            return
+        if not old_records:
+            return
+        if new_error:
+            offences.append(dict(entry, error=new_error))
+            return
+        error = verify_lineage(old_records, new_records, self.columns, self.mode)
+        if error:
+            offences.append(dict(entry, error=error))
+
+
+def print_report(report):
+    """按提交输出审计结果"""
+    by_commit = {}
+    for offence in report["offences"]:
+        by_commit.setdefault(offence["commit"], []).append(offence)
+
+    print("-" * 60)
+    for commit in report["commits"]:
+        offences = by_commit.get(commit["commit"])
+        if not offences:
+            continue
+        print(f"[ERROR] {commit['commit'][:10]} {commit['date']} {commit['author']} {commit['subject']}")
+        for offence in offences:
+            print(f"  {offence['path']}（父提交 {offence['parent'][:10]}）: {offence['error']}")
+    for item in report["unverified"]:
+        print(f"  警告: {item['commit'][:10]} {item['path']}: {item['error']}")
+    print("-" * 60)
+    print(
+        f"审计完成: 检查 {len(report['commits'])} 个提交中的 {report['versions']} 个文件版本"
+        f"（解析 {report['blobs']} 个不同的blob），"
+        f"{len(by_commit)} 个提交的 {len(report['offences'])} 个文件未延续父提交的修订记录"
+    )
+
+
+def main(argv=None):
+    """审计子命令"""
+    parser = argparse.ArgumentParser(
+        prog='excel_checker.py audit',
+        description='审计提交历史，找出覆盖了他人修订记录的提交'
+    )
+    parser.add_argument('revisions', nargs='*', default=['HEAD'], metavar='REV',
+                        help='审计的分支或提交范围（默认HEAD，例如 main 或 v1.0..main）')
+    parser.add_argument('--since', help='只审计该日期之后的提交（例如 "1 year ago" 或 2024-01-01）')
+    parser.add_argument('--until', help='只审计该日期之前的提交')
+    parser.add_argument('--processes', type=int, help='解析进程数（默认读取配置 max_processes）')
+    parser.add_argument('--output', help='将审计结果保存为JSON文件')
+    args = parser.parse_args(argv)
+
+    checker = ExcelChecker()
+    try:
+        print("读取提交历史...")
+        commits, versions, error = list_file_versions(args.revisions, args.since, args.until)
+        if error:
+            print(error)
+            sys.exit(1)
+
+        auditor = HistoryAuditor(checker, args.processes)
+        print(f"审计 {len(commits)} 个提交中的 {len(versions)} 个文件版本，使用 {auditor.processes} 个进程解析")
+        offences, unverified, blob_count = auditor.audit(versions)
+    finally:
+        checker.close()
+
+    # 按提交顺序排列（解析按完成顺序进行）
+    order = {commit["commit"]: index for index, commit in enumerate(commits)}
+    for items in (offences, unverified):
+        items.sort(key=lambda item: (order[item["commit"]], item["path"], item["parent"]))
+
+    report = {
+        "revisions": args.revisions,
+        "since": args.since,
+        "until": args.until,
+        "commits": commits,
+        "versions": len(versions),
+        "blobs": blob_count,
+        "offences": offences,
+        "unverified": unverified
+    }
+    print_report(report)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"审计结果已保存到 {args.output}")
+
+    sys.exit(1 if offences else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -31,8 +31,8 @@ git_dir = os.path.dirname(hooks_dir)
 project_root = os.path.dirname(git_dir)
 sys.path.insert(0, project_root)
 
-# 导入检查器
-from excel_checker import ExcelChecker
+# 只导入轻量的客户端；常驻服务未运行时才会在本进程中导入检查器
+from checker_daemon import check_staged
 
 def main():
     \"\"\"主函数\"\"\"
@@ -40,47 +40,27 @@ def main():
     print("Excel file checking...")
     print("=" * 60)
     
-    checker = ExcelChecker()
-    
-    # 检查暂存区的Excel文件
-    import subprocess
+    # 检查暂存区的Excel文件（按暂存区中的blob OID检查，不读取工作区文件）
     try:
-        # 获取暂存区的Excel文件
-        result = subprocess.run(
-            ['git', 'diff', '--cached', '--name-only', '--diff-filter=ACM'],
-            capture_output=True,
-            text=True,
-            encoding='utf-8'
-        )
+        staged_count, success = check_staged(project_root)
         
-        if result.returncode == 0:
-            staged_files = result.stdout.strip().split('\\n')
-            file_list = []
-            for filepath in staged_files:
-                if filepath.endswith('.xlsx') and os.path.exists(filepath):
-                    file_list.append((filepath, filepath))
-            
-            if file_list:
-                print(f"Found {len(file_list)} Excel files to check")
-                success = checker.check_files(file_list)
-                
-                if not success:
-                    print("=" * 60)
-                    print("[ERROR] Excel file check failed, commit blocked")
-                    print("Please fix the issues and try again")
-                    print("=" * 60)
-                    sys.exit(1)
-                else:
-                    print("=" * 60)
-                    print("[OK] Excel file check passed")
-                    print("=" * 60)
-                    sys.exit(0)
-            else:
-                print("No Excel files in staging area, skipping check")
-                sys.exit(0)
-        else:
+        if staged_count is None:
             print("Cannot get staged files, skipping check")
             sys.exit(0)
+        elif staged_count == 0:
+            print("No Excel files in staging area, skipping check")
+            sys.exit(0)
+        elif not success:
+            print("=" * 60)
+            print("[ERROR] Excel file check failed, commit blocked")
+            print("Please fix the issues and try again")
+            print("=" * 60)
+            sys.exit(1)
+        else:
+            print("=" * 60)
+            print("[OK] Excel file check passed")
+            print("=" * 60)
+            sys.exit(0)
     except Exception as e:
         print(f"Exception during check: {str(e)}")
         print("Skipping check, continuing commit")
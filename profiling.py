@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+检查过程的分阶段计时
+按文件、按阶段记录时间段（附带进程ID和线程ID），输出Chrome trace-event格式的JSON
+（可在 chrome://tracing 或 Perfetto 中打开）以及各阶段的 p50/p95/max 汇总表。
+未开启时使用 NULL_PROFILER，每个阶段只多一次空的上下文管理器调用
+"""
+
+import json
+import os
+import threading
+import time
+import unicodedata
+from contextlib import nullcontext
+
+# 汇总表中各阶段的显示顺序，未列出的阶段排在最后
+STAGE_ORDER = (
+    "cache_lookup", "local_read", "hash", "remote_fetch", "sheet_fingerprint",
+    "remote_parse", "local_parse", "compare", "confirm_changes", "cache_save"
+)
+
+# 汇总表各列的显示宽度，阶段列的宽度按表头和最长的阶段名计算
+SUMMARY_COLUMNS = (("阶段", None), ("次数", 6), ("p50(ms)", 10), ("p95(ms)", 10), ("max(ms)", 10), ("总计(ms)", 12))
+# 阶段列与次数列之间至少保留的空格数
+STAGE_COLUMN_GAP = 2
+
+_NULL_SPAN = nullcontext()
+
+
+class _Span:
+    """记录一个时间段的上下文管理器"""
+
+    __slots__ = ("profiler", "stage", "filepath", "start")
+
+    def __init__(self, profiler, stage, filepath):
+        self.profiler = profiler
+        self.stage = stage
+        self.filepath = filepath
+
+    def __enter__(self):
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.profiler.spans.append((
+            self.stage, self.filepath, self.start, time.perf_counter_ns(),
+            os.getpid(), threading.get_ident()
+        ))
+        return False
+
+
+class Profiler:
+    """
+    时间段记录器，可在多个线程间共享
+    每个时间段为 (阶段, 文件, 开始ns, 结束ns, 进程ID, 线程ID)，可以直接随结果在进程间传递
+    """
+
+    enabled = True
+
+    def __init__(self):
+        self.spans = []
+
+    def span(self, stage, filepath):
+        """记录一个阶段的耗时：with profiler.span("hash", path): ..."""
+        return _Span(self, stage, filepath)
+
+    def add(self, spans):
+        """合并其他进程记录的时间段"""
+        self.spans.extend(spans)
+
+    def write_trace(self, path):
+        """输出Chrome trace-event格式的JSON文件"""
+        origin = min((span[2] for span in self.spans), default=0)
+        events = [
+            {
+                "name": stage,
+                "cat": "excel_checker",
+                "ph": "X",
+                "ts": (start - origin) / 1000,
+                "dur": (end - start) / 1000,
+                "pid": pid,
+                "tid": tid,
+                "args": {"file": filepath}
+            }
+            for stage, filepath, start, end, pid, tid in self.spans
+        ]
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f, ensure_ascii=False)
+
+    def summary(self):
+        """按阶段汇总，返回 [(阶段, 次数, p50毫秒, p95毫秒, 最大毫秒, 总计毫秒)]"""
+        durations = {}
+        for stage, _filepath, start, end, _pid, _tid in self.spans:
+            durations.setdefault(stage, []).append((end - start) / 1e6)
+
+        def order(stage):
+            return (STAGE_ORDER.index(stage) if stage in STAGE_ORDER else len(STAGE_ORDER), stage)
+
+        rows = []
+        for stage in sorted(durations, key=order):
+            values = sorted(durations[stage])
+            rows.append((
+                stage, len(values), _percentile(values, 50), _percentile(values, 95),
+                values[-1], sum(values)
+            ))
+        return rows
+
+    def print_summary(self):
+        """打印各阶段耗时汇总表"""
+        rows = self.summary()
+        titles = [title for title, _width in SUMMARY_COLUMNS]
+        stage_width = max(_display_width(stage) for stage in [titles[0]] + [row[0] for row in rows])
+        widths = [stage_width + STAGE_COLUMN_GAP] + [width for _title, width in SUMMARY_COLUMNS[1:]]
+        print("".join(
+            _pad(title, width, left=index == 0) for index, (title, width) in enumerate(zip(titles, widths))
+        ))
+        for stage, count, *durations in rows:
+            cells = [stage, str(count)] + [f"{value:.1f}" for value in durations]
+            print("".join(
+                _pad(cell, width, left=index == 0) for index, (cell, width) in enumerate(zip(cells, widths))
+            ))
+
+
+class _NullProfiler:
+    """未开启计时时使用的空记录器"""
+
+    enabled = False
+    spans = ()
+
+    def span(self, stage, filepath):
+        return _NULL_SPAN
+
+    def add(self, spans):
+        pass
+
+
+NULL_PROFILER = _NullProfiler()
+
+
+def _display_width(text):
+    """终端中的显示宽度，中日韩全角字符占两列"""
+    return sum(2 if unicodedata.east_asian_width(char) in "WF" else 1 for char in text)
+
+
+def _pad(text, width, left=False):
+    """按显示宽度补齐到width列，left为True时左对齐，否则右对齐"""
+    padding = " " * max(0, width - _display_width(text))
+    return text + padding if left else padding + text
+
+
+def _percentile(values, percent):
+    """最近秩法计算百分位数，values须已排序"""
+    rank = max(1, -(-len(values) * percent // 100))
+    return values[rank - 1]
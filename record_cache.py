@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+远程修订记录缓存
+以git blob OID为键保存解析后的修订记录（以及各sheet部件的指纹），同一个blob只需解析一次。
+每个OID对应一个不可变文件，写入时先写临时文件再原子替换，
+多个工作区的钩子同时运行也不会互相破坏；按修改时间做LRU淘汰。
+可以在下面再挂一个共享缓存层（见shared_cache），本地未命中时读取共享层，写入时同时写入共享层。
+"""
+
+import json
+import os
+import subprocess
+import tempfile
+import threading
+from collections import OrderedDict
+
+from revision_log import RevisionLog
+
+# 版本2起修订记录按列保存（归一化后的值）
+CACHE_FORMAT_VERSION = 2
+CACHE_SUBDIR = "excel_checker/records"
+
+
+def encode_records(records):
+    """编码修订记录（RevisionLog）为列数据"""
+    return records.to_json()
+
+
+def decode_records(data):
+    """解码修订记录"""
+    return RevisionLog.from_json(data)
+
+
+def default_cache_dir(cwd=None):
+    """默认缓存目录：位于git公共目录下，同一仓库的所有工作区共享"""
+    try:
+        result = subprocess.run(
+            ['git', 'rev-parse', '--git-common-dir'],
+            capture_output=True,
+            text=True,
+            cwd=cwd
+        )
+    except OSError:
+        return None
+    if result.returncode != 0:
+        return None
+    common_dir = os.path.join(cwd or os.getcwd(), result.stdout.strip())
+    return os.path.join(os.path.abspath(common_dir), CACHE_SUBDIR)
+
+
+class RemoteRecordCache:
+    """
+    按blob OID缓存远程修订记录的磁盘缓存
+    memory_entries大于0时在内存中额外保留最近使用的条目（供常驻服务使用）
+    shared为共享缓存层（提供 get/put/flush），不为None时读穿、写穿到共享层
+    """
+
+    def __init__(self, directory, max_bytes=256 * 1024 * 1024, memory_entries=0, shared=None):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.memory_entries = memory_entries
+        self.shared = shared
+        self._memory = OrderedDict()
+        self._memory_lock = threading.Lock()
+        self._written = False
+
+    def _path(self, oid):
+        """OID对应的缓存文件路径"""
+        return os.path.join(self.directory, oid[:2], oid + ".json")
+
+    def _remember(self, oid, entry):
+        """在内存中保留条目，超出数量时淘汰最久未使用的"""
+        if self.memory_entries <= 0:
+            return
+        with self._memory_lock:
+            self._memory[oid] = entry
+            self._memory.move_to_end(oid)
+            while len(self._memory) > self.memory_entries:
+                self._memory.popitem(last=False)
+
+    def get(self, oid):
+        """读取缓存的修订记录，未命中返回None"""
+        entry = self.get_entry(oid)
+        return None if entry is None else entry[0]
+
+    def get_entry(self, oid):
+        """读取缓存的 (修订记录, sheet指纹)，未命中返回None；旧条目没有指纹时为None"""
+        with self._memory_lock:
+            entry = self._memory.get(oid)
+            if entry is not None:
+                self._memory.move_to_end(oid)
+                return entry
+
+        path = self._path(oid)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            data = None
+        if not isinstance(data, dict) or data.get("version") != CACHE_FORMAT_VERSION or data.get("oid") != oid:
+            return self._get_shared(oid)
+        try:
+            entry = (decode_records(data["records"]), data.get("fingerprints"))
+        except (AttributeError, KeyError, TypeError, ValueError):
+            # 条目损坏，视为未命中
+            return self._get_shared(oid)
+
+        # 更新修改时间，作为LRU淘汰的依据
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        self._remember(oid, entry)
+        return entry
+
+    def _get_shared(self, oid):
+        """本地未命中时读取共享层，命中后写回本地"""
+        if self.shared is None:
+            return None
+        entry = self.shared.get(oid)
+        if entry is None:
+            return None
+        self._remember(oid, entry)
+        self._write(oid, *entry)
+        return entry
+
+    def put(self, oid, records, fingerprints=None):
+        """写入修订记录和sheet指纹（同时写入共享层），失败时静默忽略"""
+        self._remember(oid, (records, fingerprints))
+        self._write(oid, records, fingerprints)
+        if self.shared is not None:
+            self.shared.put(oid, records, fingerprints)
+
+    def _write(self, oid, records, fingerprints):
+        """写入本地缓存文件"""
+        path = self._path(oid)
+        data = {
+            "version": CACHE_FORMAT_VERSION,
+            "oid": oid,
+            "records": encode_records(records),
+            "fingerprints": fingerprints
+        }
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+            try:
+                with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                    json.dump(data, f, ensure_ascii=False)
+                os.replace(tmp_path, path)
+            except BaseException:
+                os.unlink(tmp_path)
+                raise
+        except (OSError, TypeError, ValueError):
+            return
+        self._written = True
+
+    def flush(self):
+        """把共享层中待写入的条目写出（git notes层在这里合并提交）"""
+        if self.shared is not None:
+            self.shared.flush()
+
+    def prune(self):
+        """缓存超过容量时，按最近使用时间淘汰最旧的条目"""
+        if not self._written:
+            return
+        self._written = False
+
+        entries = []
+        total = 0
+        for root, _dirs, files in os.walk(self.directory):
+            for name in files:
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+                total += stat.st_size
+
+        if total <= self.max_bytes:
+            return
+
+        entries.sort()
+        for _mtime, size, path in entries:
+            try:
+                os.unlink(path)
+            except OSError:
+                # 可能已被其他进程删除
+                pass
+            total -= size
+            if total <= self.max_bytes:
+                break
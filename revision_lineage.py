@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+修订记录谱系校验
+本地修订记录必须延续远程的修订记录（作为前缀或子序列），
+远程的任何记录都不能被删除或改写。
+每条记录归一化后压缩为16字节摘要，比较过程为线性复杂度；
+远程记录的摘要连续保存在一个字节串中，不为每条记录创建对象。
+"""
+
+import hashlib
+from collections import Counter
+
+from revision_log import column_indexes, describe_row
+
+LINEAGE_MODES = ("subsequence", "prefix")
+# 错误信息中最多列出的缺失记录数
+MAX_REPORTED_RECORDS = 5
+DIGEST_SIZE = 16
+
+
+def record_digest(row, indexes):
+    """计算归一化后的修订记录（normalize_row的结果）指定列的摘要"""
+    key = "\x1f".join("" if index is None else row[index] for index in indexes)
+    return hashlib.blake2b(key.encode("utf-8"), digest_size=DIGEST_SIZE).digest()
+
+
+class LineageMatcher:
+    """
+    流式校验本地修订记录是否延续了远程修订记录
+    remote_records为远程的RevisionLog；逐条调用feed()传入归一化后的本地记录（normalize_row的结果），
+    feed()返回True时远程记录已全部匹配，可以停止读取
+    """
+
+    def __init__(self, remote_records, columns, mode="subsequence"):
+        if mode not in LINEAGE_MODES:
+            raise ValueError(f"未知的谱系校验模式: {mode}")
+        self.remote_records = remote_records
+        self.columns = columns
+        self.mode = mode
+        self._indexes = column_indexes(columns)
+        self._remote_count = len(remote_records)
+        self._remote_digests = b"".join(record_digest(row, self._indexes) for row in remote_records)
+        self._position = 0
+        self._diverged = False
+        self._local_digests = Counter()
+        self.local_count = 0
+
+    @property
+    def complete(self):
+        """远程记录是否已全部按顺序匹配"""
+        return self._position == self._remote_count
+
+    def _remote_digest(self, index):
+        offset = index * DIGEST_SIZE
+        return self._remote_digests[offset:offset + DIGEST_SIZE]
+
+    def feed(self, row):
+        """处理一条本地记录"""
+        digest = record_digest(row, self._indexes)
+        self.local_count += 1
+        self._local_digests[digest] += 1
+
+        if not self._diverged and self._position < self._remote_count:
+            if digest == self._remote_digest(self._position):
+                self._position += 1
+            elif self.mode == "prefix":
+                # 前缀模式下第一条不一致的记录之后不可能再匹配
+                self._diverged = True
+        return self.complete
+
+    def missing_records(self):
+        """远程有而本地没有的记录（按出现次数计算），返回归一化后的记录"""
+        remaining = Counter(self._local_digests)
+        missing = []
+        for index in range(self._remote_count):
+            digest = self._remote_digest(index)
+            if remaining[digest] > 0:
+                remaining[digest] -= 1
+            else:
+                missing.append(self.remote_records.row(index))
+        return missing
+
+    def verdict(self):
+        """返回 (是否延续远程记录, 错误信息)"""
+        if self.complete:
+            return True, None
+
+        missing = self.missing_records()
+        if missing:
+            shown = "; ".join(describe_row(row) for row in missing[:MAX_REPORTED_RECORDS])
+            if len(missing) > MAX_REPORTED_RECORDS:
+                shown += " 等"
+            return False, f"本地文件未包含远程的 {len(missing)} 条修订记录（可能覆盖了他人的修改）: {shown}"
+
+        # 记录都在，但顺序或位置被改动
+        position = self._position
+        expected = describe_row(self.remote_records.row(position))
+        if self.mode == "prefix":
+            return False, f"本地修订记录不是远程修订记录的延续，从第 {position + 1} 条（{expected}）开始不一致"
+        return False, f"本地修订记录的顺序与远程不一致，从第 {position + 1} 条（{expected}）开始"
@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+紧凑的修订记录存储
+修订记录按列保存，不为每一行创建字典：修订人和修订版本驻留（相同的名字只保存一份），
+修订时间只解析一次，保存为整数（微秒）数组，其余列保存归一化后的字符串。
+谱系校验直接在列上计算摘要
+"""
+
+import re
+import sys
+from array import array
+from datetime import date, datetime, time, timedelta
+
+RECORD_FIELDS = ("修订人", "修订时间", "修订内容", "修订版本")
+REVISER, REVISION_TIME, CONTENT, VERSION = range(len(RECORD_FIELDS))
+# 无法解析为日期时间的修订时间在整数列中的占位值，原文保存在time_texts中
+NO_TIMESTAMP = -2 ** 63
+
+_EPOCH = datetime(1970, 1, 1)
+_MICROSECOND = timedelta(microseconds=1)
+_DATETIME_TEXT = re.compile(
+    r"^(\d{4})[-/](\d{1,2})[-/](\d{1,2})(?:[ T](\d{1,2}):(\d{2})(?::(\d{2}))?)?$"
+)
+
+
+def _format_datetime(value):
+    """日期时间统一格式化为 YYYY-MM-DD HH:MM:SS[.ffffff]"""
+    if value.microsecond:
+        return value.strftime("%Y-%m-%d %H:%M:%S.%f")
+    return value.strftime("%Y-%m-%d %H:%M:%S")
+
+
+def _to_datetime(value):
+    """日期单元格或日期文本转换为datetime，无法转换时返回None"""
+    if isinstance(value, datetime):
+        # 与格式化结果一致，忽略时区
+        return value.replace(tzinfo=None)
+    if isinstance(value, date):
+        return datetime(value.year, value.month, value.day)
+    if isinstance(value, str):
+        match = _DATETIME_TEXT.match(value.strip())
+        if match:
+            parts = [int(part) if part else 0 for part in match.groups()]
+            try:
+                return datetime(*parts)
+            except ValueError:
+                return None
+    return None
+
+
+def normalize_value(value):
+    """
+    单元格值归一化为字符串
+    日期单元格与手工输入的日期文本得到相同的结果，空值与空字符串相同
+    """
+    if value is None:
+        return ""
+    if isinstance(value, bool):
+        return "TRUE" if value else "FALSE"
+    if isinstance(value, (date, str)):
+        parsed = _to_datetime(value)
+        if parsed is not None:
+            return _format_datetime(parsed)
+        if isinstance(value, str):
+            return value.strip()
+    if isinstance(value, time):
+        return value.isoformat()
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+
+def _cell(row, index):
+    return row[index] if len(row) > index else None
+
+
+def normalize_row(row):
+    """一行单元格值归一化为与RECORD_FIELDS对应的字符串元组"""
+    return tuple(normalize_value(_cell(row, index)) for index in range(len(RECORD_FIELDS)))
+
+
+def column_indexes(columns):
+    """列名转换为列序号，未知的列为None（按空值计算）"""
+    return [RECORD_FIELDS.index(column) if column in RECORD_FIELDS else None for column in columns]
+
+
+def describe_row(row):
+    """归一化后的修订记录的简短描述"""
+    return f"{row[REVISER]} - {row[REVISION_TIME]}"
+
+
+class RevisionLog:
+    """按列保存的修订记录，row()按需还原为归一化后的字符串元组"""
+
+    __slots__ = ("revisers", "timestamps", "time_texts", "contents", "versions")
+
+    def __init__(self):
+        self.revisers = []
+        # 修订时间（自1970-01-01起的微秒数），无法解析的为NO_TIMESTAMP
+        self.timestamps = array('q')
+        # 无法解析为日期时间的修订时间: 行序号 -> 归一化文本
+        self.time_texts = {}
+        self.contents = []
+        self.versions = []
+
+    @classmethod
+    def from_rows(cls, rows):
+        """由单元格值的行构建"""
+        log = cls()
+        for row in rows:
+            log.append(row)
+        return log
+
+    def append(self, row):
+        """追加一行单元格值"""
+        self.revisers.append(sys.intern(normalize_value(_cell(row, REVISER))))
+        value = _cell(row, REVISION_TIME)
+        parsed = _to_datetime(value)
+        if parsed is None:
+            self.time_texts[len(self.timestamps)] = normalize_value(value)
+            self.timestamps.append(NO_TIMESTAMP)
+        else:
+            self.timestamps.append((parsed - _EPOCH) // _MICROSECOND)
+        self.contents.append(normalize_value(_cell(row, CONTENT)))
+        self.versions.append(sys.intern(normalize_value(_cell(row, VERSION))))
+
+    def __len__(self):
+        return len(self.timestamps)
+
+    def time_text(self, index):
+        """第index条记录的修订时间（归一化文本）"""
+        timestamp = self.timestamps[index]
+        if timestamp == NO_TIMESTAMP:
+            return self.time_texts[index]
+        return _format_datetime(_EPOCH + timedelta(microseconds=timestamp))
+
+    def row(self, index):
+        """第index条记录，与normalize_row的结果相同"""
+        return (self.revisers[index], self.time_text(index), self.contents[index], self.versions[index])
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self.row(index)
+
+    def to_json(self):
+        """编码为可JSON序列化的列数据"""
+        return {
+            "revisers": self.revisers,
+            "timestamps": self.timestamps.tolist(),
+            "time_texts": {str(index): text for index, text in self.time_texts.items()},
+            "contents": self.contents,
+            "versions": self.versions
+        }
+
+    @classmethod
+    def from_json(cls, data):
+        """还原to_json编码的列数据，列长度不一致时抛出ValueError"""
+        log = cls()
+        log.revisers = [sys.intern(name) for name in data["revisers"]]
+        log.timestamps = array('q', data["timestamps"])
+        log.time_texts = {int(index): text for index, text in data["time_texts"].items()}
+        log.contents = list(data["contents"])
+        log.versions = [sys.intern(version) for version in data["versions"]]
+        count = len(log.timestamps)
+        untimed = [index for index, timestamp in enumerate(log.timestamps) if timestamp == NO_TIMESTAMP]
+        if (len(log.revisers) != count or len(log.contents) != count or len(log.versions) != count
+                or untimed != sorted(log.time_texts)):
+            raise ValueError("修订记录各列的长度不一致")
+        return log
@@ -0,0 +1,247 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+共享的远程修订记录缓存层
+解析结果只取决于blob内容，以blob OID为键可以在开发者之间和CI节点之间共享：
+位于本地缓存之下，本地未命中时读取共享层并写回本地，新解析的结果同时写入共享层。
+共享层可以是共享目录（网络共享、CI缓存挂载目录等），也可以是git notes（附加在blob对象上，
+通过 git push/fetch 注释引用同步）。每个条目带有内容校验和，损坏或被截断的条目视为未命中
+"""
+
+import hashlib
+import json
+import os
+import subprocess
+import tempfile
+import threading
+
+from git_blobs import BlobFetchError, GitBlobFetcher
+from record_cache import decode_records, encode_records
+
+SHARED_FORMAT_VERSION = 2
+DEFAULT_NOTES_REF = "refs/notes/excel-checker"
+# 没有配置git身份时（CI中常见）注释提交使用的身份
+NOTES_AUTHOR = ("excel_checker", "excel_checker@localhost")
+
+
+def _checksum(oid, records, fingerprints):
+    """条目内容的SHA-256校验和（按规范化的JSON计算）"""
+    canonical = json.dumps([oid, records, fingerprints], sort_keys=True,
+                           ensure_ascii=False, separators=(',', ':'))
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+
+def encode_entry(oid, records, fingerprints):
+    """编码共享缓存条目，返回字节内容"""
+    encoded = encode_records(records)
+    data = {
+        "version": SHARED_FORMAT_VERSION,
+        "oid": oid,
+        "records": encoded,
+        "fingerprints": fingerprints,
+        "sha256": _checksum(oid, encoded, fingerprints)
+    }
+    return json.dumps(data, ensure_ascii=False).encode('utf-8')
+
+
+def decode_entry(oid, payload):
+    """解码并校验共享缓存条目，返回 (修订记录, sheet指纹)，内容无效时返回None"""
+    try:
+        data = json.loads(payload.decode('utf-8'))
+        if (data.get("version") != SHARED_FORMAT_VERSION or data.get("oid") != oid
+                or data.get("sha256") != _checksum(oid, data["records"], data["fingerprints"])):
+            return None
+        return decode_records(data["records"]), data["fingerprints"]
+    except (AttributeError, KeyError, TypeError, ValueError):
+        return None
+
+
+class DirectoryStore:
+    """
+    共享目录中的缓存，每个OID一个不可变文件
+    写入时先在同一目录写临时文件并刷到磁盘，再原子替换，其他机器不会读到写了一半的文件
+    """
+
+    def __init__(self, directory, readonly=False):
+        self.directory = directory
+        self.readonly = readonly
+        # 读到损坏条目的OID，写入时覆盖
+        self._invalid = set()
+
+    def _path(self, oid):
+        return os.path.join(self.directory, oid[:2], oid + ".json")
+
+    def get(self, oid):
+        """读取 (修订记录, sheet指纹)，未命中或条目无效时返回None"""
+        try:
+            with open(self._path(oid), 'rb') as f:
+                payload = f.read()
+        except OSError:
+            return None
+        entry = decode_entry(oid, payload)
+        if entry is None:
+            self._invalid.add(oid)
+        return entry
+
+    def put(self, oid, records, fingerprints):
+        """写入条目，已存在有效条目时跳过，失败时静默忽略"""
+        if self.readonly:
+            return
+        path = self._path(oid)
+        if oid not in self._invalid and os.path.exists(path):
+            return
+        try:
+            payload = encode_entry(oid, records, fingerprints)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+            try:
+                with os.fdopen(fd, 'wb') as f:
+                    f.write(payload)
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(tmp_path, path)
+            except BaseException:
+                os.unlink(tmp_path)
+                raise
+        except (OSError, TypeError, ValueError):
+            return
+        self._invalid.discard(oid)
+
+    def flush(self):
+        """条目已在写入时落盘"""
+
+
+class GitNotesStore:
+    """
+    git notes中的缓存：条目作为注释附加在远程文件的blob对象上
+    通过 git push/fetch 注释引用在团队和CI之间共享；本次检查新增的条目在flush时合并为一次提交
+    """
+
+    def __init__(self, ref=DEFAULT_NOTES_REF, readonly=False, timeout=30, cwd=None):
+        self.ref = ref
+        self.readonly = readonly
+        self.timeout = timeout
+        self.cwd = cwd
+        self._lock = threading.Lock()
+        # 被注释的blob OID -> 注释内容的blob OID，首次读取时加载
+        self._notes = None
+        self._invalid = set()
+        # 待写入的条目: OID -> 字节内容
+        self._pending = {}
+        self._reader = GitBlobFetcher(timeout=timeout, cwd=cwd)
+
+    def _git(self, args, input=None, env=None):
+        """执行git命令，失败时抛出OSError"""
+        try:
+            result = subprocess.run(['git'] + args, input=input, capture_output=True,
+                                    timeout=self.timeout, cwd=self.cwd, env=env)
+        except subprocess.TimeoutExpired as e:
+            raise OSError(f"git命令超时: {' '.join(args)}") from e
+        if result.returncode != 0:
+            raise OSError(result.stderr.decode('utf-8', errors='replace').strip())
+        return result.stdout.decode('utf-8').strip()
+
+    def _load_notes(self):
+        """读取注释引用中所有注释，注释引用不存在时为空"""
+        try:
+            output = self._git(['notes', '--ref', self.ref, 'list'])
+        except OSError:
+            return {}
+        notes = {}
+        for line in output.splitlines():
+            note, _, annotated = line.partition(' ')
+            notes[annotated] = note
+        return notes
+
+    def get(self, oid):
+        """读取 (修订记录, sheet指纹)，未命中或条目无效时返回None"""
+        with self._lock:
+            if self._notes is None:
+                self._notes = self._load_notes()
+            note = self._notes.get(oid)
+        if note is None:
+            return None
+        try:
+            payload = self._reader.read(note)
+        except BlobFetchError:
+            return None
+        entry = decode_entry(oid, payload)
+        if entry is None:
+            with self._lock:
+                self._invalid.add(oid)
+        return entry
+
+    def put(self, oid, records, fingerprints):
+        """登记待写入的条目，已存在有效注释时跳过"""
+        if self.readonly:
+            return
+        try:
+            payload = encode_entry(oid, records, fingerprints)
+        except (TypeError, ValueError):
+            return
+        with self._lock:
+            if self._notes is None:
+                self._notes = self._load_notes()
+            if oid in self._notes and oid not in self._invalid:
+                return
+            self._pending[oid] = payload
+
+    def flush(self):
+        """把待写入的条目合并为注释引用上的一次提交，失败时静默忽略；下次读取时重新加载注释"""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            self._notes = None
+            self._invalid = set()
+        self._reader.close()
+        if not pending:
+            return
+        try:
+            self._commit(pending)
+        except OSError:
+            pass
+
+    def _commit(self, pending):
+        """在临时索引中更新注释树并提交（相当于一次执行多个 git notes add -f）"""
+        try:
+            parent = self._git(['rev-parse', '--verify', '--quiet', self.ref + '^{commit}'])
+        except OSError:
+            parent = None
+
+        with tempfile.TemporaryDirectory() as tmp:
+            env = dict(os.environ, GIT_INDEX_FILE=os.path.join(tmp, "index"))
+            index_lines = []
+            if parent:
+                self._git(['read-tree', parent], env=env)
+                # 注释树中的路径可能分级（ab/cdef...），覆盖已有注释时先删除原路径
+                for path in self._git(['ls-files'], env=env).splitlines():
+                    if path.replace('/', '') in pending:
+                        index_lines.append(f"0 {'0' * 40}\t{path}")
+
+            paths = []
+            for oid, payload in pending.items():
+                path = os.path.join(tmp, oid)
+                with open(path, 'wb') as f:
+                    f.write(payload)
+                paths.append(path)
+            blobs = self._git(['hash-object', '-w', '--stdin-paths'],
+                              input='\n'.join(paths).encode('utf-8')).split()
+            for oid, blob in zip(pending, blobs):
+                index_lines.append(f"100644 {blob}\t{oid}")
+
+            self._git(['update-index', '--index-info'],
+                      input=('\n'.join(index_lines) + '\n').encode('utf-8'), env=env)
+            tree = self._git(['write-tree'], env=env)
+
+        args = ['commit-tree', tree, '-m', f"excel_checker: 缓存 {len(pending)} 个文件的修订记录"]
+        if parent:
+            args[2:2] = ['-p', parent]
+        env = None
+        try:
+            self._git(['var', 'GIT_COMMITTER_IDENT'])
+        except OSError:
+            name, email = NOTES_AUTHOR
+            env = dict(os.environ, GIT_AUTHOR_NAME=name, GIT_AUTHOR_EMAIL=email,
+                       GIT_COMMITTER_NAME=name, GIT_COMMITTER_EMAIL=email)
+        commit = self._git(args, env=env)
+        # 以原提交为条件更新，其他进程同时写入时放弃本次写入，下次检查时重新写入
+        self._git(['update-ref', self.ref, commit, parent or ''])
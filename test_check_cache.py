@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+检查结果缓存测试脚本
+检查旧版本JSON缓存的导入、重新打开后的读写和失效条目的清理
+"""
+
+import json
+import os
+import tempfile
+
+from check_cache import CheckCache
+
+
+def write_json(path, data):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False)
+
+
+def test_legacy_json_imported_once():
+    """旧版本JSON缓存只在首次打开时导入一次"""
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "cache.db")
+        json_path = os.path.join(tmp, "cache.json")
+        write_json(json_path, {"excels/a.xlsx": {"hash": "a1"}, "excels/无效.xlsx": "不是字典"})
+
+        cache = CheckCache(db_path, legacy_json=json_path)
+        assert cache.get("excels/a.xlsx") == {"hash": "a1"}
+        assert "excels/无效.xlsx" not in cache
+        cache.delete("excels/a.xlsx")
+        cache.close()
+
+        # 再次打开时不重新导入：删除的条目不会恢复，JSON中新增的条目也不导入
+        write_json(json_path, {"excels/a.xlsx": {"hash": "a1"}, "excels/b.xlsx": {"hash": "b1"}})
+        cache = CheckCache(db_path, legacy_json=json_path)
+        try:
+            assert cache.paths() == []
+        finally:
+            cache.close()
+
+
+def test_legacy_json_does_not_override():
+    """导入旧数据时不覆盖已有的条目，损坏的JSON按空缓存导入"""
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "cache.db")
+        json_path = os.path.join(tmp, "cache.json")
+        cache = CheckCache(db_path)
+        cache.put("excels/a.xlsx", {"hash": "新"})
+        cache.close()
+
+        write_json(json_path, {"excels/a.xlsx": {"hash": "旧"}})
+        cache = CheckCache(db_path, legacy_json=json_path)
+        try:
+            assert cache.get("excels/a.xlsx") == {"hash": "新"}
+        finally:
+            cache.close()
+
+        other_db = os.path.join(tmp, "other.db")
+        with open(json_path, 'w', encoding='utf-8') as f:
+            f.write("{被截断的JSON")
+        cache = CheckCache(other_db, legacy_json=json_path)
+        try:
+            assert cache.paths() == []
+        finally:
+            cache.close()
+
+
+def test_entries_survive_reopen():
+    """写入和覆盖的条目在重新打开数据库后仍然存在"""
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "cache.db")
+        cache = CheckCache(db_path)
+        cache.put("excels/a.xlsx", {"hash": "a1", "record_count": 3})
+        cache.put("excels/b.xlsx", {"hash": "b1"})
+        cache.put("excels/a.xlsx", {"hash": "a2", "record_count": 4})
+        cache.close()
+
+        cache = CheckCache(db_path)
+        try:
+            assert cache.get("excels/a.xlsx") == {"hash": "a2", "record_count": 4}
+            assert cache.get("excels/b.xlsx") == {"hash": "b1"}
+            assert cache.get("excels/c.xlsx", {}) == {}
+            assert sorted(cache.paths()) == ["excels/a.xlsx", "excels/b.xlsx"]
+        finally:
+            cache.close()
+
+
+def test_shared_between_connections():
+    """两个连接同时打开同一个数据库时能看到对方的写入"""
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "cache.db")
+        first = CheckCache(db_path)
+        second = CheckCache(db_path)
+        try:
+            first.put("excels/a.xlsx", {"hash": "a1"})
+            second.put("excels/b.xlsx", {"hash": "b1"})
+            assert second.get("excels/a.xlsx") == {"hash": "a1"}
+            assert first.get("excels/b.xlsx") == {"hash": "b1"}
+        finally:
+            first.close()
+            second.close()
+
+
+def test_prune_missing():
+    """删除对应文件已不存在的条目"""
+    with tempfile.TemporaryDirectory() as tmp:
+        os.makedirs(os.path.join(tmp, "excels"))
+        for name in ("a.xlsx", "b.xlsx"):
+            with open(os.path.join(tmp, "excels", name), "wb") as f:
+                f.write(b"x")
+        cache = CheckCache(os.path.join(tmp, "cache.db"))
+        try:
+            for name in ("a.xlsx", "b.xlsx", "已删除.xlsx"):
+                cache.put(f"excels/{name}", {"hash": name})
+            os.remove(os.path.join(tmp, "excels", "b.xlsx"))
+            assert cache.prune_missing(tmp) == 2
+            assert cache.paths() == ["excels/a.xlsx"]
+            assert cache.prune_missing(tmp) == 0
+        finally:
+            cache.close()
+
+
+def main():
+    """依次运行所有测试，输出结果"""
+    print("=" * 60)
+    print("检查结果缓存测试")
+    print("=" * 60)
+    tests = [value for name, value in sorted(globals().items()) if name.startswith("test_")]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"[OK] {test.__doc__}")
+        except AssertionError as e:
+            failed += 1
+            print(f"[ERROR] {test.__doc__}: {e}")
+    print("-" * 60)
+    print(f"测试完成: 通过 {len(tests) - failed} 个, 失败 {failed} 个")
+    return failed == 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(0 if main() else 1)
@@ -55,7 +55,7 @@ def modify_excel_without_revision():
     print("\n现在执行以下命令测试:")
     print(f"  git add {TEST_FILE_PATH}")
     print(f"  git commit -m '修改数据文件'")
-    print("\n预期结果: 提交被拦截，提示'修改记录sheet页为空'")
+    print("\n预期结果: 提交被拦截，提示'数据sheet已修改（数据表1），但修改记录中没有新增修订记录'")
 
 
 def modify_excel_with_revision():
@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+CI分片测试脚本
+检查分片分配的确定性，以及合并时对缺失、重复和未正常结束的分片的处理
+"""
+
+import contextlib
+import io
+import os
+import random
+import tempfile
+
+import ci_shards
+from ci_shards import ShardResultWriter, partition, select_shard
+
+
+def create_files(tmp, count):
+    """生成大小各不相同（部分相同）的文件，返回 [(文件路径, 相对路径)]"""
+    file_list = []
+    for index in range(count):
+        relative_path = f"excels/数据文件_{index:03d}.xlsx"
+        filepath = os.path.join(tmp, f"{index:03d}.xlsx")
+        with open(filepath, "wb") as f:
+            f.write(b"x" * (index % 7 * 100))
+        file_list.append((filepath, relative_path))
+    return file_list
+
+
+def write_shard(tmp, index, count, files, finished=True, name=None):
+    """写入一个分片的结果文件，finished为False时模拟节点中途失败（没有汇总行）"""
+    path = os.path.join(tmp, name or f"shard_{index}.ndjson")
+    writer = ShardResultWriter(path, index, count, total=sum(len(shard) for shard in files.values()),
+                               refs=["main"])
+    for relative_path in files[index]:
+        writer.write_result(relative_path, "pass", duration=0.1)
+    if finished:
+        writer.close()
+    else:
+        writer._file.close()
+    return path
+
+
+def merge_exit_code(paths):
+    """执行merge子命令，返回退出状态码"""
+    with contextlib.redirect_stdout(io.StringIO()):
+        try:
+            ci_shards.main(paths)
+        except SystemExit as e:
+            return e.code
+    return None
+
+
+def test_partition_deterministic():
+    """分配结果与枚举顺序无关，各分片互不相交且覆盖所有文件"""
+    with tempfile.TemporaryDirectory() as tmp:
+        file_list = create_files(tmp, 23)
+        for count in range(1, 6):
+            shards = partition(file_list, count)
+            shuffled = list(file_list)
+            random.Random(count).shuffle(shuffled)
+            assert partition(shuffled, count) == shards
+            assert len(shards) == count
+            paths = [relative_path for shard in shards for _filepath, relative_path in shard]
+            assert sorted(paths) == sorted(item[1] for item in file_list)
+            assert len(paths) == len(set(paths))
+            for index in range(1, count + 1):
+                assert select_shard(shuffled, index, count) == shards[index - 1]
+
+
+def test_partition_balanced():
+    """各分片的总大小尽量接近"""
+    with tempfile.TemporaryDirectory() as tmp:
+        file_list = create_files(tmp, 23)
+        loads = [sum(os.path.getsize(filepath) for filepath, _ in shard) for shard in partition(file_list, 3)]
+        assert max(loads) - min(loads) <= 600, loads
+
+
+def test_merge_complete():
+    """所有分片都正常结束时合并成功"""
+    with tempfile.TemporaryDirectory() as tmp:
+        files = {1: ["a.xlsx", "b.xlsx"], 2: ["c.xlsx"]}
+        paths = [write_shard(tmp, index, 2, files) for index in files]
+        assert merge_exit_code(paths) == 0
+        report = ci_shards.merge_shards([ci_shards.read_shard_result(path)[0] for path in paths])
+        assert report["problems"] == []
+        assert report["passed"] == 3
+
+
+def test_merge_missing_shard():
+    """缺少分片时合并失败"""
+    with tempfile.TemporaryDirectory() as tmp:
+        files = {1: ["a.xlsx"], 2: ["b.xlsx"], 3: ["c.xlsx"]}
+        paths = [write_shard(tmp, index, 3, files) for index in (1, 3)]
+        assert merge_exit_code(paths) == 1
+
+
+def test_merge_duplicated_shard():
+    """同一分片有多个结果文件时合并失败"""
+    with tempfile.TemporaryDirectory() as tmp:
+        files = {1: ["a.xlsx"], 2: ["b.xlsx"]}
+        paths = [write_shard(tmp, index, 2, files) for index in files]
+        paths.append(write_shard(tmp, 2, 2, files, name="shard_2_retry.ndjson"))
+        assert merge_exit_code(paths) == 1
+
+
+def test_merge_unfinished_shard():
+    """分片未正常结束（缺少汇总行）时合并失败"""
+    with tempfile.TemporaryDirectory() as tmp:
+        files = {1: ["a.xlsx"], 2: ["b.xlsx"]}
+        paths = [write_shard(tmp, 1, 2, files), write_shard(tmp, 2, 2, files, finished=False)]
+        assert merge_exit_code(paths) == 1
+
+
+def test_merge_invalid_file():
+    """不是分片结果的文件合并失败"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "other.ndjson")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write('{"type": "file", "path": "a.xlsx"}\n')
+        assert merge_exit_code([path]) == 1
+
+
+def main():
+    """依次运行所有测试，输出结果"""
+    print("=" * 60)
+    print("CI分片测试")
+    print("=" * 60)
+    tests = [value for name, value in sorted(globals().items()) if name.startswith("test_")]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"[OK] {test.__doc__}")
+        except AssertionError as e:
+            failed += 1
+            print(f"[ERROR] {test.__doc__}: {e}")
+    print("-" * 60)
+    print(f"测试完成: 通过 {len(tests) - failed} 个, 失败 {failed} 个")
+    return failed == 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(0 if main() else 1)
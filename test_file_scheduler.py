@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+文件调度测试脚本
+检查重复路径、按工作量排序和内存预算
+"""
+
+import os
+import tempfile
+
+from file_scheduler import FileScheduler
+
+
+def create_files(tmp, sizes):
+    """按 {相对路径: 字节数} 生成文件，返回 [(文件路径, 相对路径)]"""
+    file_list = []
+    for relative_path, size in sizes.items():
+        filepath = os.path.join(tmp, relative_path)
+        with open(filepath, "wb") as f:
+            f.write(b"x" * size)
+        file_list.append((filepath, relative_path))
+    return file_list
+
+
+def run_all(scheduler):
+    """每轮开始所有可以开始的文件再全部完成，返回每轮开始的相对路径"""
+    rounds = []
+    while scheduler.pending:
+        started = scheduler.take()
+        assert started, "还有文件未完成，但没有文件可以开始"
+        rounds.append([relative_path for _filepath, relative_path in started])
+        for _filepath, relative_path in started:
+            scheduler.finish(relative_path)
+    return rounds
+
+
+def test_duplicate_paths():
+    """同一相对路径出现多次时只调度一次，完成时不报错"""
+    with tempfile.TemporaryDirectory() as tmp:
+        file_list = create_files(tmp, {"a.xlsx": 100, "b.xlsx": 200})
+        scheduler = FileScheduler(file_list + file_list[:1], adaptive=False)
+        rounds = run_all(scheduler)
+        started = [relative_path for paths in rounds for relative_path in paths]
+        assert sorted(started) == ["a.xlsx", "b.xlsx"], started
+
+
+def test_largest_first():
+    """工作量大的文件先开始"""
+    with tempfile.TemporaryDirectory() as tmp:
+        file_list = create_files(tmp, {"small.xlsx": 10, "large.xlsx": 1000, "medium.xlsx": 100})
+        scheduler = FileScheduler(file_list, max_workers=1, adaptive=False)
+        assert run_all(scheduler) == [["large.xlsx"], ["medium.xlsx"], ["small.xlsx"]]
+
+
+def test_memory_budget():
+    """放不进内存预算的文件等待在途文件完成，超过预算的单个文件单独运行"""
+    with tempfile.TemporaryDirectory() as tmp:
+        file_list = create_files(tmp, {"a.xlsx": 400, "b.xlsx": 300, "c.xlsx": 100})
+        scheduler = FileScheduler(file_list, copies=2, memory_budget=1000, adaptive=False)
+        assert run_all(scheduler) == [["a.xlsx"], ["b.xlsx", "c.xlsx"]]
+
+        scheduler = FileScheduler(file_list, copies=2, memory_budget=100, adaptive=False)
+        assert run_all(scheduler) == [["a.xlsx"], ["b.xlsx"], ["c.xlsx"]]
+
+
+def test_missing_file():
+    """不存在的文件按大小0调度"""
+    scheduler = FileScheduler([("/不存在/x.xlsx", "x.xlsx")], adaptive=False)
+    assert run_all(scheduler) == [["x.xlsx"]]
+
+
+def main():
+    """依次运行所有测试，输出结果"""
+    print("=" * 60)
+    print("文件调度测试")
+    print("=" * 60)
+    tests = [value for name, value in sorted(globals().items()) if name.startswith("test_")]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"[OK] {test.__doc__}")
+        except AssertionError as e:
+            failed += 1
+            print(f"[ERROR] {test.__doc__}: {e}")
+    print("-" * 60)
+    print(f"测试完成: 通过 {len(tests) - failed} 个, 失败 {failed} 个")
+    return failed == 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(0 if main() else 1)
@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Git blob读取测试脚本
+在临时仓库中检查路径解析、git cat-file --batch 读取、缺失文件的处理，
+以及暂存区文件的OID（暂存后又修改工作区时检查的是暂存的内容）
+"""
+
+import asyncio
+import os
+import subprocess
+import tempfile
+
+from git_blobs import AsyncBlobReader, BlobFetchError, BlobMissingError, GitBlobFetcher, list_staged_blobs
+
+FILES = {
+    "excels/数据文件_001.xlsx": "第一个文件".encode("utf-8"),
+    "excels/带 空格 的文件.xlsx": b"file with spaces",
+    "excels/中文 目录/文件（副本）.xlsx": b"nested directory",
+    "excels/plain.xlsx": b"",
+}
+
+
+def git(repo, *args, input=None):
+    """在测试仓库中执行git命令，返回输出"""
+    result = subprocess.run(['git'] + list(args), cwd=repo, input=input, capture_output=True, check=True)
+    return result.stdout.decode("utf-8").strip()
+
+
+def write_file(repo, path, content):
+    full_path = os.path.join(repo, path)
+    os.makedirs(os.path.dirname(full_path), exist_ok=True)
+    with open(full_path, "wb") as f:
+        f.write(content)
+
+
+def create_repo(path, files=FILES):
+    """创建main分支上有一次提交的仓库"""
+    os.makedirs(path)
+    git(path, 'init', '-q', '-b', 'main')
+    git(path, 'config', 'user.name', '测试用户')
+    git(path, 'config', 'user.email', 'test@example.com')
+    for name, content in files.items():
+        write_file(path, name, content)
+    git(path, 'add', '-A')
+    git(path, 'commit', '-q', '-m', '初始提交')
+
+
+def test_resolve_and_read():
+    """包含空格、中文和全角括号的路径都能解析并读取"""
+    with tempfile.TemporaryDirectory() as tmp:
+        repo = os.path.join(tmp, "repo")
+        create_repo(repo)
+        with GitBlobFetcher(cwd=repo) as fetcher:
+            resolved = fetcher.resolve(list(FILES) + ["excels/不存在.xlsx"], "main")
+            assert sorted(resolved) == sorted(FILES)
+            for name, content in FILES.items():
+                assert resolved[name] == git(repo, 'rev-parse', f"main:{name}")
+                assert fetcher.read_path(name, "main") == content
+
+
+def test_read_many_blobs():
+    """同一个 cat-file 进程连续读取多个blob，内容按请求顺序返回"""
+    with tempfile.TemporaryDirectory() as tmp:
+        repo = os.path.join(tmp, "repo")
+        files = {f"excels/文件_{index:03d}.xlsx": os.urandom(index * 97) for index in range(50)}
+        create_repo(repo, files)
+        with GitBlobFetcher(cwd=repo) as fetcher:
+            resolved = fetcher.resolve(list(files), "main")
+            process = None
+            for name, content in files.items():
+                assert fetcher.read(resolved[name]) == content
+                process = process or fetcher._process
+                assert fetcher._process is process
+
+
+def test_missing_path():
+    """分支中不存在的路径抛出BlobMissingError，不存在的对象同样"""
+    with tempfile.TemporaryDirectory() as tmp:
+        repo = os.path.join(tmp, "repo")
+        create_repo(repo)
+        with GitBlobFetcher(cwd=repo) as fetcher:
+            for call in (lambda: fetcher.get_oid("excels/新文件.xlsx", "main"),
+                         lambda: fetcher.read_path("excels/新文件.xlsx", "main"),
+                         lambda: fetcher.read("0" * 40)):
+                try:
+                    call()
+                except BlobMissingError:
+                    continue
+                raise AssertionError("没有抛出BlobMissingError")
+            # 读取失败后进程仍可继续使用
+            assert fetcher.read_path("excels/plain.xlsx", "main") == b""
+
+
+def test_unknown_ref():
+    """分支不存在时抛出BlobFetchError（不是BlobMissingError）"""
+    with tempfile.TemporaryDirectory() as tmp:
+        repo = os.path.join(tmp, "repo")
+        create_repo(repo)
+        with GitBlobFetcher(cwd=repo) as fetcher:
+            try:
+                fetcher.get_oid("excels/plain.xlsx", "不存在的分支")
+            except BlobMissingError:
+                raise AssertionError("分支不存在被报告为文件不存在")
+            except BlobFetchError as e:
+                assert "不存在的分支" in str(e)
+            else:
+                raise AssertionError("没有抛出BlobFetchError")
+
+
+def test_not_a_blob():
+    """读取的对象不是blob时抛出BlobFetchError"""
+    with tempfile.TemporaryDirectory() as tmp:
+        repo = os.path.join(tmp, "repo")
+        create_repo(repo)
+        tree = git(repo, 'rev-parse', 'main^{tree}')
+        with GitBlobFetcher(cwd=repo) as fetcher:
+            try:
+                fetcher.read(tree)
+            except BlobMissingError:
+                raise AssertionError("树对象被报告为不存在")
+            except BlobFetchError:
+                pass
+            else:
+                raise AssertionError("没有抛出BlobFetchError")
+
+
+def test_async_reader():
+    """协程版本的读取器读到相同的内容"""
+    async def read_all(repo, oids):
+        reader = AsyncBlobReader(cwd=repo)
+        try:
+            contents = [await reader.read(oid) for oid in oids]
+            try:
+                await reader.read("0" * 40)
+            except BlobMissingError:
+                contents.append(None)
+            return contents
+        finally:
+            await reader.close()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        repo = os.path.join(tmp, "repo")
+        create_repo(repo)
+        oids = [git(repo, 'rev-parse', f"main:{name}") for name in FILES]
+        assert asyncio.run(read_all(repo, oids)) == list(FILES.values()) + [None]
+
+
+def test_staged_differs_from_working_tree():
+    """暂存后又修改工作区时，返回暂存内容的OID，读到的是暂存的内容"""
+    with tempfile.TemporaryDirectory() as tmp:
+        repo = os.path.join(tmp, "repo")
+        create_repo(repo)
+        for name in FILES:
+            write_file(repo, name, "暂存的内容".encode("utf-8") + name.encode("utf-8"))
+        git(repo, 'add', '-A')
+        for name in FILES:
+            write_file(repo, name, b"working tree only")
+
+        staged = list_staged_blobs(cwd=repo)
+        assert sorted(staged) == sorted(FILES)
+        working_oid = git(repo, 'hash-object', os.path.join(repo, "excels/plain.xlsx"))
+        with GitBlobFetcher(cwd=repo) as fetcher:
+            for name, oid in staged.items():
+                assert oid != working_oid
+                assert oid == git(repo, 'rev-parse', f":{name}")
+                assert fetcher.read(oid) == "暂存的内容".encode("utf-8") + name.encode("utf-8")
+
+
+def test_staged_filter():
+    """只列出新增、复制和修改的文件，删除的文件不列出"""
+    with tempfile.TemporaryDirectory() as tmp:
+        repo = os.path.join(tmp, "repo")
+        create_repo(repo)
+        git(repo, 'rm', '-q', '--', "excels/带 空格 的文件.xlsx")
+        write_file(repo, "excels/新增 文件.xlsx", b"added")
+        write_file(repo, "excels/plain.xlsx", b"modified")
+        write_file(repo, "excels/数据文件_001.xlsx", b"not staged")
+        git(repo, 'add', '--', "excels/新增 文件.xlsx", "excels/plain.xlsx")
+        assert sorted(list_staged_blobs(cwd=repo)) == ["excels/plain.xlsx", "excels/新增 文件.xlsx"]
+        assert list(list_staged_blobs(diff_filter="D", cwd=repo)) == ["excels/带 空格 的文件.xlsx"]
+
+
+def test_staged_before_first_commit():
+    """首次提交前（没有HEAD）与空树比较"""
+    with tempfile.TemporaryDirectory() as tmp:
+        repo = os.path.join(tmp, "repo")
+        os.makedirs(repo)
+        git(repo, 'init', '-q')
+        write_file(repo, "excels/数据文件_001.xlsx", b"first")
+        git(repo, 'add', '-A')
+        staged = list_staged_blobs(cwd=repo)
+        assert list(staged) == ["excels/数据文件_001.xlsx"]
+        assert staged["excels/数据文件_001.xlsx"] == git(repo, 'rev-parse', ":excels/数据文件_001.xlsx")
+
+        try:
+            list_staged_blobs(cwd=tmp)
+        except BlobFetchError:
+            pass
+        else:
+            raise AssertionError("不在git仓库中时没有抛出BlobFetchError")
+
+
+def main():
+    """依次运行所有测试，输出结果"""
+    print("=" * 60)
+    print("Git blob读取测试")
+    print("=" * 60)
+    tests = [value for name, value in sorted(globals().items()) if name.startswith("test_")]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"[OK] {test.__doc__}")
+        except AssertionError as e:
+            failed += 1
+            print(f"[ERROR] {test.__doc__}: {e}")
+    print("-" * 60)
+    print(f"测试完成: 通过 {len(tests) - failed} 个, 失败 {failed} 个")
+    return failed == 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(0 if main() else 1)
@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Git LFS指针解析测试脚本
+检查指针格式、本地对象库查找（缺失、不完整、空对象）和对象的内存映射读取
+"""
+
+import hashlib
+import os
+import subprocess
+import tempfile
+
+from git_lfs import LfsObject, LfsObjectStore, lfs_objects_dir, parse_pointer
+
+CONTENT = "Excel文件内容".encode("utf-8") * 100
+OID = hashlib.sha256(CONTENT).hexdigest()
+
+
+def pointer(oid=OID, size=len(CONTENT), version="https://git-lfs.github.com/spec/v1"):
+    """生成LFS指针文件的内容"""
+    return f"version {version}\noid sha256:{oid}\nsize {size}\n".encode("utf-8")
+
+
+def store_object(objects_dir, content, oid=None):
+    """把对象写入本地对象库，返回路径"""
+    oid = oid or hashlib.sha256(content).hexdigest()
+    path = os.path.join(objects_dir, oid[0:2], oid[2:4], oid)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(content)
+    return path
+
+
+def test_valid_pointer():
+    """解析v1指针（包括hawser前缀和扩展字段）"""
+    assert parse_pointer(pointer()) == (OID, len(CONTENT))
+    assert parse_pointer(pointer(version="https://hawser.github.com/spec/v1")) == (OID, len(CONTENT))
+    extended = pointer() + b"ext-0-foo sha256:" + b"0" * 64 + b"\n"
+    assert parse_pointer(bytearray(extended)) == (OID, len(CONTENT))
+
+
+def test_invalid_pointer():
+    """OID长度错误、不是十六进制、缺少大小或不是指针时返回None"""
+    assert parse_pointer(pointer(oid=OID[:-1])) is None
+    assert parse_pointer(pointer(oid=OID[:-1] + "g")) is None
+    assert parse_pointer(pointer(oid=OID.upper())) is None
+    assert parse_pointer(pointer(size="大")) is None
+    assert parse_pointer(pointer().replace(b"sha256:", b"md5:")) is None
+    assert parse_pointer(pointer() + b" " * 1024) is None
+    assert parse_pointer(b"PK\x03\x04" + pointer()) is None
+    assert parse_pointer("不是字节内容") is None
+
+
+def test_resolve_passes_through():
+    """不是指针的内容原样返回"""
+    store = LfsObjectStore(None)
+    content = b"PK\x03\x04 workbook"
+    resolved, error = store.resolve(content)
+    assert resolved is content
+    assert error is None
+
+
+def test_resolve_object():
+    """指针替换为本地对象库中的对象，映射读取的内容与原文件相同"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = store_object(tmp, CONTENT)
+        store = LfsObjectStore(tmp)
+        found, error = store.resolve(pointer())
+        assert error is None
+        assert isinstance(found, LfsObject)
+        assert (found.path, found.oid, found.size) == (path, OID, len(CONTENT))
+        with found.open() as mapped:
+            assert mapped.seekable()
+            assert mapped.read() == CONTENT
+        assert mapped.closed
+        assert store.lookup(OID, len(CONTENT))[0] is found
+
+
+def test_missing_object():
+    """对象不在本地对象库中时报错，获取后不需要重建即可读到"""
+    with tempfile.TemporaryDirectory() as tmp:
+        store = LfsObjectStore(tmp)
+        found, error = store.lookup(OID, len(CONTENT))
+        assert found is None
+        assert "不在本地对象库中" in error
+        store_object(tmp, CONTENT)
+        found, error = store.lookup(OID, len(CONTENT))
+        assert error is None and found is not None
+
+        found, error = LfsObjectStore(None).lookup(OID, len(CONTENT))
+        assert found is None
+        assert "不在git仓库中" in error
+
+
+def test_incomplete_object():
+    """本地对象的大小与指针不符时报告不完整"""
+    with tempfile.TemporaryDirectory() as tmp:
+        store_object(tmp, CONTENT[:100], oid=OID)
+        found, error = LfsObjectStore(tmp).lookup(OID, len(CONTENT))
+        assert found is None
+        assert f"不完整（100/{len(CONTENT)} 字节）" in error
+
+
+def test_empty_object():
+    """大小为0的对象不查找对象库，直接返回空内容"""
+    empty_oid = hashlib.sha256(b"").hexdigest()
+    assert LfsObjectStore(None).resolve(pointer(oid=empty_oid, size=0)) == (b"", None)
+
+
+def test_objects_dir():
+    """对象库位于git公共目录下，遵循 lfs.storage 配置"""
+    with tempfile.TemporaryDirectory() as tmp:
+        subprocess.run(['git', 'init', '-q', tmp], check=True)
+        git_dir = os.path.realpath(os.path.join(tmp, ".git"))
+        assert os.path.realpath(lfs_objects_dir(tmp)) == os.path.join(git_dir, "lfs", "objects")
+        subprocess.run(['git', 'config', 'lfs.storage', 'lfs-store'], cwd=tmp, check=True)
+        assert os.path.realpath(lfs_objects_dir(tmp)) == os.path.join(git_dir, "lfs-store", "objects")
+        outside = os.path.join(tmp, "outside")
+        os.makedirs(outside)
+        os.environ["GIT_CEILING_DIRECTORIES"] = tmp
+        try:
+            assert lfs_objects_dir(outside) is None
+        finally:
+            del os.environ["GIT_CEILING_DIRECTORIES"]
+
+
+def main():
+    """依次运行所有测试，输出结果"""
+    print("=" * 60)
+    print("Git LFS指针解析测试")
+    print("=" * 60)
+    tests = [value for name, value in sorted(globals().items()) if name.startswith("test_")]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"[OK] {test.__doc__}")
+        except AssertionError as e:
+            failed += 1
+            print(f"[ERROR] {test.__doc__}: {e}")
+    print("-" * 60)
+    print(f"测试完成: 通过 {len(tests) - failed} 个, 失败 {failed} 个")
+    return failed == 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(0 if main() else 1)
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+分阶段计时测试脚本
+检查汇总表的列对齐和百分位数
+"""
+
+import contextlib
+import io
+
+from profiling import Profiler, _display_width, _percentile
+
+
+def summary_lines(stages):
+    """按阶段各记录一个时间段，返回汇总表的各行"""
+    profiler = Profiler()
+    for stage in stages:
+        with profiler.span(stage, "excels/a.xlsx"):
+            pass
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output):
+        profiler.print_summary()
+    return output.getvalue().splitlines()
+
+
+def test_columns_aligned():
+    """阶段名超过表头宽度或包含中文时，各行的显示宽度仍然相同"""
+    lines = summary_lines(["hash", "sheet_fingerprint", "confirm_changes", "自定义的很长的阶段名称"])
+    widths = {_display_width(line) for line in lines}
+    assert len(widths) == 1, lines
+    for line in lines[1:]:
+        assert line.split()[1] == "1", line
+
+
+def test_short_stages():
+    """阶段名都很短时阶段列按表头宽度计算"""
+    lines = summary_lines(["a"])
+    assert len({_display_width(line) for line in lines}) == 1, lines
+    assert lines[1].split()[:2] == ["a", "1"]
+
+
+def test_percentile():
+    """最近秩法计算百分位数"""
+    values = [float(value) for value in range(1, 21)]
+    assert _percentile(values, 50) == 10.0
+    assert _percentile(values, 95) == 19.0
+    assert _percentile([3.0], 95) == 3.0
+
+
+def main():
+    """依次运行所有测试，输出结果"""
+    print("=" * 60)
+    print("分阶段计时测试")
+    print("=" * 60)
+    tests = [value for name, value in sorted(globals().items()) if name.startswith("test_")]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"[OK] {test.__doc__}")
+        except AssertionError as e:
+            failed += 1
+            print(f"[ERROR] {test.__doc__}: {e}")
+    print("-" * 60)
+    print(f"测试完成: 通过 {len(tests) - failed} 个, 失败 {failed} 个")
+    return failed == 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(0 if main() else 1)
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+远程修订记录缓存测试脚本
+检查按OID保存和读取、按修改时间的LRU淘汰，以及损坏条目按未命中处理
+"""
+
+import json
+import os
+import tempfile
+import time
+
+from record_cache import CACHE_FORMAT_VERSION, RemoteRecordCache
+from revision_log import RevisionLog
+from shared_cache import DirectoryStore
+
+OID_A = "a" * 40
+OID_B = "b" * 40
+OID_C = "c" * 40
+
+RECORDS = RevisionLog.from_rows([
+    ("张三", "2024-01-01 09:00:00", "新建文件", "v1.0"),
+    ("李四", "不是日期", "修改单价", "v1.1"),
+])
+FINGERPRINTS = {"sheets": {"修改记录": [1, 2]}, "shared_strings": None}
+
+
+def test_round_trip():
+    """写入的修订记录和sheet指纹由新的缓存实例读回"""
+    with tempfile.TemporaryDirectory() as tmp:
+        RemoteRecordCache(tmp).put(OID_A, RECORDS, FINGERPRINTS)
+        records, fingerprints = RemoteRecordCache(tmp).get_entry(OID_A)
+        assert list(records) == list(RECORDS)
+        assert fingerprints == FINGERPRINTS
+        assert RemoteRecordCache(tmp).get(OID_B) is None
+
+
+def test_prune_least_recently_used():
+    """超过容量时按修改时间淘汰最久未使用的条目，读取会更新修改时间"""
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = RemoteRecordCache(tmp)
+        for oid in (OID_A, OID_B, OID_C):
+            cache.put(oid, RECORDS, FINGERPRINTS)
+        size = os.path.getsize(cache._path(OID_A))
+        now = time.time()
+        for age, oid in ((300, OID_A), (200, OID_B), (100, OID_C)):
+            os.utime(cache._path(oid), (now - age, now - age))
+        # 读取A后A成为最近使用的条目
+        assert cache.get(OID_A) is not None
+
+        cache.max_bytes = size * 2
+        cache.prune()
+        assert not os.path.exists(cache._path(OID_B))
+        assert os.path.exists(cache._path(OID_A))
+        assert os.path.exists(cache._path(OID_C))
+
+
+def test_prune_only_after_write():
+    """本次没有写入时不扫描缓存目录"""
+    with tempfile.TemporaryDirectory() as tmp:
+        RemoteRecordCache(tmp).put(OID_A, RECORDS)
+        cache = RemoteRecordCache(tmp, max_bytes=0)
+        cache.prune()
+        assert os.path.exists(cache._path(OID_A))
+
+
+def test_corrupt_entry_is_miss():
+    """损坏、被截断、版本不同或OID不符的条目视为未命中"""
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = RemoteRecordCache(tmp)
+        cache.put(OID_A, RECORDS, FINGERPRINTS)
+        path = cache._path(OID_A)
+        with open(path, 'r', encoding='utf-8') as f:
+            valid = f.read()
+        data = json.loads(valid)
+        broken_columns = dict(data, records=dict(data["records"], contents=["只有一条"]))
+        corrupted = [
+            valid[:len(valid) // 2],
+            "",
+            json.dumps(dict(data, version=CACHE_FORMAT_VERSION - 1)),
+            json.dumps(dict(data, oid=OID_B)),
+            json.dumps(dict(data, records=None)),
+            json.dumps(broken_columns),
+            json.dumps([1, 2, 3]),
+        ]
+        for content in corrupted:
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write(content)
+            assert RemoteRecordCache(tmp).get_entry(OID_A) is None, content[:60]
+
+
+def test_memory_entries():
+    """常驻服务在内存中保留最近使用的条目，超出数量时淘汰最旧的"""
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = RemoteRecordCache(tmp, memory_entries=1)
+        cache.put(OID_A, RECORDS)
+        cache.put(OID_B, RECORDS)
+        assert list(cache._memory) == [OID_B]
+        os.remove(cache._path(OID_B))
+        assert cache.get(OID_B) is RECORDS
+
+
+def test_shared_read_through():
+    """本地未命中时读取共享层并写回本地"""
+    with tempfile.TemporaryDirectory() as tmp:
+        shared = DirectoryStore(os.path.join(tmp, "shared"))
+        RemoteRecordCache(os.path.join(tmp, "first"), shared=shared).put(OID_A, RECORDS, FINGERPRINTS)
+        second = RemoteRecordCache(os.path.join(tmp, "second"), shared=shared)
+        records, fingerprints = second.get_entry(OID_A)
+        assert list(records) == list(RECORDS)
+        assert fingerprints == FINGERPRINTS
+        assert os.path.exists(second._path(OID_A))
+
+
+def main():
+    """依次运行所有测试，输出结果"""
+    print("=" * 60)
+    print("远程修订记录缓存测试")
+    print("=" * 60)
+    tests = [value for name, value in sorted(globals().items()) if name.startswith("test_")]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"[OK] {test.__doc__}")
+        except AssertionError as e:
+            failed += 1
+            print(f"[ERROR] {test.__doc__}: {e}")
+    print("-" * 60)
+    print(f"测试完成: 通过 {len(tests) - failed} 个, 失败 {failed} 个")
+    return failed == 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(0 if main() else 1)
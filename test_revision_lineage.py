@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+修订记录谱系校验测试脚本
+检查子序列模式和前缀模式下LineageMatcher的结论
+"""
+
+from datetime import datetime
+
+from revision_lineage import LineageMatcher
+from revision_log import RevisionLog, normalize_row
+
+COLUMNS = ["修订人", "修订时间", "修订内容"]
+
+REMOTE_ROWS = [
+    ("张三", datetime(2024, 1, 1, 9, 0, 0), "新建文件", "v1.0"),
+    ("李四", datetime(2024, 1, 2, 9, 0, 0), "修改单价", "v1.1"),
+    ("王五", datetime(2024, 1, 3, 9, 0, 0), "修改数量", "v1.2"),
+]
+NEW_ROW = ("本地用户", datetime(2024, 2, 1, 9, 0, 0), "本地修改", "v1.3")
+
+
+def verdict(local_rows, mode="subsequence", remote_rows=REMOTE_ROWS):
+    """按模式校验本地记录，返回 (是否延续远程记录, 错误信息)"""
+    matcher = LineageMatcher(RevisionLog.from_rows(remote_rows), COLUMNS, mode)
+    for row in local_rows:
+        matcher.feed(normalize_row(row))
+    return matcher.verdict()
+
+
+def test_appended_record_passes():
+    """在远程记录之后追加新记录时两种模式都通过"""
+    for mode in ("subsequence", "prefix"):
+        assert verdict(REMOTE_ROWS + [NEW_ROW], mode) == (True, None)
+
+
+def test_inserted_record():
+    """在远程记录之间插入记录：子序列模式通过，前缀模式不通过"""
+    local_rows = REMOTE_ROWS[:1] + [NEW_ROW] + REMOTE_ROWS[1:]
+    assert verdict(local_rows, "subsequence") == (True, None)
+    passed, error = verdict(local_rows, "prefix")
+    assert not passed
+    assert "从第 2 条（李四 - 2024-01-02 09:00:00）开始不一致" in error
+
+
+def test_missing_record():
+    """缺少远程记录时两种模式都报告缺失的记录"""
+    local_rows = REMOTE_ROWS[:1] + REMOTE_ROWS[2:] + [NEW_ROW]
+    for mode in ("subsequence", "prefix"):
+        passed, error = verdict(local_rows, mode)
+        assert not passed
+        assert "本地文件未包含远程的 1 条修订记录" in error
+        assert "李四 - 2024-01-02 09:00:00" in error
+
+
+def test_modified_record():
+    """改写远程记录的内容视为缺失该记录"""
+    modified = ("李四", datetime(2024, 1, 2, 9, 0, 0), "改写过的内容", "v1.1")
+    passed, error = verdict([REMOTE_ROWS[0], modified, REMOTE_ROWS[2]])
+    assert not passed
+    assert "1 条修订记录" in error
+
+
+def test_reordered_records():
+    """记录都在但顺序被改动时报告顺序不一致"""
+    local_rows = [REMOTE_ROWS[1], REMOTE_ROWS[0], REMOTE_ROWS[2]]
+    passed, error = verdict(local_rows)
+    assert not passed
+    assert "顺序与远程不一致" in error
+
+
+def test_equivalent_values():
+    """日期单元格与日期文本、首尾空格、整数值的浮点数归一化后相同"""
+    remote_rows = [("张三", datetime(2024, 1, 1, 9, 0, 0), "修改 ", 1.0)]
+    local_rows = [(" 张三", "2024/1/1 09:00", "修改", 1)]
+    assert verdict(local_rows, remote_rows=remote_rows) == (True, None)
+
+
+def test_version_column_ignored():
+    """不在校验列中的修订版本不影响结论"""
+    local_rows = [row[:3] + ("v9.9",) for row in REMOTE_ROWS]
+    assert verdict(local_rows, "prefix") == (True, None)
+
+
+def test_feed_reports_completion():
+    """远程记录全部匹配后feed返回True，可以停止读取"""
+    matcher = LineageMatcher(RevisionLog.from_rows(REMOTE_ROWS), COLUMNS)
+    results = [matcher.feed(normalize_row(row)) for row in REMOTE_ROWS]
+    assert results == [False, False, True]
+    assert matcher.local_count == len(REMOTE_ROWS)
+
+
+def test_unknown_mode():
+    """未知的校验模式抛出ValueError"""
+    try:
+        LineageMatcher(RevisionLog(), COLUMNS, "unknown")
+    except ValueError:
+        return
+    raise AssertionError("未知模式没有抛出异常")
+
+
+def main():
+    """依次运行所有测试，输出结果"""
+    print("=" * 60)
+    print("修订记录谱系校验测试")
+    print("=" * 60)
+    tests = [value for name, value in sorted(globals().items()) if name.startswith("test_")]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"[OK] {test.__doc__}")
+        except AssertionError as e:
+            failed += 1
+            print(f"[ERROR] {test.__doc__}: {e}")
+    print("-" * 60)
+    print(f"测试完成: 通过 {len(tests) - failed} 个, 失败 {failed} 个")
+    return failed == 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(0 if main() else 1)
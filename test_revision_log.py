@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+紧凑修订记录存储测试脚本
+检查按列保存、名字驻留、整数时间戳以及JSON编码的往返
+"""
+
+import json
+from datetime import date, datetime, time
+
+from revision_log import NO_TIMESTAMP, RevisionLog, normalize_row, normalize_value
+
+ROWS = [
+    ("张三", datetime(2024, 1, 2, 3, 4, 5), "新建文件", "v1.0"),
+    (" 李四 ", "2024/2/3 10:00", 12.0, 1.5),
+    ("张三", date(2024, 3, 4), True, None),
+    ("王五", datetime(2024, 4, 5, 6, 7, 8, 500000), "带微秒", "v1.0"),
+    ("赵六", "上周五", "修订时间不是日期", "v2.0"),
+    ("钱七", time(9, 30), None, "v2.0"),
+    ("孙八", None, "没有修订时间", "v2.0"),
+    ("周九", "2024-13-40", "日期文本无效", "v2.0"),
+]
+
+
+def test_normalize_row():
+    """单元格值归一化为与修订记录列对应的字符串元组"""
+    assert normalize_row(ROWS[0]) == ("张三", "2024-01-02 03:04:05", "新建文件", "v1.0")
+    assert normalize_row(ROWS[1]) == ("李四", "2024-02-03 10:00:00", "12", "1.5")
+    assert normalize_row(ROWS[2]) == ("张三", "2024-03-04 00:00:00", "TRUE", "")
+    assert normalize_row(ROWS[3])[1] == "2024-04-05 06:07:08.500000"
+    assert normalize_row(("只有一列",)) == ("只有一列", "", "", "")
+    assert normalize_value("  ") == ""
+
+
+def test_rows_match_normalize_row():
+    """按列保存后还原的每一行与normalize_row的结果相同"""
+    log = RevisionLog.from_rows(ROWS)
+    assert len(log) == len(ROWS)
+    assert list(log) == [normalize_row(row) for row in ROWS]
+
+
+def test_non_date_times_kept_as_text():
+    """无法解析为日期时间的修订时间以占位值保存，原文按归一化文本还原"""
+    log = RevisionLog.from_rows(ROWS)
+    untimed = [index for index, timestamp in enumerate(log.timestamps) if timestamp == NO_TIMESTAMP]
+    assert untimed == [4, 5, 6, 7]
+    assert [log.time_text(index) for index in untimed] == ["上周五", "09:30:00", "", "2024-13-40"]
+    assert log.timestamps[0] == (datetime(2024, 1, 2, 3, 4, 5) - datetime(1970, 1, 1)).total_seconds() * 10 ** 6
+
+
+def test_names_interned():
+    """相同的修订人和修订版本只保存一份"""
+    log = RevisionLog.from_rows(ROWS)
+    assert log.revisers[0] is log.revisers[2]
+    assert log.versions[0] is log.versions[3]
+    restored = RevisionLog.from_json(json.loads(json.dumps(log.to_json())))
+    assert restored.versions[4] is restored.versions[5] is restored.versions[6]
+
+
+def test_json_round_trip():
+    """to_json/from_json经过JSON文本往返后内容不变"""
+    log = RevisionLog.from_rows(ROWS)
+    restored = RevisionLog.from_json(json.loads(json.dumps(log.to_json(), ensure_ascii=False)))
+    assert list(restored) == list(log)
+    assert restored.timestamps == log.timestamps
+    assert restored.time_texts == log.time_texts
+    assert list(RevisionLog.from_json(RevisionLog().to_json())) == []
+
+
+def test_from_json_rejects_inconsistent_columns():
+    """各列长度不一致或占位值与文本不对应时抛出ValueError"""
+    data = RevisionLog.from_rows(ROWS).to_json()
+    broken = [
+        dict(data, contents=data["contents"][:-1]),
+        dict(data, revisers=data["revisers"] + ["多余"]),
+        dict(data, time_texts={"0": "多余的文本"}),
+    ]
+    for item in broken:
+        try:
+            RevisionLog.from_json(item)
+        except ValueError:
+            continue
+        raise AssertionError(f"没有检测到损坏的列: {sorted(item)}")
+
+
+def main():
+    """依次运行所有测试，输出结果"""
+    print("=" * 60)
+    print("紧凑修订记录存储测试")
+    print("=" * 60)
+    tests = [value for name, value in sorted(globals().items()) if name.startswith("test_")]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"[OK] {test.__doc__}")
+        except AssertionError as e:
+            failed += 1
+            print(f"[ERROR] {test.__doc__}: {e}")
+    print("-" * 60)
+    print(f"测试完成: 通过 {len(tests) - failed} 个, 失败 {failed} 个")
+    return failed == 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(0 if main() else 1)
@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+共享缓存层测试脚本
+检查条目校验和、共享目录的原子替换，以及git notes的合并提交和并发写入
+"""
+
+import json
+import os
+import subprocess
+import tempfile
+
+from revision_log import RevisionLog
+from shared_cache import DirectoryStore, GitNotesStore, decode_entry, encode_entry
+
+OID_A = "a" * 40
+OID_B = "b" * 40
+OID_C = "c" * 40
+NOTES_REF = "refs/notes/excel-checker-test"
+
+RECORDS = RevisionLog.from_rows([
+    ("张三", "2024-01-01 09:00:00", "新建文件", "v1.0"),
+    ("李四", "2024-01-02 09:00:00", "修改单价", "v1.1"),
+])
+FINGERPRINTS = {"sheets": {"修改记录": [1, 2]}, "shared_strings": [3, 4]}
+
+
+def git(repo, *args):
+    """在测试仓库中执行git命令，返回输出"""
+    result = subprocess.run(['git'] + list(args), cwd=repo, capture_output=True, text=True, check=True)
+    return result.stdout.strip()
+
+
+def create_repo(path):
+    """创建带有身份配置的空仓库"""
+    os.makedirs(path)
+    git(path, 'init', '-q')
+    git(path, 'config', 'user.name', '测试用户')
+    git(path, 'config', 'user.email', 'test@example.com')
+
+
+def test_entry_checksum():
+    """校验和不符、OID不符、版本不同或内容被截断的条目被拒绝"""
+    payload = encode_entry(OID_A, RECORDS, FINGERPRINTS)
+    records, fingerprints = decode_entry(OID_A, payload)
+    assert list(records) == list(RECORDS)
+    assert fingerprints == FINGERPRINTS
+
+    data = json.loads(payload.decode('utf-8'))
+    tampered = dict(data, records=dict(data["records"], contents=["被改写", "修改单价"]))
+    bad_checksum = dict(data, sha256="0" * 64)
+    old_version = dict(data, version=data["version"] - 1)
+    for bad in (tampered, bad_checksum, old_version):
+        assert decode_entry(OID_A, json.dumps(bad).encode('utf-8')) is None
+    assert decode_entry(OID_B, payload) is None
+    assert decode_entry(OID_A, payload[:len(payload) // 2]) is None
+    assert decode_entry(OID_A, b"\xff\xfe") is None
+    assert decode_entry(OID_A, b"[]") is None
+
+
+def test_directory_store_round_trip():
+    """共享目录写入后由新实例读回，目录中不留临时文件"""
+    with tempfile.TemporaryDirectory() as tmp:
+        DirectoryStore(tmp).put(OID_A, RECORDS, FINGERPRINTS)
+        records, fingerprints = DirectoryStore(tmp).get(OID_A)
+        assert list(records) == list(RECORDS)
+        assert fingerprints == FINGERPRINTS
+        assert DirectoryStore(tmp).get(OID_B) is None
+        assert os.listdir(os.path.join(tmp, OID_A[:2])) == [OID_A + ".json"]
+
+
+def test_directory_store_replaces_invalid():
+    """有效条目不重复写入，读到的损坏条目在下次写入时被替换"""
+    with tempfile.TemporaryDirectory() as tmp:
+        store = DirectoryStore(tmp)
+        path = store._path(OID_A)
+        os.makedirs(os.path.dirname(path))
+        with open(path, 'wb') as f:
+            f.write(b'{"version": 2, "oid": "')
+        assert store.get(OID_A) is None
+        store.put(OID_A, RECORDS, FINGERPRINTS)
+        assert store.get(OID_A) is not None
+
+        # 已有有效条目时不覆盖
+        other = RevisionLog.from_rows([("王五", "2024-03-01 09:00:00", "其他内容", "v2.0")])
+        DirectoryStore(tmp).put(OID_A, other, None)
+        assert list(DirectoryStore(tmp).get(OID_A)[0]) == list(RECORDS)
+
+
+def test_directory_store_readonly():
+    """只读的共享目录不写入"""
+    with tempfile.TemporaryDirectory() as tmp:
+        DirectoryStore(tmp, readonly=True).put(OID_A, RECORDS, FINGERPRINTS)
+        assert os.listdir(tmp) == []
+
+
+def test_git_notes_batched_commit():
+    """一次检查中新增的条目合并为注释引用上的一次提交"""
+    with tempfile.TemporaryDirectory() as tmp:
+        repo = os.path.join(tmp, "repo")
+        create_repo(repo)
+        store = GitNotesStore(ref=NOTES_REF, cwd=repo)
+        store.put(OID_A, RECORDS, FINGERPRINTS)
+        store.put(OID_B, RECORDS, None)
+        store.flush()
+        assert git(repo, 'rev-list', '--count', NOTES_REF) == "1"
+
+        reader = GitNotesStore(ref=NOTES_REF, cwd=repo)
+        try:
+            records, fingerprints = reader.get(OID_A)
+            assert list(records) == list(RECORDS)
+            assert fingerprints == FINGERPRINTS
+            assert reader.get(OID_B)[1] is None
+            assert reader.get(OID_C) is None
+        finally:
+            reader.flush()
+
+        # 已有的注释保留，新条目追加为第二次提交
+        store.put(OID_A, RECORDS, FINGERPRINTS)
+        store.put(OID_C, RECORDS, FINGERPRINTS)
+        store.flush()
+        assert git(repo, 'rev-list', '--count', NOTES_REF) == "2"
+        assert len(git(repo, 'notes', '--ref', NOTES_REF, 'list').splitlines()) == 3
+
+
+def test_git_notes_lost_race():
+    """其他进程在提交期间更新了注释引用时放弃本次写入，不覆盖对方的提交"""
+    with tempfile.TemporaryDirectory() as tmp:
+        repo = os.path.join(tmp, "repo")
+        create_repo(repo)
+        store = GitNotesStore(ref=NOTES_REF, cwd=repo)
+        run_git = store._git
+
+        def racing_git(args, input=None, env=None):
+            # 在更新引用前由另一个写入者抢先提交
+            if args[0] == 'update-ref':
+                other = GitNotesStore(ref=NOTES_REF, cwd=repo)
+                other.put(OID_B, RECORDS, FINGERPRINTS)
+                other.flush()
+            return run_git(args, input=input, env=env)
+
+        store._git = racing_git
+        store.put(OID_A, RECORDS, FINGERPRINTS)
+        store.flush()
+        store._git = run_git
+
+        notes = git(repo, 'notes', '--ref', NOTES_REF, 'list')
+        assert OID_B in notes and OID_A not in notes, notes
+        assert git(repo, 'rev-list', '--count', NOTES_REF) == "1"
+
+        # 下次检查时重新写入，保留对方的注释
+        store.put(OID_A, RECORDS, FINGERPRINTS)
+        store.flush()
+        notes = git(repo, 'notes', '--ref', NOTES_REF, 'list')
+        assert OID_A in notes and OID_B in notes, notes
+
+
+def main():
+    """依次运行所有测试，输出结果"""
+    print("=" * 60)
+    print("共享缓存层测试")
+    print("=" * 60)
+    tests = [value for name, value in sorted(globals().items()) if name.startswith("test_")]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"[OK] {test.__doc__}")
+        except AssertionError as e:
+            failed += 1
+            print(f"[ERROR] {test.__doc__}: {e}")
+    print("-" * 60)
+    print(f"测试完成: 通过 {len(tests) - failed} 个, 失败 {failed} 个")
+    return failed == 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(0 if main() else 1)
@@ -0,0 +1,263 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+sheet指纹捷径测试脚本
+检查按指纹比较的结论、远程分析的捷径，以及报错前逐个单元格的确认
+"""
+
+import io
+import os
+import subprocess
+import tempfile
+from datetime import datetime
+
+from openpyxl import Workbook, load_workbook
+
+import excel_checker
+from excel_checker import RECORD_SHEET_NAME, ExcelChecker
+from profiling import NULL_PROFILER
+from revision_log import RECORD_FIELDS, RevisionLog
+from xlsx_reader import workbook_fingerprints
+
+DATA_SHEET = "数据表1"
+OTHER_SHEET = "数据表2"
+
+
+def fingerprints(records="r1", data="d1", other="o1", strings="s1"):
+    """构造sheet指纹，值为None的sheet不存在"""
+    sheets = {RECORD_SHEET_NAME: records, DATA_SHEET: data, OTHER_SHEET: other}
+    return {
+        "sheets": {name: value for name, value in sheets.items() if value is not None},
+        "shared_strings": strings
+    }
+
+
+def create_workbook(path):
+    """生成包含修改记录和两个数据sheet的工作簿"""
+    wb = Workbook()
+    ws = wb.active
+    ws.title = RECORD_SHEET_NAME
+    ws.append(list(RECORD_FIELDS))
+    ws.append(["张三", datetime(2024, 1, 1, 9, 0, 0), "新建文件", "v1.0"])
+    for name in (DATA_SHEET, OTHER_SHEET):
+        data = wb.create_sheet(name)
+        data.append(["编号", "名称", "数量"])
+        for index in range(1, 6):
+            data.append([index, f"{name}项目{index}", index * 10])
+    wb.save(path)
+
+
+def edited_copy(path, edit=None):
+    """用openpyxl重新保存（可选修改单元格），返回文件内容"""
+    wb = load_workbook(path)
+    if edit is not None:
+        edit(wb)
+    buffer = io.BytesIO()
+    wb.save(buffer)
+    wb.close()
+    return buffer.getvalue()
+
+
+def make_task(oid, content, records=None, blob_fingerprints=None):
+    """构造只含一个远程blob的检查任务"""
+    return {
+        "filepath": "测试.xlsx",
+        "hash": "local",
+        "remote_blobs": {oid: {"content": content, "records": records, "fingerprints": blob_fingerprints}}
+    }
+
+
+def test_sheet_changes():
+    """按指纹比较数据sheet、修改记录sheet和共享字符串"""
+    changes = ExcelChecker._sheet_changes
+    assert changes(fingerprints(), fingerprints()) == ([], False, False)
+    assert changes(fingerprints(data="d2"), fingerprints()) == ([DATA_SHEET], False, False)
+    assert changes(fingerprints(records="r2"), fingerprints()) == ([], True, False)
+    assert changes(fingerprints(strings="s2"), fingerprints()) == ([], False, True)
+    assert changes(fingerprints(other=None), fingerprints()) == ([OTHER_SHEET], False, False)
+    assert changes(fingerprints(), fingerprints(other=None)) == ([OTHER_SHEET], False, False)
+    assert changes(fingerprints(records=None), fingerprints()) == ([], True, False)
+    assert changes(None, fingerprints()) is None
+    assert changes(fingerprints(), None) is None
+
+
+def test_analyze_remote_shortcuts():
+    """指纹能得出结论时不解析远程修订记录"""
+    records = RevisionLog.from_rows([("张三", "2024-01-01 09:00:00", "新建文件", "v1.0")])
+    cases = [
+        (fingerprints(), "unchanged", []),
+        (fingerprints(data="d2"), "unrecorded", [DATA_SHEET]),
+        (fingerprints(data="d2", records="r2"), None, [DATA_SHEET]),
+        (fingerprints(strings="s2"), None, []),
+    ]
+    for local, shortcut, changed in cases:
+        task = make_task("remote", b"remote content", records, fingerprints())
+        result = {"remote_cache_entries": []}
+        analyzed = ExcelChecker._analyze_remote(task, "remote", local, NULL_PROFILER, result)
+        assert analyzed[0] is records
+        assert analyzed[1] is None
+        assert analyzed[2] == shortcut, (local, analyzed[2])
+        assert analyzed[3] == changed
+        # 只有指纹不同的数据sheet需要确认时才保留远程内容
+        assert analyzed[4] == (b"remote content" if changed else None)
+        assert "remote" not in task["remote_blobs"]
+
+
+def test_analyze_remote_without_records():
+    """远程修订记录为空时不走捷径，按原流程解析"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "远程.xlsx")
+        wb = Workbook()
+        wb.active.title = RECORD_SHEET_NAME
+        wb.active.append(list(RECORD_FIELDS))
+        wb.save(path)
+        with open(path, "rb") as f:
+            content = f.read()
+        remote = workbook_fingerprints(content)
+        task = make_task("remote", content, RevisionLog(), remote)
+        result = {"remote_cache_entries": []}
+        records, error, shortcut, changed, _content = ExcelChecker._analyze_remote(
+            task, "remote", remote, NULL_PROFILER, result
+        )
+        assert error is None, error
+        assert shortcut is None
+        assert changed == []
+        assert len(records) == 0
+
+        # 远程修订记录未缓存时同样解析出空记录，不走捷径
+        task = make_task("remote", content)
+        result = {"remote_cache_entries": []}
+        records, error, shortcut, _changed, _content = ExcelChecker._analyze_remote(
+            task, "remote", remote, NULL_PROFILER, result
+        )
+        assert (error, shortcut) == (None, None)
+        assert len(records) == 0
+
+
+def test_shortcut_fills_record_count():
+    """远程修订记录未缓存时走捷径也解析远程记录，得到记录数并写入缓存"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "远程.xlsx")
+        create_workbook(path)
+        with open(path, "rb") as f:
+            content = f.read()
+        local = edited_copy(path)
+        task = make_task("remote", content)
+        task.update({
+            "filepath": path, "local_content": local, "previous": None,
+            "remotes": [{"ref": "origin/main", "oid": "remote", "error": None}],
+            "fingerprint": None, "check_columns": ["修订人", "修订时间", "修订内容"], "lineage_mode": "subsequence"
+        })
+        result = ExcelChecker._evaluate_stages(task, NULL_PROFILER)
+        assert result["status"] == "pass", result["errors"]
+        assert result["cache_entry"]["record_count"] == 1
+        (oid, records, fingerprints), = result["remote_cache_entries"]
+        assert oid == "remote" and len(records) == 1
+        assert fingerprints == workbook_fingerprints(content)
+
+
+def test_confirm_resaved_workbook():
+    """只是重新保存、单元格值未变的sheet不报告为已修改"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "远程.xlsx")
+        create_workbook(path)
+        with open(path, "rb") as f:
+            remote = f.read()
+        task = {"filepath": path, "local_content": edited_copy(path)}
+        edited = ExcelChecker._confirm_sheet_changes(
+            task, "remote", remote, [DATA_SHEET, OTHER_SHEET], NULL_PROFILER
+        )
+        assert edited == [], edited
+
+
+def test_confirm_edited_workbook():
+    """只报告单元格值确实不同的sheet"""
+    def edit(wb):
+        wb[DATA_SHEET]["C2"] = 999
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "远程.xlsx")
+        create_workbook(path)
+        with open(path, "rb") as f:
+            remote = f.read()
+        task = {"filepath": path, "local_content": edited_copy(path, edit)}
+        edited = ExcelChecker._confirm_sheet_changes(
+            task, "remote", remote, [DATA_SHEET, OTHER_SHEET], NULL_PROFILER
+        )
+        assert edited == [DATA_SHEET], edited
+
+
+def test_confirm_removed_sheet():
+    """本地删除的sheet报告为已修改"""
+    def remove(wb):
+        del wb[OTHER_SHEET]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "远程.xlsx")
+        create_workbook(path)
+        with open(path, "rb") as f:
+            remote = f.read()
+        task = {"filepath": path, "local_content": edited_copy(path, remove)}
+        edited = ExcelChecker._confirm_sheet_changes(
+            task, "remote", remote, [OTHER_SHEET], NULL_PROFILER
+        )
+        assert edited == [OTHER_SHEET], edited
+
+
+def test_confirm_reads_blob_through_shared_fetcher():
+    """远程内容来自缓存而未读取时，各文件的确认共用同一个 git cat-file 进程"""
+    def edit(wb):
+        wb[DATA_SHEET]["C2"] = 999
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "远程.xlsx")
+        create_workbook(path)
+        subprocess.run(['git', 'init', '-q', tmp], check=True)
+        oid = subprocess.run(['git', 'hash-object', '-w', path], cwd=tmp, check=True,
+                             capture_output=True, text=True).stdout.strip()
+        resaved = {"filepath": path, "local_content": edited_copy(path)}
+        edited = {"filepath": path, "local_content": edited_copy(path, edit)}
+        cwd = os.getcwd()
+        os.chdir(tmp)
+        try:
+            excel_checker._close_worker_blob_fetcher()
+            excel_checker._worker_fetcher = None
+            results = []
+            processes = set()
+            for task in (resaved, edited, resaved):
+                results.append(ExcelChecker._confirm_sheet_changes(
+                    task, oid, None, [DATA_SHEET, OTHER_SHEET], NULL_PROFILER
+                ))
+                processes.add(excel_checker._worker_fetcher._process)
+            # 对象不存在时按指纹的结果处理
+            missing = ExcelChecker._confirm_sheet_changes(resaved, "0" * 40, None, [DATA_SHEET], NULL_PROFILER)
+        finally:
+            excel_checker._close_worker_blob_fetcher()
+            excel_checker._worker_fetcher = None
+            os.chdir(cwd)
+        assert results == [[], [DATA_SHEET], []], results
+        assert len(processes) == 1 and None not in processes
+        assert missing == [DATA_SHEET]
+
+
+def main():
+    """依次运行所有测试，输出结果"""
+    print("=" * 60)
+    print("sheet指纹捷径测试")
+    print("=" * 60)
+    tests = [value for name, value in sorted(globals().items()) if name.startswith("test_")]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"[OK] {test.__doc__}")
+        except AssertionError as e:
+            failed += 1
+            print(f"[ERROR] {test.__doc__}: {e}")
+    print("-" * 60)
+    print(f"测试完成: 通过 {len(tests) - failed} 个, 失败 {failed} 个")
+    return failed == 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(0 if main() else 1)
@@ -82,7 +82,7 @@ print(f"已添加本地修订记录: 本地用户 - {local_revision_time}")
 print("\n现在执行以下命令测试:")
 print("  git add excels/数据文件_001.xlsx")
 print("  git commit -m '本地修改'")
-print("\n预期结果: 提交被拦截，提示'本地文件未基于远程最新版本'")
+print("\n预期结果: 提交被拦截，提示'本地文件未包含远程的 1 条修订记录'和'本地文件未基于远程最新版本'")
 print("\n按回车继续...")
 input()
 
@@ -128,7 +128,7 @@ if os.path.exists(BACKUP_FILE):
 
 print("\n测试完成！")
 print("\n总结:")
-print("1. 如果本地文件未包含远程最新的修订记录，提交会被拦截")
+print("1. 如果本地文件缺少远程的修订记录（会覆盖他人的修改），提交会被拦截并列出缺少的记录")
 print("2. 需要先执行 git pull 获取最新版本")
 print("3. 在最新版本基础上进行修改并添加修订记录")
 print("4. 这样可以避免覆盖他人的修改")
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+单元格级差异比较测试脚本
+检查新增行、删除行、单元格类型变化和列数不同时diff_frames的结果
+"""
+
+from datetime import date, datetime
+
+import numpy as np
+import pandas as pd
+
+from workbook_diff import _hash_values, diff_frames
+
+HEADER = ["编号", "名称", "数量"]
+ROWS = [[index, f"项目{index}", index * 10] for index in range(1, 11)]
+
+
+def frame(rows):
+    """与load_sheet_frame相同：object类型，空单元格为空字符串"""
+    return pd.DataFrame(rows, dtype=object).fillna("")
+
+
+def changed(diff):
+    """修改的单元格，[(本地行号, 远程行号, 列字母, 远程值, 本地值)]"""
+    return [tuple(item) for item in diff.changed_cells.itertuples(index=False)]
+
+
+def test_identical():
+    """内容相同时没有差异"""
+    diff = diff_frames(frame([HEADER] + ROWS), frame([HEADER] + ROWS))
+    assert diff.is_empty
+
+
+def test_row_inserted():
+    """插入的行报告为新增行，之后的行不报告为修改"""
+    local = [HEADER] + ROWS[:4] + [[99, "新项目", 990]] + ROWS[4:]
+    diff = diff_frames(frame(local), frame([HEADER] + ROWS))
+    assert list(diff.added_rows) == [6]
+    assert list(diff.removed_rows) == []
+    assert changed(diff) == []
+
+
+def test_row_deleted():
+    """删除的行按远程行号报告"""
+    local = [HEADER] + ROWS[:2] + ROWS[3:]
+    diff = diff_frames(frame(local), frame([HEADER] + ROWS))
+    assert list(diff.removed_rows) == [4]
+    assert list(diff.added_rows) == []
+    assert changed(diff) == []
+
+
+def test_cell_modified_after_insert():
+    """插入行之后修改的单元格按本地行号和远程行号报告"""
+    local = [HEADER] + [[99, "新项目", 990]] + [list(row) for row in ROWS]
+    local[6][2] = 12345
+    diff = diff_frames(frame(local), frame([HEADER] + ROWS))
+    assert list(diff.added_rows) == [2]
+    assert changed(diff) == [(7, 6, "C", 50, 12345)]
+
+
+def test_type_change():
+    """数字1与文本"1"、1与1.0、1与True、日期与日期文本报告为修改"""
+    remote = [HEADER, [1, 1, 1, datetime(2024, 1, 1)]]
+    local = [HEADER, ["1", 1.0, True, "2024-01-01 00:00:00"]]
+    diff = diff_frames(frame(local), frame(remote))
+    assert [(column, local_value) for _row, _remote_row, column, _remote, local_value in changed(diff)] == [
+        ("A", "1"), ("B", 1.0), ("C", True), ("D", "2024-01-01 00:00:00")
+    ]
+
+
+def test_hash_independent_of_column():
+    """同一个值的哈希与同列的其他值无关（整列为日期时间的列不会按datetime64哈希）"""
+    for value, other in ((datetime(2024, 1, 1), "文本"), (1.0, 1), (True, 1), (date(2024, 1, 1), 5)):
+        alone = _hash_values(np.array([value], dtype=object))[0]
+        mixed = _hash_values(np.array([other, value], dtype=object))[1]
+        assert alone == mixed, value
+
+    # 远程该列只有日期时间，本地同一列多了一个文本单元格
+    remote = [[datetime(2024, 1, day)] for day in range(1, 4)]
+    local = remote + [["备注"]]
+    diff = diff_frames(frame(local), frame(remote))
+    assert changed(diff) == []
+    assert list(diff.added_rows) == [4]
+
+
+def test_column_count_differs():
+    """列数不同时报告新增或删除的列，多出的列与空单元格比较"""
+    remote = [HEADER] + ROWS[:3]
+    local = [HEADER + ["备注"]] + [row + [""] for row in ROWS[:3]]
+    local[2][3] = "新备注"
+    diff = diff_frames(frame(local), frame(remote))
+    assert diff.added_columns == ["D"]
+    assert diff.removed_columns == []
+    assert changed(diff) == [(1, 1, "D", "", "备注"), (3, 3, "D", "", "新备注")]
+
+    diff = diff_frames(frame(remote), frame(local))
+    assert diff.removed_columns == ["D"]
+    assert changed(diff) == [(1, 1, "D", "备注", ""), (3, 3, "D", "新备注", "")]
+
+
+def test_empty_sheet():
+    """空sheet与有内容的sheet比较时全部为新增行"""
+    diff = diff_frames(frame([HEADER] + ROWS[:2]), frame([]))
+    assert list(diff.added_rows) == [1, 2, 3]
+    assert diff.added_columns == ["A", "B", "C"]
+
+
+def main():
+    """依次运行所有测试，输出结果"""
+    print("=" * 60)
+    print("单元格级差异比较测试")
+    print("=" * 60)
+    tests = [value for name, value in sorted(globals().items()) if name.startswith("test_")]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"[OK] {test.__doc__}")
+        except AssertionError as e:
+            failed += 1
+            print(f"[ERROR] {test.__doc__}: {e}")
+    print("-" * 60)
+    print(f"测试完成: 通过 {len(tests) - failed} 个, 失败 {failed} 个")
+    return failed == 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(0 if main() else 1)
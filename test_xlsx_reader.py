@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+快速读取器测试脚本
+在临时目录中生成工作簿，检查流式读取器与openpyxl读取的结果是否一致
+"""
+
+import os
+import tempfile
+from datetime import date, datetime, time
+
+from openpyxl import Workbook, load_workbook
+
+from excel_checker import RECORD_SHEET_NAME, ExcelChecker
+from revision_log import RECORD_FIELDS, RevisionLog
+from xlsx_reader import XlsxSheetReader, read_sheet_rows, workbook_fingerprints
+
+DATA_SHEET = "数据表1"
+
+
+def create_workbook(path):
+    """生成包含各种单元格类型的测试工作簿"""
+    wb = Workbook()
+    ws = wb.active
+    ws.title = RECORD_SHEET_NAME
+    ws.append(list(RECORD_FIELDS))
+    ws.append(["张三", datetime(2024, 1, 2, 3, 4, 5), "新建文件", "v1.0"])
+    ws.append(["李四", "2024-02-03 10:00:00", "修改数据：单价", "v1.1"])
+    ws.append([None, None, None, None])
+    ws.append(["王五", date(2024, 3, 4), "  前后有空格  ", 2])
+    ws.append(["赵六", datetime(2024, 4, 5, 6, 7, 8, 500000), True, 1.5])
+
+    data = wb.create_sheet(DATA_SHEET)
+    data.append(["编号", "名称", "数量", "单价", "日期", "时间", "备注"])
+    for index in range(1, 30):
+        data.append([
+            index, f"项目{index}", index * 10, index * 1.25,
+            date(2024, 1, index % 28 + 1), time(index % 24, 30),
+            "重复的备注" if index % 3 else None
+        ])
+    data.cell(row=40, column=9, value="稀疏单元格")
+    wb.save(path)
+
+
+def openpyxl_rows(path, sheet_name, min_row=1):
+    """openpyxl只读模式读取的行"""
+    wb = load_workbook(path, read_only=True, data_only=True)
+    try:
+        return [tuple(row) for row in wb[sheet_name].iter_rows(min_row=min_row, values_only=True)]
+    finally:
+        wb.close()
+
+
+def test_sheet_rows_match_openpyxl():
+    """逐个sheet比较全部单元格"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "测试.xlsx")
+        create_workbook(path)
+        for sheet_name in (RECORD_SHEET_NAME, DATA_SHEET):
+            expected = openpyxl_rows(path, sheet_name)
+            actual = read_sheet_rows(path, sheet_name)
+            assert actual == expected, f"{sheet_name} 的读取结果与openpyxl不一致"
+
+
+def test_revision_rows_match_openpyxl():
+    """修订记录（只取前4列、跳过空行）与openpyxl读取后转换的结果一致"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "测试.xlsx")
+        create_workbook(path)
+        expected = RevisionLog.from_rows(
+            row for row in openpyxl_rows(path, RECORD_SHEET_NAME, min_row=2)
+            if any(cell is not None for cell in row)
+        )
+        with open(path, "rb") as f:
+            content = f.read()
+        for source in (path, content):
+            records, error = ExcelChecker._get_revision_records(source)
+            assert error is None, error
+            assert list(records) == list(expected)
+        assert len(expected) == 4
+
+
+def test_missing_record_sheet():
+    """没有修改记录sheet时返回错误信息"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "无记录.xlsx")
+        wb = Workbook()
+        wb.active.title = DATA_SHEET
+        wb.save(path)
+        records, error = ExcelChecker._get_revision_records(path)
+        assert records is None
+        assert "修改记录" in error
+
+
+def test_fingerprints_from_central_directory():
+    """sheet指纹不解压即可读取，内容相同的文件指纹相同"""
+    with tempfile.TemporaryDirectory() as tmp:
+        first = os.path.join(tmp, "a.xlsx")
+        second = os.path.join(tmp, "b.xlsx")
+        create_workbook(first)
+        create_workbook(second)
+        fingerprints = workbook_fingerprints(first)
+        assert set(fingerprints["sheets"]) == {RECORD_SHEET_NAME, DATA_SHEET}
+        assert fingerprints["sheets"] == workbook_fingerprints(second)["sheets"]
+        with XlsxSheetReader(first) as reader:
+            assert reader.sheetnames == [RECORD_SHEET_NAME, DATA_SHEET]
+        assert workbook_fingerprints(b"not a zip file") is None
+
+
+def main():
+    """依次运行所有测试，输出结果"""
+    print("=" * 60)
+    print("快速读取器测试")
+    print("=" * 60)
+    tests = [value for name, value in sorted(globals().items()) if name.startswith("test_")]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"[OK] {test.__doc__}")
+        except AssertionError as e:
+            failed += 1
+            print(f"[ERROR] {test.__doc__}: {e}")
+    print("-" * 60)
+    print(f"测试完成: 通过 {len(tests) - failed} 个, 失败 {failed} 个")
+    return failed == 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(0 if main() else 1)
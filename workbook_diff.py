@@ -0,0 +1,439 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+工作簿单元格级差异比较
+将本地和远程版本的每个数据sheet读入pandas DataFrame，逐列计算每个单元格的64位哈希，
+先用向量化运算跳过首尾相同的行，只对中间有差异的行做行对齐，
+再一次性比较配对行的哈希矩阵找出修改的单元格；只有有差异的单元格才会取出原始值
+
+用法: python excel_checker.py diff FILE [--ref REF | --against OTHER_FILE] [--sheet NAME]
+"""
+
+import argparse
+import bisect
+import difflib
+import json
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+from openpyxl import load_workbook
+from openpyxl.utils import get_column_letter
+
+from excel_checker import RECORD_SHEET_NAME, ExcelChecker
+from git_blobs import BlobFetchError, to_git_path
+from xlsx_reader import UnsupportedWorkbookError, XlsxSheetReader
+
+# 首尾相同的行之外的差异区域超过该行数时，先按唯一行切分；切分后仍超过的区域按位置逐行比较
+MAX_ALIGNMENT_ROWS = 20000
+# 文本报告中每个sheet最多列出的单元格数
+DEFAULT_MAX_CELLS = 50
+# 合并各列哈希时使用的乘数
+_HASH_MULTIPLIER = np.uint64(1000003)
+# infer_dtype的这些结果说明整列的值都属于同一类型，逐个值推断也得到相同结果
+# （"date"不在其中：日期和日期时间混合的列也推断为"date"）
+_UNIFORM_KINDS = frozenset(("string", "integer", "floating", "boolean", "datetime", "time"))
+
+
+class SheetDiff:
+    """
+    单个sheet的差异，行号和列号与Excel一致（从1开始）
+    changed_cells 为DataFrame，列为 row（本地行号）、remote_row、column（列字母）、remote、local
+    """
+
+    def __init__(self, name, changed_cells, added_rows, removed_rows,
+                 added_columns, removed_columns):
+        self.name = name
+        self.changed_cells = changed_cells
+        self.added_rows = added_rows
+        self.removed_rows = removed_rows
+        self.added_columns = added_columns
+        self.removed_columns = removed_columns
+
+    @property
+    def is_empty(self):
+        """两个版本是否完全相同"""
+        return (self.changed_cells.empty and not len(self.added_rows) and not len(self.removed_rows)
+                and not self.added_columns and not self.removed_columns)
+
+    def to_dict(self, max_cells=None):
+        """转换为可序列化为JSON的字典，max_cells限制列出的单元格数"""
+        cells = self.changed_cells if max_cells is None else self.changed_cells.head(max_cells)
+        return {
+            "sheet": self.name,
+            "changed_cell_count": len(self.changed_cells),
+            "changed_cells": [
+                {"row": int(row), "remote_row": int(remote_row), "column": column,
+                 "remote": _to_json_value(remote), "local": _to_json_value(local)}
+                for row, remote_row, column, remote, local in cells.itertuples(index=False)
+            ],
+            "added_rows": [int(row) for row in self.added_rows],
+            "removed_rows": [int(row) for row in self.removed_rows],
+            "added_columns": self.added_columns,
+            "removed_columns": self.removed_columns
+        }
+
+
+def _to_json_value(value):
+    """单元格值转换为JSON可表示的值"""
+    if value is None or isinstance(value, (str, bool, int, float)):
+        return value
+    return str(value)
+
+
+def load_sheet_frame(source, sheet_name):
+    """
+    读取sheet的全部单元格为DataFrame（object类型，空单元格为空字符串）
+    source可以是文件路径、字节内容、LFS对象或二进制文件对象
+    """
+    with ExcelChecker._open_source(source) as source:
+        try:
+            with XlsxSheetReader(source) as reader:
+                rows = list(reader.iter_rows(sheet_name))
+        except UnsupportedWorkbookError:
+            if hasattr(source, "seek"):
+                source.seek(0)
+            wb = load_workbook(source, read_only=True, data_only=True)
+            try:
+                rows = list(wb[sheet_name].iter_rows(values_only=True))
+            finally:
+                wb.close()
+    return pd.DataFrame(rows, dtype=object).fillna("")
+
+
+def list_sheets(source):
+    """工作簿中的sheet名称"""
+    with ExcelChecker._open_source(source) as source:
+        try:
+            with XlsxSheetReader(source) as reader:
+                return list(reader.sheetnames)
+        except UnsupportedWorkbookError:
+            if hasattr(source, "seek"):
+                source.seek(0)
+            wb = load_workbook(source, read_only=True)
+            try:
+                return list(wb.sheetnames)
+            finally:
+                wb.close()
+
+
+def _hash_unique(values):
+    """去重后只对不同的值按字符串形式计算哈希，values中的值须为同一类型"""
+    codes, uniques = pd.factorize(values)
+    return pd.util.hash_array(np.asarray(uniques, dtype=object), categorize=False)[codes]
+
+
+def _hash_kind(kind):
+    """类型（infer_dtype的结果）的64位哈希"""
+    return pd.util.hash_array(np.array([kind], dtype=object))[0]
+
+
+def _hash_values(values):
+    """
+    计算一列单元格值的64位哈希，值的类型参与哈希，结果与同列的其他值无关
+    （按字符串形式哈希时数字1与文本"1"相同；不同类型的值一起去重时1、1.0和True会合并为一个值，
+    全为日期时间的列还会被转换为datetime64，所以按类型分组后分别去重）
+    整列类型相同时直接去重；类型混合时按每个值的类型分组，只在不同的类型上循环
+    """
+    kind = pd.api.types.infer_dtype(values, skipna=False)
+    if kind in _UNIFORM_KINDS:
+        return _hash_unique(values) * _HASH_MULTIPLIER ^ _hash_kind(kind)
+    type_codes, types = pd.factorize(pd.Series(values, dtype=object).map(type))
+    hashes = np.empty(len(values), dtype=np.uint64)
+    for code in range(len(types)):
+        selected = type_codes == code
+        group = values[selected]
+        group_kind = pd.api.types.infer_dtype(group[:1], skipna=False)
+        hashes[selected] = _hash_unique(group) * _HASH_MULTIPLIER ^ _hash_kind(group_kind)
+    return hashes
+
+
+def _cell_hashes(frame, width):
+    """逐列计算每个单元格的64位哈希，返回 行数×width 的uint64矩阵（超出的列视为空）"""
+    hashes = np.empty((len(frame), width), dtype=np.uint64)
+    empty = _hash_values(np.array([""], dtype=object))[0]
+    for position in range(width):
+        if position < frame.shape[1]:
+            hashes[:, position] = _hash_values(frame.iloc[:, position].to_numpy(dtype=object))
+        else:
+            hashes[:, position] = empty
+    return hashes
+
+
+def _row_hashes(cell_hashes):
+    """将一行中各列的哈希合并为整行的哈希"""
+    combined = np.zeros(len(cell_hashes), dtype=np.uint64)
+    for column in cell_hashes.T:
+        combined = combined * _HASH_MULTIPLIER ^ column
+    return combined
+
+
+def _common_length(left, right):
+    """两个数组从开头起相同元素的个数"""
+    length = min(len(left), len(right))
+    unequal = left[:length] != right[:length]
+    return int(np.argmax(unequal)) if unequal.any() else length
+
+
+def _longest_increasing(values):
+    """最长严格递增子序列，返回其下标"""
+    tails = []
+    tail_index = []
+    previous = [-1] * len(values)
+    for index, value in enumerate(values):
+        position = bisect.bisect_left(tails, value)
+        if position == len(tails):
+            tails.append(value)
+            tail_index.append(index)
+        else:
+            tails[position] = value
+            tail_index[position] = index
+        previous[index] = tail_index[position - 1] if position else -1
+    result = []
+    index = tail_index[-1] if tail_index else -1
+    while index >= 0:
+        result.append(index)
+        index = previous[index]
+    return result[::-1]
+
+
+def _unique_anchors(local_rows, remote_rows):
+    """
+    两边都只出现一次的行哈希作为锚点（patience diff），
+    按本地顺序取远程位置递增的最长子序列，返回 (本地位置, 远程位置)
+    """
+    local_values, local_first, local_counts = np.unique(local_rows, return_index=True, return_counts=True)
+    remote_values, remote_first, remote_counts = np.unique(remote_rows, return_index=True, return_counts=True)
+    local_once = local_counts == 1
+    remote_once = remote_counts == 1
+    _, local_at, remote_at = np.intersect1d(
+        local_values[local_once], remote_values[remote_once], assume_unique=True, return_indices=True
+    )
+    local_positions = local_first[local_once][local_at]
+    remote_positions = remote_first[remote_once][remote_at]
+    order = np.argsort(local_positions)
+    local_positions, remote_positions = local_positions[order], remote_positions[order]
+    keep = _longest_increasing(remote_positions.tolist())
+    return local_positions[keep], remote_positions[keep]
+
+
+def _align_segment(local_rows, remote_rows, local_offset, remote_offset, parts):
+    """对齐一段行，配对、新增、删除的行序号追加到parts"""
+    if not len(local_rows) and not len(remote_rows):
+        return
+    if (len(local_rows) == len(remote_rows)
+            or max(len(local_rows), len(remote_rows)) > MAX_ALIGNMENT_ROWS):
+        # 行数相同（只修改了单元格）或区域过大时按位置配对
+        opcodes = [("replace", 0, len(remote_rows), 0, len(local_rows))]
+    else:
+        opcodes = difflib.SequenceMatcher(None, remote_rows.tolist(), local_rows.tolist()).get_opcodes()
+    for tag, r_start, r_end, l_start, l_end in opcodes:
+        if tag == "equal":
+            continue
+        paired = min(r_end - r_start, l_end - l_start)
+        parts[0].append(np.arange(l_start, l_start + paired) + local_offset)
+        parts[1].append(np.arange(r_start, r_start + paired) + remote_offset)
+        parts[2].append(np.arange(l_start + paired, l_end) + local_offset)
+        parts[3].append(np.arange(r_start + paired, r_end) + remote_offset)
+
+
+def align_rows(local_rows, remote_rows):
+    """
+    按整行哈希对齐两个版本的行
+    返回 (配对的本地行序号, 配对的远程行序号, 新增的本地行序号, 删除的远程行序号)，序号从0开始；
+    哈希相同的配对行不会出现在结果中
+    """
+    prefix = _common_length(local_rows, remote_rows)
+    suffix = _common_length(local_rows[prefix:][::-1], remote_rows[prefix:][::-1])
+    local_middle = local_rows[prefix:len(local_rows) - suffix]
+    remote_middle = remote_rows[prefix:len(remote_rows) - suffix]
+
+    parts = ([], [], [], [])
+    if max(len(local_middle), len(remote_middle)) <= MAX_ALIGNMENT_ROWS:
+        _align_segment(local_middle, remote_middle, prefix, prefix, parts)
+    else:
+        # 差异区域较大：先用唯一行作为锚点切分，再逐段对齐
+        local_anchors, remote_anchors = _unique_anchors(local_middle, remote_middle)
+        local_start = remote_start = 0
+        for local_anchor, remote_anchor in zip(
+                list(local_anchors) + [len(local_middle)], list(remote_anchors) + [len(remote_middle)]):
+            _align_segment(local_middle[local_start:local_anchor], remote_middle[remote_start:remote_anchor],
+                           prefix + local_start, prefix + remote_start, parts)
+            local_start, remote_start = local_anchor + 1, remote_anchor + 1
+
+    local_index, remote_index, added, removed = (
+        np.concatenate(part) if part else np.arange(0) for part in parts
+    )
+    # 按位置配对的行中去掉完全相同的行
+    differs = local_rows[local_index] != remote_rows[remote_index]
+    return local_index[differs], remote_index[differs], added, removed
+
+
+def diff_frames(local, remote, name=""):
+    """比较两个版本的sheet数据（load_sheet_frame的结果），返回SheetDiff"""
+    width = max(local.shape[1], remote.shape[1])
+    local_hashes = _cell_hashes(local, width)
+    remote_hashes = _cell_hashes(remote, width)
+    local_index, remote_index, added, removed = align_rows(
+        _row_hashes(local_hashes), _row_hashes(remote_hashes)
+    )
+
+    # 一次性比较所有配对行的哈希矩阵，只对不同的单元格取值
+    pair, column = np.nonzero(local_hashes[local_index] != remote_hashes[remote_index])
+    local_rows = local_index[pair]
+    remote_rows = remote_index[pair]
+    letters = np.array([get_column_letter(position + 1) for position in range(width)], dtype=object)
+    changed_cells = pd.DataFrame({
+        "row": local_rows + 1,
+        "remote_row": remote_rows + 1,
+        "column": letters[column] if len(column) else np.array([], dtype=object),
+        "remote": _values_at(remote, remote_rows, column),
+        "local": _values_at(local, local_rows, column)
+    })
+
+    return SheetDiff(
+        name, changed_cells, added + 1, removed + 1,
+        [get_column_letter(position + 1) for position in range(remote.shape[1], local.shape[1])],
+        [get_column_letter(position + 1) for position in range(local.shape[1], remote.shape[1])]
+    )
+
+
+def _values_at(frame, rows, columns):
+    """按行列序号取值，超出该版本列数的单元格为空字符串"""
+    values = np.full(len(rows), "", dtype=object)
+    inside = columns < frame.shape[1]
+    if inside.any():
+        values[inside] = frame.to_numpy(dtype=object)[rows[inside], columns[inside]]
+    return values
+
+
+def diff_workbooks(local_source, remote_source, sheets=None):
+    """
+    比较两个工作簿的数据sheet（默认为除修改记录外的全部sheet）
+    返回 {"sheets": [SheetDiff], "added_sheets": [...], "removed_sheets": [...]}
+    """
+    local_sheets = list_sheets(local_source)
+    remote_sheets = list_sheets(remote_source)
+    if sheets is None:
+        sheets = [name for name in local_sheets if name != RECORD_SHEET_NAME]
+        removed_sheets = [name for name in remote_sheets
+                          if name not in local_sheets and name != RECORD_SHEET_NAME]
+    else:
+        removed_sheets = [name for name in sheets if name in remote_sheets and name not in local_sheets]
+
+    diffs = []
+    added_sheets = []
+    for name in sheets:
+        if name not in local_sheets:
+            continue
+        if name not in remote_sheets:
+            added_sheets.append(name)
+            continue
+        diffs.append(diff_frames(load_sheet_frame(local_source, name),
+                                 load_sheet_frame(remote_source, name), name))
+    return {"sheets": diffs, "added_sheets": added_sheets, "removed_sheets": removed_sheets}
+
+
+def print_report(result, max_cells=DEFAULT_MAX_CELLS):
+    """输出文本格式的差异报告"""
+    for name in result["added_sheets"]:
+        print(f"新增sheet: {name}")
+    for name in result["removed_sheets"]:
+        print(f"删除sheet: {name}")
+
+    for diff in result["sheets"]:
+        if diff.is_empty:
+            continue
+        print(f"sheet {diff.name}: 修改 {len(diff.changed_cells)} 个单元格, "
+              f"新增 {len(diff.added_rows)} 行, 删除 {len(diff.removed_rows)} 行")
+        if diff.added_columns:
+            print(f"  新增列: {', '.join(diff.added_columns)}")
+        if diff.removed_columns:
+            print(f"  删除列: {', '.join(diff.removed_columns)}")
+        for row, remote_row, column, remote, local in diff.changed_cells.head(max_cells).itertuples(index=False):
+            moved = f"（远程第 {remote_row} 行）" if remote_row != row else ""
+            print(f"  {column}{row}{moved}: {remote!r} -> {local!r}")
+        if len(diff.changed_cells) > max_cells:
+            print(f"  ... 另有 {len(diff.changed_cells) - max_cells} 个单元格")
+        if len(diff.added_rows):
+            print(f"  新增行: {_format_rows(diff.added_rows)}")
+        if len(diff.removed_rows):
+            print(f"  删除行（远程行号）: {_format_rows(diff.removed_rows)}")
+
+    changed = [diff for diff in result["sheets"] if not diff.is_empty]
+    if not changed and not result["added_sheets"] and not result["removed_sheets"]:
+        print("数据sheet没有差异")
+
+
+def _format_rows(rows, limit=20):
+    """行号列表的简短显示，连续的行号合并为区间"""
+    ranges = []
+    for row in rows:
+        row = int(row)
+        if ranges and ranges[-1][1] == row - 1:
+            ranges[-1][1] = row
+        else:
+            ranges.append([row, row])
+    shown = [str(start) if start == end else f"{start}-{end}" for start, end in ranges[:limit]]
+    if len(ranges) > limit:
+        shown.append("...")
+    return ", ".join(shown)
+
+
+def main(argv=None):
+    """差异比较子命令"""
+    parser = argparse.ArgumentParser(
+        prog='excel_checker.py diff',
+        description='比较Excel文件数据sheet的单元格差异'
+    )
+    parser.add_argument('file', help='本地Excel文件')
+    parser.add_argument('--ref', help='比较的目标分支（默认为配置 target_refs 中的第一个）')
+    parser.add_argument('--against', metavar='OTHER_FILE', help='与另一个本地文件比较，而不是与分支比较')
+    parser.add_argument('--sheet', action='append', dest='sheets', metavar='NAME',
+                        help='只比较指定的sheet，可以指定多次')
+    parser.add_argument('--max-cells', type=int, default=DEFAULT_MAX_CELLS,
+                        help='每个sheet最多列出的单元格数')
+    parser.add_argument('--output', help='将差异保存为JSON文件（列出全部单元格）')
+    args = parser.parse_args(argv)
+
+    if not os.path.exists(args.file):
+        print(f"文件不存在: {args.file}")
+        sys.exit(1)
+
+    if args.against:
+        remote_source, label = args.against, args.against
+    else:
+        checker = ExcelChecker()
+        ref = args.ref or checker.config['target_refs'][0]
+        try:
+            remote_source = checker.blob_fetcher.read_path(to_git_path(os.path.relpath(args.file)), ref)
+            remote_source, error = checker._resolve_remote_lfs(remote_source)
+        except BlobFetchError as e:
+            print(f"获取远程文件失败: {str(e)}")
+            sys.exit(1)
+        finally:
+            checker.close()
+        if error:
+            print(error)
+            sys.exit(1)
+        label = ref
+
+    print(f"比较 {args.file} 与 {label}")
+    result = diff_workbooks(args.file, remote_source, args.sheets)
+    print_report(result, args.max_cells)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({
+                "file": args.file,
+                "against": label,
+                "sheets": [diff.to_dict() for diff in result["sheets"]],
+                "added_sheets": result["added_sheets"],
+                "removed_sheets": result["removed_sheets"]
+            }, f, ensure_ascii=False, indent=2)
+        print(f"差异已保存到 {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,477 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+xlsx流式读取器
+直接打开xlsx压缩包，通过workbook.xml及其rels定位指定sheet，
+只流式解析该sheet的XML，并且只解析其引用到的共享字符串
+"""
+
+import io
+import posixpath
+import zipfile
+import xml.etree.ElementTree as ET
+
+from openpyxl.styles.numbers import (
+    builtin_format_code,
+    is_date_format,
+    is_timedelta_format,
+)
+from openpyxl.utils.cell import coordinate_to_tuple, range_boundaries
+from openpyxl.utils.datetime import (
+    CALENDAR_MAC_1904,
+    WINDOWS_EPOCH,
+    from_excel,
+    from_ISO8601,
+)
+
+# 命名空间
+SHEET_MAIN_NS = "http://schemas.openxmlformats.org/spreadsheetml/2006/main"
+PKG_REL_NS = "http://schemas.openxmlformats.org/package/2006/relationships"
+DOC_REL_NS = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+
+# 关系类型
+REL_OFFICE_DOCUMENT = DOC_REL_NS + "/officeDocument"
+REL_WORKSHEET = DOC_REL_NS + "/worksheet"
+REL_SHARED_STRINGS = DOC_REL_NS + "/sharedStrings"
+REL_STYLES = DOC_REL_NS + "/styles"
+
+# 标签
+SHEET_TAG = "{%s}sheet" % SHEET_MAIN_NS
+WORKBOOK_PR_TAG = "{%s}workbookPr" % SHEET_MAIN_NS
+DIMENSION_TAG = "{%s}dimension" % SHEET_MAIN_NS
+SHEET_DATA_TAG = "{%s}sheetData" % SHEET_MAIN_NS
+ROW_TAG = "{%s}row" % SHEET_MAIN_NS
+VALUE_TAG = "{%s}v" % SHEET_MAIN_NS
+INLINE_STRING_TAG = "{%s}is" % SHEET_MAIN_NS
+SI_TAG = "{%s}si" % SHEET_MAIN_NS
+TEXT_TAG = "{%s}t" % SHEET_MAIN_NS
+RICH_RUN_TAG = "{%s}r" % SHEET_MAIN_NS
+NUM_FMT_TAG = "{%s}numFmt" % SHEET_MAIN_NS
+CELL_XFS_TAG = "{%s}cellXfs" % SHEET_MAIN_NS
+XF_TAG = "{%s}xf" % SHEET_MAIN_NS
+REL_TAG = "{%s}Relationship" % PKG_REL_NS
+REL_ID_ATTR = "{%s}id" % DOC_REL_NS
+
+# 流式读取时每批解析的行数，每批结束后统一解析该批引用的共享字符串
+ROW_BATCH_SIZE = 2048
+
+
+class UnsupportedWorkbookError(Exception):
+    """文件结构超出快速读取器的支持范围，调用方应回退到openpyxl"""
+
+
+class _SharedString:
+    """尚未解析的共享字符串引用"""
+
+    __slots__ = ("index",)
+
+    def __init__(self, index):
+        self.index = index
+
+
+class _NumberCell:
+    """尚未确定是否为日期的数值单元格"""
+
+    __slots__ = ("value", "style_id")
+
+    def __init__(self, value, style_id):
+        self.value = value
+        self.style_id = style_id
+
+
+def _cast_number(value):
+    """将数值字符串转换为int或float（与openpyxl一致）"""
+    if "." in value or "E" in value or "e" in value:
+        return float(value)
+    return int(value)
+
+
+def _text_content(node):
+    """提取字符串节点的纯文本（忽略格式和注音）"""
+    snippets = []
+    plain = node.find(TEXT_TAG)
+    if plain is not None and plain.text is not None:
+        snippets.append(plain.text)
+    for run in node.iterfind(RICH_RUN_TAG):
+        text = run.find(TEXT_TAG)
+        if text is not None and text.text is not None:
+            snippets.append(text.text)
+    return "".join(snippets)
+
+
+class _SharedStringTable:
+    """
+    按需解析的共享字符串表
+    只保留被引用过的字符串；需要的索引已经越过当前解析位置时，从头重新解析
+    """
+
+    def __init__(self, archive, part):
+        self.archive = archive
+        self.part = part
+        self._src = None
+        self._events = None
+        self._position = 0
+        self._strings = {}
+
+    def _restart(self):
+        """从头开始解析共享字符串表"""
+        self.close()
+        self._src = self.archive.open(self.part)
+        self._events = ET.iterparse(self._src)
+        self._position = 0
+
+    def _next_item(self):
+        """返回下一个si节点"""
+        for _event, element in self._events:
+            if element.tag == SI_TAG:
+                return element
+        raise UnsupportedWorkbookError("共享字符串索引超出范围")
+
+    def load(self, indices):
+        """确保指定的索引都已解析"""
+        missing = {idx for idx in indices if idx not in self._strings}
+        if not missing:
+            return
+        if self._events is None or min(missing) < self._position:
+            self._restart()
+
+        last = max(missing)
+        while self._position <= last:
+            element = self._next_item()
+            if self._position in missing:
+                self._strings[self._position] = _text_content(element).replace("x005F_", "")
+            element.clear()
+            self._position += 1
+
+    def __getitem__(self, idx):
+        return self._strings[idx]
+
+    def close(self):
+        """关闭底层数据流"""
+        if self._src is not None:
+            self._src.close()
+            self._src = None
+            self._events = None
+
+
+def _read_rels(archive, part):
+    """读取部件的关系表，返回 {rId: (类型, 目标路径)}"""
+    folder, name = posixpath.split(part)
+    rels_path = posixpath.join(folder, "_rels", name + ".rels")
+    try:
+        root = ET.fromstring(archive.read(rels_path))
+    except KeyError:
+        return {}
+
+    rels = {}
+    for rel in root.iter(REL_TAG):
+        if rel.get("TargetMode") == "External":
+            continue
+        target = rel.get("Target", "")
+        if target.startswith("/"):
+            target = target[1:]
+        else:
+            target = posixpath.normpath(posixpath.join(folder, target))
+        rels[rel.get("Id")] = (rel.get("Type"), target)
+    return rels
+
+
+class XlsxSheetReader:
+    """只读取单个sheet的xlsx读取器"""
+
+    def __init__(self, source):
+        """source可以是文件路径或二进制文件对象"""
+        try:
+            self.archive = zipfile.ZipFile(source)
+        except zipfile.BadZipFile as e:
+            raise UnsupportedWorkbookError(str(e))
+        self.epoch = WINDOWS_EPOCH
+        self._sheets = None
+        self._shared_strings_part = None
+        self._styles_part = None
+        self._date_styles = None
+        self._timedelta_styles = None
+
+    def close(self):
+        """关闭压缩包"""
+        self.archive.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _load_workbook_index(self):
+        """解析workbook.xml及其rels，得到sheet名称到部件路径的映射"""
+        root_rels = _read_rels(self.archive, "")
+        workbook_part = None
+        for rel_type, target in root_rels.values():
+            if rel_type == REL_OFFICE_DOCUMENT:
+                workbook_part = target
+                break
+        if workbook_part is None:
+            raise UnsupportedWorkbookError("找不到workbook部件")
+
+        try:
+            root = ET.fromstring(self.archive.read(workbook_part))
+        except KeyError:
+            raise UnsupportedWorkbookError(f"缺少部件: {workbook_part}")
+        if root.tag != "{%s}workbook" % SHEET_MAIN_NS:
+            raise UnsupportedWorkbookError(f"不支持的workbook命名空间: {root.tag}")
+
+        workbook_pr = root.find(WORKBOOK_PR_TAG)
+        if workbook_pr is not None and workbook_pr.get("date1904") in ("1", "true"):
+            self.epoch = CALENDAR_MAC_1904
+
+        rels = _read_rels(self.archive, workbook_part)
+        sheets = {}
+        for sheet in root.iter(SHEET_TAG):
+            rel_id = sheet.get(REL_ID_ATTR)
+            if not rel_id:
+                continue
+            sheets[sheet.get("name")] = rels.get(rel_id)
+        for rel_type, target in rels.values():
+            if rel_type == REL_SHARED_STRINGS:
+                self._shared_strings_part = target
+            elif rel_type == REL_STYLES:
+                self._styles_part = target
+        self._sheets = sheets
+
+    @property
+    def sheetnames(self):
+        """所有sheet名称"""
+        if self._sheets is None:
+            self._load_workbook_index()
+        return list(self._sheets)
+
+    def part_fingerprints(self):
+        """
+        从zip中央目录读取各sheet部件和共享字符串部件的CRC32与未压缩大小，不解压sheet内容
+        返回 {"sheets": {sheet名称: [CRC32, 大小]}, "shared_strings": [CRC32, 大小]或None}
+        """
+        if self._sheets is None:
+            self._load_workbook_index()
+
+        def fingerprint(part):
+            try:
+                info = self.archive.getinfo(part)
+            except KeyError:
+                return None
+            return [info.CRC, info.file_size]
+
+        return {
+            "sheets": {name: fingerprint(rel[1]) if rel else None for name, rel in self._sheets.items()},
+            "shared_strings": fingerprint(self._shared_strings_part) if self._shared_strings_part else None
+        }
+
+    def _load_styles(self):
+        """解析styles.xml，找出日期和时长格式的样式索引"""
+        self._date_styles = set()
+        self._timedelta_styles = set()
+        if self._styles_part is None:
+            return
+
+        custom_formats = {}
+        with self.archive.open(self._styles_part) as src:
+            in_cell_xfs = False
+            idx = 0
+            for event, element in ET.iterparse(src, events=("start", "end")):
+                if element.tag == CELL_XFS_TAG:
+                    if event == "end":
+                        break
+                    in_cell_xfs = True
+                elif event != "end":
+                    continue
+                elif element.tag == NUM_FMT_TAG:
+                    custom_formats[int(element.get("numFmtId"))] = element.get("formatCode")
+                elif element.tag == XF_TAG and in_cell_xfs:
+                    num_fmt_id = int(element.get("numFmtId", 0))
+                    fmt = custom_formats.get(num_fmt_id) or builtin_format_code(num_fmt_id)
+                    if is_date_format(fmt):
+                        self._date_styles.add(idx)
+                    if is_timedelta_format(fmt):
+                        self._timedelta_styles.add(idx)
+                    idx += 1
+
+    def _resolve(self, value, strings):
+        """把延迟解析的单元格值转换为最终值"""
+        if isinstance(value, _SharedString):
+            return strings[value.index]
+        if isinstance(value, _NumberCell):
+            if self._date_styles is None:
+                self._load_styles()
+            if value.style_id not in self._date_styles:
+                return value.value
+            try:
+                return from_excel(
+                    value.value, self.epoch,
+                    timedelta=value.style_id in self._timedelta_styles
+                )
+            except (OverflowError, ValueError):
+                return "#VALUE!"
+        return value
+
+    def _parse_cell(self, element, keep):
+        """解析单元格；keep为False时只需判断是否非空"""
+        data_type = element.get("t", "n")
+        if data_type == "inlineStr":
+            child = element.find(INLINE_STRING_TAG)
+            if child is None:
+                return None
+            return _text_content(child) if keep else True
+
+        value = element.findtext(VALUE_TAG, None) or None
+        if value is None or not keep:
+            return value
+
+        if data_type == "n":
+            number = _cast_number(value)
+            style_id = int(element.get("s", 0) or 0)
+            if style_id:
+                return _NumberCell(number, style_id)
+            return number
+        if data_type == "s":
+            return _SharedString(int(value))
+        if data_type == "b":
+            return bool(int(value))
+        if data_type == "d":
+            return from_ISO8601(value)
+        # str / e 等类型直接返回文本
+        return value
+
+    def iter_rows(self, sheet_name, min_row=1, columns=None):
+        """
+        逐行读取sheet的数据（生成器），行宽与openpyxl只读模式一致
+        sheet不存在时抛出KeyError；columns指定时只保留前columns列，
+        并在读取阶段丢弃整行为空的行
+        """
+        if self._sheets is None:
+            self._load_workbook_index()
+        rel = self._sheets[sheet_name]
+        if rel is None or rel[0] != REL_WORKSHEET:
+            raise UnsupportedWorkbookError(f"sheet不是普通工作表: {sheet_name}")
+
+        strings = None
+        try:
+            for rows, indices in self._iter_row_batches(rel[1], min_row, columns):
+                if indices:
+                    if strings is None:
+                        if self._shared_strings_part is None:
+                            raise UnsupportedWorkbookError("单元格引用了共享字符串，但文件中没有共享字符串表")
+                        strings = _SharedStringTable(self.archive, self._shared_strings_part)
+                    strings.load(indices)
+                for row in rows:
+                    yield tuple(self._resolve(value, strings) for value in row)
+        finally:
+            if strings is not None:
+                strings.close()
+
+    def _iter_row_batches(self, part, min_row, columns):
+        """分批解析sheet的XML，返回 (行列表, 该批引用的共享字符串索引)"""
+        rows = []
+        indices = set()
+        max_col = max_row = None
+        with self.archive.open(part) as src:
+            sheet_data = None
+            row_counter = 0
+            # 与openpyxl一致：行号不递增的行会被忽略
+            next_row = min_row
+            for event, element in ET.iterparse(src, events=("start", "end")):
+                tag = element.tag
+                if event == "start":
+                    if tag == SHEET_DATA_TAG:
+                        sheet_data = element
+                    continue
+
+                if tag == DIMENSION_TAG:
+                    _, _, max_col, max_row = range_boundaries(element.get("ref"))
+                elif tag == SHEET_DATA_TAG:
+                    # sheetData之后的内容与数据无关，直接结束解析
+                    break
+                elif tag == ROW_TAG:
+                    row_attr = element.get("r")
+                    row_counter = int(float(row_attr)) if row_attr else row_counter + 1
+                    if max_row is not None and row_counter > max_row:
+                        break
+                    if row_counter >= next_row:
+                        if columns is None:
+                            # 与openpyxl一致：读取整个sheet时，中间缺少的行按空行返回
+                            rows.extend([None] * (max_col or 0) for _ in range(row_counter - next_row))
+                        next_row = row_counter + 1
+                        row = self._parse_row(element, max_col, columns, indices)
+                        if row is not None:
+                            rows.append(row)
+                            if len(rows) >= ROW_BATCH_SIZE:
+                                yield rows, indices
+                                rows = []
+                                indices = set()
+                    sheet_data.clear()
+
+        if rows:
+            yield rows, indices
+
+    def _parse_row(self, element, max_col, columns, indices):
+        """解析一行，返回按列位置填充的值列表；整行为空时返回None"""
+        cells = {}
+        col_counter = 0
+        last_col = 0
+        non_empty = False
+        for cell in element:
+            coordinate = cell.get("r")
+            if coordinate:
+                col_counter = coordinate_to_tuple(coordinate)[1]
+            else:
+                col_counter += 1
+            last_col = col_counter
+            if max_col is not None and col_counter > max_col:
+                continue
+
+            keep = columns is None or col_counter <= columns
+            value = self._parse_cell(cell, keep)
+            if value is None:
+                continue
+            non_empty = True
+            if keep:
+                cells[col_counter] = value
+                if isinstance(value, _SharedString):
+                    indices.add(value.index)
+
+        if not non_empty:
+            if columns is not None:
+                return None
+            if max_col is None and last_col == 0:
+                return []
+
+        width = max_col or last_col
+        if columns is not None:
+            width = min(width, columns)
+        return [cells.get(col) for col in range(1, width + 1)]
+
+
+def workbook_fingerprints(source):
+    """读取工作簿各sheet部件的指纹（见 part_fingerprints），文件无法识别时返回None"""
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        source = io.BytesIO(source)
+    try:
+        with XlsxSheetReader(source) as reader:
+            return reader.part_fingerprints()
+    except (UnsupportedWorkbookError, zipfile.BadZipFile, ET.ParseError, KeyError, OSError):
+        return None
+
+
+def uncompressed_size(source):
+    """压缩包中各部件的未压缩大小之和（只读取zip中央目录，不解压），文件无法识别时返回None"""
+    try:
+        with zipfile.ZipFile(source) as archive:
+            return sum(info.file_size for info in archive.infolist())
+    except (zipfile.BadZipFile, OSError):
+        return None
+
+
+def read_sheet_rows(source, sheet_name, min_row=1, columns=None):
+    """读取指定sheet的全部数据行，sheet不存在时返回None"""
+    with XlsxSheetReader(source) as reader:
+        if sheet_name not in reader.sheetnames:
+            return None
+        return list(reader.iter_rows(sheet_name, min_row=min_row, columns=columns))